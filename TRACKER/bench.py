@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from unittest import mock
+
+import streamlit as st
+import yaml
+from streamlit import logger as streamlit_logger
+
+from auth import AuthManager
+from cache import AsyncTTLCache
+from database import DatabaseManager
+from pages import PageRenderer
+from rate_limiter import MemoryBucketBackend, TokenBucketLimiter
+from sqlite_backend import SqliteClient
+from topics import TopicIndexRegistry
+from utils import get_catalog
+
+# Benchmark suite: drives the auth flow, pages and app.main against an
+# in-memory SQLite backend that injects a fixed latency per query, and reports
+# latency, database round trips and peak allocations per scenario. Results
+# are compared with bench_baseline.json; settings live in config.yaml
+# (performance.bench).
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "bench_baseline.json")
+SUBJECTS = ["Math", "Physics", "Chemistry", "Biology", "History", "English"]
+TOPICS = [f"topic-{i}" for i in range(40)]
+
+class LatencyClient:
+    # Wraps a storage client so every execute() waits `latency` seconds first
+    # and counts as one database round trip.
+    def __init__(self, inner, latency=0.0):
+        self.inner = inner
+        self.latency = latency
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        return _TimedQuery(self, self.inner.table(name))
+
+    def rpc(self, name, params=None):
+        return _TimedQuery(self, self.inner.rpc(name, params))
+
+    def record(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+class _TimedQuery:
+    def __init__(self, client, query):
+        self._client = client
+        self._query = query
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if attr is self._query:
+            return self
+        if not callable(attr):
+            return attr
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self if result is self._query else result
+        return call
+
+    def execute(self):
+        self._client.record()
+        return self._query.execute()
+
+def seed(client, users=10, doubts=10000, logs_per_user=5000, rng=None):
+    rng = rng or random.Random(0)
+    start = datetime.datetime(2024, 1, 1)
+    students = [f"student-{i}" for i in range(users)]
+    with client.lock, client.conn:
+        client.conn.executemany(
+            "insert into users (id, email, name, role, onboarded, created_at) values (?, ?, ?, ?, 1, ?)",
+            [(user_id, f"{user_id}@example.com", user_id.title(), "student", start.isoformat()) for user_id in students]
+            + [("teacher-0", "teacher-0@example.com", "Teacher", "teacher", start.isoformat())]
+        )
+        client.conn.execute("insert into teachers (email, name, verified) values ('teacher-0@example.com', 'Teacher', 1)")
+        client.conn.executemany(
+            "insert into study_logs (user_id, date, subject, topics, notes, timestamp) values (?, ?, ?, ?, ?, ?)",
+            (
+                (user_id, (start + datetime.timedelta(hours=i * 6)).date().isoformat(), rng.choice(SUBJECTS),
+                 json.dumps(rng.sample(TOPICS, 2)), "notes", (start + datetime.timedelta(hours=i * 6)).isoformat())
+                for user_id in students for i in range(logs_per_user)
+            )
+        )
+        client.conn.executemany(
+            "insert into doubts (id, user_id, topic, question, response, response_by, created_at, responded_at) values (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (f"doubt-{i:06d}", students[i % users], rng.choice(TOPICS), f"Question {i}",
+                 f"Answer {i}" if i % 2 else None, "teacher-0" if i % 2 else None,
+                 (start + datetime.timedelta(minutes=i)).isoformat(), (start + datetime.timedelta(minutes=i + 5)).isoformat() if i % 2 else None)
+                for i in range(doubts)
+            )
+        )
+        client.conn.executemany(
+            "insert into class_data (user_id, subject, topics, created_at) values (?, ?, ?, ?)",
+            [("teacher-0", subject, json.dumps(TOPICS[i::len(SUBJECTS)]), start.isoformat()) for i, subject in enumerate(SUBJECTS)]
+        )
+
+@contextmanager
+def scripted_widgets(values=None, pressed=()):
+    # Bare-mode widgets return their defaults; these return scripted values
+    # by label instead, and report the labelled buttons as clicked.
+    values = values or {}
+    def valued(original):
+        def widget(label, *args, **kwargs):
+            return values[label] if label in values else original(label, *args, **kwargs)
+        return widget
+    def clicked(original):
+        def button(label, *args, **kwargs):
+            return label in pressed or original(label, *args, **kwargs)
+        return button
+    with mock.patch.object(st, "text_input", valued(st.text_input)), \
+            mock.patch.object(st, "text_area", valued(st.text_area)), \
+            mock.patch.object(st, "form_submit_button", clicked(st.form_submit_button)), \
+            mock.patch.object(st, "button", clicked(st.button)):
+        yield
+
+class BenchEnv:
+    def __init__(self, settings):
+        self.settings = settings
+        self.client = LatencyClient(SqliteClient(":memory:"), settings['latency_ms'] / 1000)
+        seed(self.client.inner, settings['users'], settings['doubts'], settings['logs_per_user'])
+        with open(os.path.join(HERE, 'config.yaml'), 'r') as f:
+            self.config = yaml.safe_load(f)
+        self.db = DatabaseManager(None, None, cache=AsyncTTLCache(), client=self.client)
+        self.t = get_catalog(os.path.join(HERE, 'translations.json')).translator("English")
+        # Submissions would otherwise hit the per-user doubt limit.
+        self.limiter = TokenBucketLimiter(MemoryBucketBackend(), capacity=10 ** 9, period=1, name="bench")
+        self.student = {"id": "student-0", "email": "student-0@example.com", "name": "Student-0", "role": "student"}
+
+    async def user_data(self):
+        # What app.main has loaded by the time a page renders.
+        user_data, logs = await asyncio.gather(self.db.get_user_data(self.student['id']), self.db.get_logs(self.student['id']))
+        return {**user_data, "logs": logs}
+
+    def renderer(self):
+        renderer = PageRenderer(self.db, self.t, self.config)
+        renderer.doubt_limiter = self.limiter
+        return renderer
+
+    def new_session(self):
+        for key in list(st.session_state.keys()):
+            del st.session_state[key]
+        st.session_state.language = "English"
+
+    def clear_caches(self):
+        self.db.cache.clear()
+        self.db.topics = TopicIndexRegistry()
+
+    def close(self):
+        self.db.writes.close()
+        self.client.inner.close()
+
+async def auth_login(env):
+    st.session_state.user = None
+    values = {env.t("email"): env.student['email'], env.t("name"): env.student['name']}
+    with scripted_widgets(values, pressed={env.t("login")}):
+        return await AuthManager(env.db, env.t).authenticate()
+
+async def doubts_page(env):
+    st.session_state.doubts_cursors = [None]
+    await env.renderer().render_doubts_page(env.student, await env.user_data())
+
+async def doubts_submit(env):
+    values = {env.t("question"): "How does this work?", env.t("custom_topic"): "topic-0"}
+    with scripted_widgets(values, pressed={env.t("submit_doubt")}):
+        await env.renderer().render_doubts_page(env.student, await env.user_data())
+
+async def history_page(env):
+    await env.renderer().render_history_page(env.student, await env.user_data())
+
+async def app_main(env):
+    # Importing app would start the file logging pipeline; the bench keeps
+    # whatever logging its caller configured.
+    with mock.patch("log_pipeline.setup_logging"):
+        import app
+    st.session_state.user = env.student
+    with mock.patch.object(app, "get_database_manager", return_value=env.db):
+        await app.main()
+
+SCENARIOS = {
+    "auth.login": auth_login,
+    "pages.doubts": doubts_page,
+    "pages.doubts_submit": doubts_submit,
+    "pages.history": history_page,
+    "app.main": app_main
+}
+
+def run_scenario(env, scenario, iterations, cold):
+    # cold: a new session on empty caches every time (first visit after a
+    # deploy); warm: reruns of one session with the caches populated.
+    def once():
+        if cold:
+            env.new_session()
+            env.clear_caches()
+        before = env.client.round_trips
+        start = time.perf_counter()
+        asyncio.run(scenario(env))
+        return (time.perf_counter() - start) * 1000, env.client.round_trips - before
+
+    # One untimed run first, so module imports and warm caches are in place.
+    env.new_session()
+    once()
+    timings, round_trips = zip(*(once() for _ in range(iterations)))
+    tracemalloc.start()
+    try:
+        once()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    ordered = sorted(timings)
+    return {
+        "median_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "round_trips": max(round_trips),
+        "peak_kib": round(peak / 1024, 1)
+    }
+
+def run_suite(settings, scenarios=None):
+    env = BenchEnv(settings)
+    try:
+        results = {}
+        for name in scenarios or SCENARIOS:
+            for mode in ("cold", "warm"):
+                results[f"{name}.{mode}"] = run_scenario(env, SCENARIOS[name], settings['iterations'], mode == "cold")
+        return results
+    finally:
+        env.close()
+
+def compare(results, baseline, tolerance, min_delta_ms=1.0):
+    # Round trips are deterministic and must not grow; latency and peak
+    # memory may drift by `tolerance` before they count as a regression.
+    # Latency changes under min_delta_ms are timer noise on sub-ms scenarios.
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if result['round_trips'] > expected['round_trips']:
+            regressions.append(f"{name}: {result['round_trips']} round trips > baseline {expected['round_trips']}")
+        for metric in ("median_ms", "peak_kib"):
+            if metric == "median_ms" and result[metric] - expected[metric] < min_delta_ms:
+                continue
+            if result[metric] > expected[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {result[metric]} > baseline {expected[metric]} (+{tolerance:.0%})")
+    return regressions
+
+def load_settings(config_path=os.path.join(HERE, 'config.yaml')):
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f).get('performance', {}).get('bench', {})
+
+def main(argv=None):
+    settings = load_settings()
+    parser = argparse.ArgumentParser(description="Run the benchmark suite against the latency-injecting backend.")
+    for key in ("latency_ms", "users", "doubts", "logs_per_user", "iterations"):
+        parser.add_argument(f"--{key.replace('_', '-')}", type=float if key == "latency_ms" else int, default=settings.get(key))
+    parser.add_argument("--tolerance", type=float, default=settings.get('tolerance', 0.25))
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+    settings = {key: getattr(args, key) for key in ("latency_ms", "users", "doubts", "logs_per_user", "iterations")}
+
+    results = run_suite(settings, args.scenario)
+    print(f"{'scenario':<28} {'median ms':>10} {'p95 ms':>10} {'trips':>6} {'peak KiB':>10}")
+    for name, result in results.items():
+        print(f"{name:<28} {result['median_ms']:>10.2f} {result['p95_ms']:>10.2f} {result['round_trips']:>6} {result['peak_kib']:>10.1f}")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+    if not os.path.exists(BASELINE_PATH):
+        print("No baseline to compare against; run with --update-baseline")
+        return 0
+    with open(BASELINE_PATH, 'r') as f:
+        baseline = json.load(f)
+    if baseline.get('settings') != settings:
+        print("Baseline was recorded with different settings; not comparing")
+        return 0
+    regressions = compare(results, baseline['results'], args.tolerance)
+    for regression in regressions:
+        print(f"FAIL {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    # Bare-mode runs warn about the missing script context on every widget.
+    st.get_option("logger.level")
+    streamlit_logger.set_log_level("error")
+    os.chdir(HERE)
+    sys.exit(main())
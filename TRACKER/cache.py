@@ -0,0 +1,149 @@
+import asyncio
+import copy
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class AsyncTTLCache:
+    # Process-wide read cache shared by every session. Each Streamlit rerun runs
+    # on its own event loop, so in-flight loads are concurrent.futures.Future
+    # objects that any loop can await through asyncio.wrap_future.
+    def __init__(self, maxsize=1024, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.logger = logging.getLogger(__name__)
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        # Sequence number of the last invalidation per tag, so a load only
+        # loses its result when one of its own tags was written meanwhile.
+        self._seq = 0
+        self._invalidated_at = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_or_load(self, key, loader, ttl, tags=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+                started_at = self._seq
+            else:
+                self.coalesced += 1
+        if not leader:
+            return copy.deepcopy(await asyncio.wrap_future(future))
+
+        try:
+            value = await loader()
+            tag_list = tuple(tags(value) if callable(tags) else tags or ())
+        except BaseException as e:
+            with self._lock:
+                self._finish(key)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            # A write that landed while we were loading may have made this value
+            # stale; hand it to the waiting callers but do not keep it.
+            if not any(self._invalidated_at.get(tag, -1) > started_at for tag in tag_list):
+                self._store(key, value, ttl, tag_list)
+            self._finish(key)
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    def _finish(self, key):
+        self._inflight.pop(key, None)
+        if not self._inflight:
+            self._invalidated_at.clear()
+
+    def _store(self, key, value, ttl, tags):
+        self._discard(key)
+        self._entries[key] = (self.clock() + ttl, copy.deepcopy(value), tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self._seq += 1
+            for tag in tags:
+                if self._inflight:
+                    self._invalidated_at[tag] = self._seq
+                for key in list(self._tags.get(tag, ())):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+
+def cached(ttl, tags=None, default=None):
+    # Caches an async DatabaseManager read in self.cache. `tags` receives the
+    # result followed by the call arguments and returns the invalidation tags.
+    # Failed loads are not cached; callers get a copy of `default` instead.
+    def decorator(method):
+        name = method.__qualname__
+
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            key = (name, _freeze(args), _freeze(kwargs))
+            tag_fn = (lambda value: tags(value, *args, **kwargs)) if tags else None
+            try:
+                return await self.cache.get_or_load(key, lambda: method(self, *args, **kwargs), ttl, tag_fn)
+            except Exception:
+                return copy.deepcopy(default)
+
+        wrapper.uncached = method
+        return wrapper
+    return decorator
@@ -1,98 +1,730 @@
 from supabase import create_client, Client
-import streamlit as st
+from postgrest.utils import SyncClient
+import httpx
 import logging
 import asyncio
+import contextvars
+import copy
+import datetime
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Protocol
+from cache import AsyncTTLCache, cached
+from doubt_store import DoubtFeed
+from instrumentation import describe_query, record_query
+from mock_tests import aggregate_stats
+from similarity import SimilarityIndex, doubt_text
+from topics import TopicIndexRegistry
+from writebehind import WriteBehindBuffer
+
+# Columns owned by dedicated write paths (append_log, increment_points,
+# append_badge); patch_user never sends them.
+PATCH_EXCLUDED_FIELDS = frozenset({"id", "logs", "points", "badges"})
+
+def diff_fields(snapshot, current):
+    return {
+        key: value for key, value in current.items()
+        if key not in PATCH_EXCLUDED_FIELDS and (key not in snapshot or snapshot[key] != value)
+    }
+
+# Named column projections per table. Read methods take either a preset name,
+# an explicit column string or a list of columns; "full" selects every column.
+PROJECTIONS = {
+    "users": {
+        "full": "*",
+        "session": "id, email, name, role",
+        "summary": "id, name, role, points",
+        "profile": "id, email, name, role, points, badges, groups, difficult_topics, onboarded, preferences, goals, created_at"
+    },
+    "teachers": {"full": "*", "summary": "email, verified"},
+    "study_logs": {"full": "*", "summary": "id, date, subject, topics, timestamp"},
+    "daily_rollups": {"full": "*", "summary": "day, subject, checkins, topics"},
+    "class_data": {"full": "*", "summary": "id, topics"},
+    "quiz_questions": {"full": "*", "pool": "id, topic, prompt, options, answer, explanation"},
+    "doubts": {
+        "full": "*",
+        "summary": "id, user_id, topic, created_at, response_by, responded_at",
+        "card": "id, topic, question, response, response_by, created_at, responded_at"
+    }
+}
+
+def resolve_columns(table, columns):
+    if columns is None:
+        return "*"
+    if isinstance(columns, (list, tuple)):
+        return ", ".join(columns)
+    return PROJECTIONS.get(table, {}).get(columns, columns)
+
+def take_snapshot(user_data):
+    return {key: copy.deepcopy(value) for key, value in user_data.items() if key != "logs"}
+
+# The supabase client is synchronous; queries run on one bounded pool per
+# process so they never block the event loop and independent reads overlap.
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor(max_workers=8):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="supabase")
+        return _executor
+
+def configure_pool(client, pool):
+    # Swap PostgREST's default HTTP session for one with explicit keep-alive
+    # limits; httpx.Client is thread-safe, so every session shares it.
+    session = client.postgrest.session
+    client.postgrest.session = SyncClient(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=pool.get('timeout', 10),
+        follow_redirects=True,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=pool.get('max_connections', 20),
+            max_keepalive_connections=pool.get('max_keepalive_connections', 10),
+            keepalive_expiry=pool.get('keepalive_expiry', 30)
+        )
+    )
+    session.close()
+    return client
+
+def _day_bound(value, days=0):
+    # A date (or ISO string) as the ISO day `days` later, for range filters.
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    return (value + datetime.timedelta(days=days)).isoformat()
+
+class StorageClient(Protocol):
+    # What DatabaseManager needs from a storage backend: the supabase client
+    # or sqlite_backend.SqliteClient. Both return builders whose execute()
+    # gives a response with .data and .count.
+    def table(self, name): ...
+    def rpc(self, name, params=None): ...
+
+def _with_keyset(columns):
+    if columns == "*":
+        return columns
+    names = [name.strip() for name in columns.split(",")]
+    return ", ".join(names + [key for key in ("created_at", "id") if key not in names])
 
 class DatabaseManager:
-    def __init__(self, supabase_url, supabase_key):
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+    def __init__(self, supabase_url, supabase_key, max_workers=8, cache=None, pool=None, write_delay=2.0, client=None, similarity=None, autosave_delay=10.0):
+        # An explicit client replaces Supabase entirely (see StorageClient).
+        if client is not None:
+            self.supabase: StorageClient = client
+        else:
+            self.supabase: Client = create_client(supabase_url, supabase_key)
+            if pool:
+                configure_pool(self.supabase, pool)
         self.logger = logging.getLogger(__name__)
+        self._executor = get_executor(max_workers)
+        self.cache = cache if cache is not None else AsyncTTLCache()
+        self.topics = TopicIndexRegistry()
+        similarity = similarity or {}
+        self.doubt_feed = None
+        self.similar_doubts = SimilarityIndex(similarity.get('dim', 512), refresh=similarity.get('refresh', 60))
+        # patch_user changes are buffered and written on a timer, at commit
+        # points and, at the latest, when the process exits.
+        # Both buffers are flushed at exit by writebehind's own hook.
+        self.writes = WriteBehindBuffer(self._write_user_changes, write_delay)
+        # Mock-test picks, keyed by session id, coalesced the same way.
+        self.mock_answers = WriteBehindBuffer(self._save_mock_answers, autosave_delay)
+
+    async def _run_in_executor(self, function, *args):
+        # run_in_executor does not carry contextvars over; running in a copy
+        # keeps the user and rerun ids on records logged by the worker.
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(contextvars.copy_context().run, function, *args))
+
+    async def _execute(self, query):
+        # Every round trip is timed and counted (see instrumentation.py).
+        table, operation = describe_query(query)
+        start = time.perf_counter()
+        try:
+            response = await self._run_in_executor(query.execute)
+        except Exception:
+            record_query(table, operation, time.perf_counter() - start, None, ok=False)
+            raise
+        record_query(table, operation, time.perf_counter() - start, response.data)
+        return response
 
-    @st.cache_data(ttl=300)
-    async def get_user_by_email(self, email):
+    async def health_check(self):
+        start = time.perf_counter()
         try:
-            response = self.supabase.table("users").select("*").eq("email", email).execute()
+            await self._execute(self.supabase.table("users").select("id").limit(1))
+            return {"ok": True, "latency_ms": (time.perf_counter() - start) * 1000}
+        except Exception as e:
+            self.logger.error("Database health check failed: %s", e)
+            return {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000, "error": str(e)}
+
+    @cached(ttl=300, tags=lambda user, email, *args, **kwargs: [f"email:{email}"] + ([f"user:{user['id']}"] if user else []))
+    async def get_user_by_email(self, email, columns="full"):
+        try:
+            response = await self._execute(self.supabase.table("users").select(resolve_columns("users", columns)).eq("email", email))
             return response.data[0] if response.data else None
         except Exception as e:
-            self.logger.error(f"Error fetching user by email: {e}")
-            return None
+            self.logger.error("Error fetching user by email: %s", e)
+            raise
 
-    @st.cache_data(ttl=300)
-    async def get_user_by_id(self, user_id):
+    @cached(ttl=300, tags=lambda user, user_id, *args, **kwargs: [f"user:{user_id}"], default={})
+    async def get_user_by_id(self, user_id, columns="full"):
         try:
-            response = self.supabase.table("users").select("*").eq("id", user_id).single().execute()
+            response = await self._execute(self.supabase.table("users").select(resolve_columns("users", columns)).eq("id", user_id).single())
             return response.data if response.data else {}
         except Exception as e:
-            self.logger.error(f"Error fetching user by id: {e}")
+            self.logger.error("Error fetching user by id: %s", e)
+            raise
+
+    async def get_users_by_ids(self, user_ids, columns="id, name"):
+        user_ids = list(dict.fromkeys(i for i in user_ids if i))
+        if not user_ids:
+            return {}
+        try:
+            response = await self._execute(self.supabase.table("users").select(resolve_columns("users", columns)).in_("id", user_ids))
+            return {row['id']: row for row in response.data or []}
+        except Exception as e:
+            self.logger.error("Error fetching users by ids: %s", e)
             return {}
 
-    @st.cache_data(ttl=300)
-    async def get_user_data(self, user_id):
+    async def get_user_data(self, user_id, columns="full"):
+        return self.writes.overlay(user_id, await self._load_user_data(user_id, columns))
+
+    @cached(ttl=300, tags=lambda user, user_id, *args, **kwargs: [f"user:{user_id}"], default={})
+    async def _load_user_data(self, user_id, columns="full"):
         try:
-            response = self.supabase.table("users").select("*").eq("id", user_id).single().execute()
+            response = await self._execute(self.supabase.table("users").select(resolve_columns("users", columns)).eq("id", user_id).single())
             return response.data if response.data else {}
         except Exception as e:
-            self.logger.error(f"Error fetching user data: {e}")
-            return {}
+            self.logger.error("Error fetching user data: %s", e)
+            raise
 
     async def insert_user(self, user_data):
         try:
-            response = self.supabase.table("users").insert(user_data).execute()
+            response = await self._execute(self.supabase.table("users").insert(user_data))
+            self.cache.invalidate(f"email:{user_data.get('email')}", f"user:{user_data.get('id')}")
             return response.data[0]
         except Exception as e:
-            self.logger.error(f"Error inserting user: {e}")
+            self.logger.error("Error inserting user: %s", e)
             raise
 
     async def update_user(self, user_id, user_data):
         try:
-            response = self.supabase.table("users").update(user_data).eq("id", user_id).execute()
+            response = await self._execute(self.supabase.table("users").update(user_data).eq("id", user_id))
+            self.cache.invalidate(f"user:{user_id}")
+            return response.data[0] if response.data else None
+        except Exception as e:
+            self.logger.error("Error updating user: %s", e)
+            raise
+
+    async def patch_user(self, user_id, snapshot, user_data):
+        # Stages the changed fields in the write-behind buffer; commit_user
+        # forces them out when the caller needs them durable.
+        changes = diff_fields(snapshot, user_data)
+        if not changes:
+            return None
+        changes = copy.deepcopy(changes)
+        self.writes.stage(user_id, changes)
+        snapshot.update(copy.deepcopy(changes))
+        return changes
+
+    async def commit_user(self, user_id):
+        failures = await self._run_in_executor(self.writes.flush, user_id)
+        if user_id in failures:
+            self.writes.pop_error(user_id)
+            raise failures[user_id]
+
+    def _write_user_changes(self, user_id, changes):
+        # Runs on the flush thread or the executor, never on an event loop.
+        start = time.perf_counter()
+        try:
+            response = self.supabase.table("users").update(changes).eq("id", user_id).execute()
+        except Exception:
+            record_query("users", "update", time.perf_counter() - start, None, ok=False)
+            raise
+        record_query("users", "update", time.perf_counter() - start, response.data)
+        self.cache.invalidate(f"user:{user_id}")
+
+    async def increment_points(self, user_id, amount):
+        try:
+            response = await self._execute(self.supabase.rpc("increment_user_points", {"p_user_id": user_id, "p_amount": amount}))
+            self.cache.invalidate(f"user:{user_id}")
+            return response.data
+        except Exception as e:
+            self.logger.error("Error incrementing points: %s", e)
+            raise
+
+    async def append_badge(self, user_id, badge):
+        try:
+            response = await self._execute(self.supabase.rpc("append_user_badge", {"p_user_id": user_id, "p_badge": badge}))
+            self.cache.invalidate(f"user:{user_id}")
+            return response.data if response.data else []
+        except Exception as e:
+            self.logger.error("Error appending badge: %s", e)
+            raise
+
+    async def take_rate_token(self, key, capacity, refill_per_second):
+        try:
+            response = await self._execute(self.supabase.rpc("take_rate_token", {
+                "p_key": key, "p_capacity": capacity, "p_refill_per_second": refill_per_second
+            }))
+            return response.data['allowed'], response.data['retry_after']
+        except Exception as e:
+            self.logger.error("Error taking rate limit token: %s", e)
+            raise
+
+    async def append_log(self, user_id, log_entry):
+        try:
+            row = {"user_id": user_id, **log_entry}
+            response = await self._execute(self.supabase.table("study_logs").insert(row))
+            self.cache.invalidate(f"logs:{user_id}", f"rollups:{user_id}")
+            self.topics.record_log(user_id, row)
             return response.data[0] if response.data else None
         except Exception as e:
-            self.logger.error(f"Error updating user: {e}")
+            self.logger.error("Error appending study log: %s", e)
+            raise
+
+    @cached(ttl=300, tags=lambda logs, user_id, *args, **kwargs: [f"logs:{user_id}"], default=[])
+    async def get_logs(self, user_id, columns="full"):
+        try:
+            response = await self._execute(self.supabase.table("study_logs").select(resolve_columns("study_logs", columns)).eq("user_id", user_id).order("timestamp"))
+            return response.data if response.data else []
+        except Exception as e:
+            self.logger.error("Error fetching study logs: %s", e)
+            raise
+
+    async def iter_log_pages(self, user_id=None, page_size=500, columns="full"):
+        # Keyset walk over (timestamp, id) for exports; bypasses the read cache.
+        cursor = None
+        while True:
+            try:
+                query = self.supabase.table("study_logs").select(resolve_columns("study_logs", columns))
+                if user_id:
+                    query = query.eq("user_id", user_id)
+                if cursor:
+                    timestamp, log_id = cursor
+                    query = query.or_(f'timestamp.gt."{timestamp}",and(timestamp.eq."{timestamp}",id.gt.{log_id})')
+                response = await self._execute(query.order("timestamp").order("id").limit(page_size))
+            except Exception as e:
+                self.logger.error("Error reading study log page: %s", e)
+                raise
+            rows = response.data or []
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            cursor = (rows[-1]['timestamp'], rows[-1]['id'])
+
+    async def migrate_logs(self, user_id, legacy_logs):
+        # Moves a legacy users.logs array into study_logs and clears the column.
+        if not legacy_logs:
+            return 0
+        try:
+            rows = [{"user_id": user_id, **log} for log in legacy_logs]
+            await self._execute(self.supabase.table("study_logs").upsert(rows, on_conflict="user_id,timestamp", ignore_duplicates=True))
+            await self._execute(self.supabase.table("users").update({"logs": []}).eq("id", user_id))
+            self.cache.invalidate(f"logs:{user_id}", f"user:{user_id}", f"rollups:{user_id}")
+            self.topics.drop_user(user_id)
+            self.logger.info("Migrated %s legacy logs for user %s", len(rows), user_id)
+            return len(rows)
+        except Exception as e:
+            self.logger.error("Error migrating legacy logs: %s", e)
+            return 0
+
+    @cached(ttl=300, tags=lambda rows, user_id, *args, **kwargs: [f"rollups:{user_id}", "rollups"], default=[])
+    async def get_rollups(self, user_id, since=None, columns="summary"):
+        # daily_rollups is maintained by a trigger on study_logs inserts.
+        try:
+            query = self.supabase.table("daily_rollups").select(resolve_columns("daily_rollups", columns)).eq("user_id", user_id)
+            if since:
+                query = query.gte("day", since)
+            response = await self._execute(query.order("day"))
+            return response.data if response.data else []
+        except Exception as e:
+            self.logger.error("Error fetching daily rollups: %s", e)
+            raise
+
+    async def backfill_rollups(self, user_id=None):
+        try:
+            response = await self._execute(self.supabase.rpc("backfill_daily_rollups", {"p_user_id": user_id}))
+            self.cache.invalidate(f"rollups:{user_id}" if user_id else "rollups")
+            return response.data
+        except Exception as e:
+            self.logger.error("Error backfilling daily rollups: %s", e)
             raise
 
-    @st.cache_data(ttl=300)
-    async def get_teacher_by_email(self, email):
+    @cached(ttl=300, tags=lambda teacher, email, *args, **kwargs: [f"teacher:{email}"])
+    async def get_teacher_by_email(self, email, columns="full"):
         try:
-            response = self.supabase.table("teachers").select("*").eq("email", email).execute()
+            response = await self._execute(self.supabase.table("teachers").select(resolve_columns("teachers", columns)).eq("email", email))
             return response.data[0] if response.data else None
         except Exception as e:
-            self.logger.error(f"Error fetching teacher: {e}")
-            return None
+            self.logger.error("Error fetching teacher: %s", e)
+            raise
 
-    @st.cache_data(ttl=600)
-    async def get_class_data(self):
+    @cached(ttl=600, tags=lambda rows, *args, **kwargs: ["class_data"], default=[])
+    async def get_class_data(self, columns="full"):
         try:
-            response = self.supabase.table("class_data").select("*").execute()
+            response = await self._execute(self.supabase.table("class_data").select(resolve_columns("class_data", columns)))
             return response.data if response.data else []
         except Exception as e:
-            self.logger.error(f"Error fetching class data: {e}")
-            return []
+            self.logger.error("Error fetching class data: %s", e)
+            raise
+
+    async def insert_class_data(self, class_row):
+        try:
+            response = await self._execute(self.supabase.table("class_data").insert(class_row))
+            self.cache.invalidate("class_data")
+            self.topics.record_class_row(class_row)
+            return response.data[0] if response.data else None
+        except Exception as e:
+            self.logger.error("Error inserting class data: %s", e)
+            raise
+
+    async def get_topic_suggestions(self, user_id, prefix="", limit=None, class_data=None):
+        # Indexes are built once from a full read, then kept current by
+        # append_log / insert_class_data; the class index is also rebuilt when
+        # it is older than the class data TTL, to pick up other processes' writes.
+        if not self.topics.has_user(user_id):
+            self.topics.build_user(user_id, await self.get_logs(user_id, "summary"))
+        if self.topics.class_stale():
+            self.topics.build_class(class_data if class_data is not None else await self.get_class_data("summary"))
+        return self.topics.suggest(user_id, prefix, limit)
+
+    @cached(ttl=600, tags=lambda rows, topic, *args, **kwargs: ["quiz_questions", f"quiz_questions:{topic}"], default=[])
+    async def get_quiz_pool(self, topic, columns="pool"):
+        # Every question for a topic; attempts sample from this cached pool,
+        # so starting a quiz costs no query once the topic has been read.
+        try:
+            response = await self._execute(self.supabase.table("quiz_questions").select(resolve_columns("quiz_questions", columns)).eq("topic", topic))
+            return response.data if response.data else []
+        except Exception as e:
+            self.logger.error("Error fetching quiz questions for %s: %s", topic, e)
+            raise
+
+    async def insert_quiz_question(self, question):
+        try:
+            response = await self._execute(self.supabase.table("quiz_questions").insert(question))
+            self.cache.invalidate(f"quiz_questions:{question['topic']}")
+            return response.data[0] if response.data else None
+        except Exception as e:
+            self.logger.error("Error inserting quiz question: %s", e)
+            raise
+
+    async def submit_quiz_attempt(self, attempt):
+        # One insert per attempt; quiz_topic_stats is updated by trigger.
+        try:
+            await self._execute(self.supabase.table("quiz_attempts").insert(attempt))
+            self.cache.invalidate("quiz_stats")
+            return True
+        except Exception as e:
+            self.logger.error("Error submitting quiz attempt %s: %s", attempt.get('id'), e)
+            return False
+
+    @cached(ttl=60, tags=lambda rows, *args, **kwargs: ["quiz_stats"], default=[])
+    async def get_quiz_topic_stats(self, topics=None):
+        try:
+            query = self.supabase.table("quiz_topic_stats").select("topic, attempts, correct, questions")
+            if topics:
+                query = query.in_("topic", list(topics))
+            response = await self._execute(query.order("topic"))
+            return response.data if response.data else []
+        except Exception as e:
+            self.logger.error("Error fetching quiz stats: %s", e)
+            raise
+
+    async def create_mock_test(self, test):
+        try:
+            response = await self._execute(self.supabase.table("mock_tests").insert(test))
+            self.cache.invalidate("mock_tests")
+            return response.data[0] if response.data else None
+        except Exception as e:
+            self.logger.error("Error creating mock test: %s", e)
+            raise
+
+    @cached(ttl=300, tags=lambda rows, *args, **kwargs: ["mock_tests"], default=[])
+    async def get_mock_tests(self):
+        try:
+            response = await self._execute(self.supabase.table("mock_tests").select("*").order("created_at", desc=True))
+            return response.data if response.data else []
+        except Exception as e:
+            self.logger.error("Error fetching mock tests: %s", e)
+            raise
+
+    async def start_mock_test(self, test_id, user_id):
+        # The caller's session with its server-set deadline; idempotent.
+        try:
+            response = await self._execute(self.supabase.rpc("start_mock_test", {"p_test_id": test_id, "p_user_id": user_id}))
+            session = response.data
+            if session:
+                # Picks from this process that are still waiting for autosave.
+                session['answers'] = {**session['answers'], **self.mock_answers.changes(session['id'])}
+            return session
+        except Exception as e:
+            self.logger.error("Error starting mock test %s: %s", test_id, e)
+            raise
+
+    def stage_mock_answers(self, session_id, answers):
+        # No round trip: picks are merged per session and saved by the
+        # autosave timer in one batch.
+        self.mock_answers.stage(session_id, answers)
+
+    def _save_mock_answers(self, session_id, answers):
+        # Runs on the flush thread, never on an event loop. A save after the
+        # deadline or after submission is a no-op, not an error.
+        start = time.perf_counter()
+        try:
+            response = self.supabase.rpc("save_mock_answers", {"p_session_id": session_id, "p_answers": answers}).execute()
+        except Exception:
+            record_query("save_mock_answers", "rpc", time.perf_counter() - start, None, ok=False)
+            raise
+        record_query("save_mock_answers", "rpc", time.perf_counter() - start, response.data)
+
+    async def submit_mock_test(self, session_id, answers, grace_seconds=30):
+        # One call with every pick. Anything still waiting for autosave is
+        # part of it, so once submitted the pending batch is dropped; a save
+        # that races the submit is ignored by the database.
+        try:
+            response = await self._execute(self.supabase.rpc("submit_mock_test", {
+                "p_session_id": session_id, "p_answers": answers, "p_grace_seconds": grace_seconds
+            }))
+            self.mock_answers.discard(session_id)
+            self.cache.invalidate("mock_stats")
+            return response.data
+        except Exception as e:
+            self.logger.error("Error submitting mock test session %s: %s", session_id, e)
+            raise
+
+    @cached(ttl=30, tags=lambda stats, *args, **kwargs: ["mock_stats"], default={})
+    async def get_mock_question_stats(self, test_id, grace_seconds=30):
+        # {question_id: {attempts, correct, skipped}}, summed over shards.
+        # Sessions abandoned past their deadline are scored first, at most
+        # once per cache lifetime, so they are counted too.
+        try:
+            await self._execute(self.supabase.rpc("finalize_mock_tests", {"p_test_id": test_id, "p_grace_seconds": grace_seconds}))
+            response = await self._execute(
+                self.supabase.table("mock_question_stats").select("question_id, attempts, correct, skipped").eq("test_id", test_id)
+            )
+            return aggregate_stats(response.data or [])
+        except Exception as e:
+            self.logger.error("Error fetching mock test stats for %s: %s", test_id, e)
+            raise
 
     async def insert_doubt(self, doubt_data):
         try:
-            response = self.supabase.table("doubts").insert(doubt_data).execute()
+            await self._execute(self.supabase.table("doubts").insert(doubt_data))
+            self.cache.invalidate("doubts")
             return True
         except Exception as e:
-            self.logger.error(f"Error inserting doubt: {e}")
+            self.logger.error("Error inserting doubt: %s", e)
             return False
 
-    @st.cache_data(ttl=300)
-    async def get_doubts(self, user_id=None):
+    @cached(ttl=300, tags=lambda rows, *args, **kwargs: ["doubts"], default=[])
+    async def get_doubts(self, user_id=None, columns="full"):
         try:
+            query = self.supabase.table("doubts").select(resolve_columns("doubts", columns))
             if user_id:
-                response = self.supabase.table("doubts").select("*").eq("user_id", user_id).execute()
-            else:
-                response = self.supabase.table("doubts").select("*").execute()
+                query = query.eq("user_id", user_id)
+            response = await self._execute(query)
+            return response.data if response.data else []
+        except Exception as e:
+            self.logger.error("Error fetching doubts: %s", e)
+            raise
+
+    @cached(ttl=30, tags=lambda page, *args, **kwargs: ["doubts"], default={"items": [], "next_cursor": None, "total": 0})
+    async def get_doubts_page(self, cursor=None, limit=10, filters=None, columns="full"):
+        # Keyset pagination over (created_at, id), newest first. The total is
+        # only counted for the first page, using the planner estimate for
+        # large tables.
+        try:
+            # The keyset columns are always fetched so the next cursor can be built.
+            query = self.supabase.table("doubts").select(
+                _with_keyset(resolve_columns("doubts", columns)), count="estimated" if cursor is None else None
+            )
+            query = self._apply_doubt_filters(query, filters or {})
+            if cursor:
+                created_at, doubt_id = cursor
+                query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{doubt_id})')
+            response = await self._execute(query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1))
+            rows = response.data or []
+            next_cursor = (rows[limit - 1]['created_at'], rows[limit - 1]['id']) if len(rows) > limit else None
+            return {"items": rows[:limit], "next_cursor": next_cursor, "total": response.count}
+        except Exception as e:
+            self.logger.error("Error fetching doubts page: %s", e)
+            raise
+
+    async def get_doubt_changes(self, created_since=None, responded_since=None, limit=500, columns="card"):
+        # Doubts created or answered at or after the given timestamps, oldest
+        # first. Uncached: callers track their own high-water marks.
+        try:
+            query = self.supabase.table("doubts").select(resolve_columns("doubts", columns))
+            conditions = [f'{field}.gte."{value}"' for field, value in (("created_at", created_since), ("responded_at", responded_since)) if value]
+            if conditions:
+                query = query.or_(",".join(conditions))
+            response = await self._execute(query.order("created_at").order("id").limit(limit))
             return response.data if response.data else []
         except Exception as e:
-            self.logger.error(f"Error fetching doubts: {e}")
-            return []
+            self.logger.error("Error fetching doubt changes: %s", e)
+            raise
+
+    async def sync_doubt_store(self, store, window=200, poll_interval=10, max_changes=500):
+        # Brings a session's DoubtStore up to date (see doubt_store.py). The
+        # first call reads the newest `window` doubts; later calls apply
+        # realtime pushes and, when due, one delta query. Too many changes
+        # (a long-idle session) reload the window instead. On errors the
+        # store keeps what it has and the next rerun retries.
+        feed = self.doubt_feed
+        if feed is not None:
+            feed.register(store)
+        store.drain()
+        if not store.due(poll_interval, feed):
+            return
+        generation = feed.generation if feed is not None else None
+        try:
+            if store.loaded:
+                changes = await self.get_doubt_changes(store.since("created_at"), store.since("responded_at"), max_changes + 1)
+                if len(changes) <= max_changes:
+                    store.merge(changes, advance=True)
+                    store.mark_synced(generation)
+                    return
+            page = await self.get_doubts_page.uncached(self, None, window, None, "card")
+            store.load(page['items'], page['total'], complete=page['next_cursor'] is None)
+            store.mark_synced(generation)
+        except Exception as e:
+            self.logger.error("Error syncing doubt store: %s", e)
+
+    def start_doubt_feed(self, url, key):
+        # Realtime pushes for sync_doubt_store; Supabase only, once per process.
+        if self.doubt_feed is None:
+            self.doubt_feed = DoubtFeed(url, key).start()
+        return self.doubt_feed
+
+    async def iter_doubt_pages(self, user_id=None, page_size=500, columns="full", filters=None):
+        cursor = None
+        filters = {**(filters or {}), **({"user_id": user_id} if user_id else {})}
+        while True:
+            page = await self.get_doubts_page.uncached(self, cursor, page_size, filters, columns)
+            if page['items']:
+                yield page['items']
+            cursor = page['next_cursor']
+            if cursor is None:
+                return
+
+    @cached(ttl=30, tags=lambda page, *args, **kwargs: ["doubts"], default={"items": [], "total": 0, "next_page": None})
+    async def search_doubts(self, query, filters=None, page=0, limit=10):
+        # Ranked full-text search over topic, question and response (the
+        # search_doubts RPC). Filters: topic, answered, and since/until dates,
+        # both inclusive.
+        query = (query or "").strip()
+        if not query:
+            return {"items": [], "total": 0, "next_page": None}
+        filters = filters or {}
+        try:
+            response = await self._execute(self.supabase.rpc("search_doubts", {
+                "p_query": query,
+                "p_topic": filters.get('topic') or None,
+                "p_answered": filters.get('answered'),
+                "p_since": _day_bound(filters.get('since')),
+                "p_until": _day_bound(filters.get('until'), days=1),
+                "p_limit": limit + 1,
+                "p_offset": page * limit
+            }))
+            rows = response.data or []
+            items = [{key: value for key, value in row.items() if key != "total"} for row in rows[:limit]]
+            return {"items": items, "total": rows[0]['total'] if rows else 0, "next_page": page + 1 if len(rows) > limit else None}
+        except Exception as e:
+            self.logger.error("Error searching doubts: %s", e)
+            raise
+
+    async def get_similar_doubts(self, text, limit=3, min_score=0.5):
+        # Answered doubts closest to `text`, as [(doubt, similarity)]. The
+        # index is warmed at startup (warm_similar_doubts); later syncs, at
+        # most once per refresh interval, fetch only answers since the newest
+        # one indexed. This process's own answers are added by
+        # update_doubt_response.
+        if self.similar_doubts.stale():
+            await self.sync_similar_doubts()
+        return self.similar_doubts.nearest(text, limit, min_score)
+
+    async def sync_similar_doubts(self):
+        # Single-flight through the cache: sessions that find the index stale
+        # at the same time wait for the one sync already running.
+        await self.cache.get_or_load(("similar_doubts", "sync"), self._sync_similar_doubts, 0)
+
+    def warm_similar_doubts(self):
+        # Loads the index on its own thread when the process starts, so no
+        # student's keystroke pays for the full load.
+        thread = threading.Thread(target=lambda: asyncio.run(self.sync_similar_doubts()), name="similarity-warm", daemon=True)
+        thread.start()
+        return thread
+
+    async def _sync_similar_doubts(self):
+        high_water = self.similar_doubts.high_water
+        filters = {"answered": True, "responded_since": high_water}
+        try:
+            async for rows in self.iter_doubt_pages(page_size=1000, columns="card", filters=filters):
+                # Hashing is CPU-bound; keep it off the event loop.
+                await self._run_in_executor(self.similar_doubts.add_many, [(row['id'], doubt_text(row), row) for row in rows])
+                high_water = max([high_water or ""] + [row['responded_at'] or "" for row in rows]) or None
+            self.similar_doubts.mark_synced(high_water)
+        except Exception as e:
+            # Lookups keep using what is already indexed; the next call retries.
+            self.logger.error("Error syncing similar doubts: %s", e)
+
+    async def count_rows(self, table, user_id=None):
+        try:
+            query = self.supabase.table(table).select("id", count="estimated")
+            if user_id:
+                query = query.eq("user_id", user_id)
+            response = await self._execute(query.limit(1))
+            return response.count or 0
+        except Exception as e:
+            self.logger.error("Error counting %s: %s", table, e)
+            return 0
+
+    def _apply_doubt_filters(self, query, filters):
+        if filters.get('user_id'):
+            query = query.eq("user_id", filters['user_id'])
+        if filters.get('topic'):
+            query = query.eq("topic", filters['topic'])
+        if filters.get('answered') is True:
+            query = query.not_.is_("response", "null")
+        elif filters.get('answered') is False:
+            query = query.is_("response", "null")
+        if filters.get('responded_since'):
+            query = query.gte("responded_at", filters['responded_since'])
+        return query
 
     async def update_doubt_response(self, doubt_id, response_data):
         try:
-            self.supabase.table("doubts").update(response_data).eq("id", doubt_id).execute()
+            response = await self._execute(self.supabase.table("doubts").update(response_data).eq("id", doubt_id))
+            self.cache.invalidate("doubts")
+            for row in response.data or []:
+                if row.get('response'):
+                    self.similar_doubts.add(row['id'], doubt_text(row), row)
             return True
         except Exception as e:
-            self.logger.error(f"Error updating doubt response: {e}")
-            return False
\ No newline at end of file
+            self.logger.error("Error updating doubt response: %s", e)
+            return False
+
+class UserIdentityMap:
+    # Per-rerun map of user rows so each id is fetched at most once per render.
+    def __init__(self, db_manager, columns="id, name"):
+        self.db_manager = db_manager
+        self.columns = columns
+        self._users = {}
+
+    async def load(self, user_ids):
+        missing = {user_id for user_id in user_ids if user_id and user_id not in self._users}
+        if missing:
+            found = await self.db_manager.get_users_by_ids(missing, self.columns)
+            for user_id in missing:
+                self._users[user_id] = found.get(user_id, {})
+        return self._users
+
+    def get(self, user_id):
+        return self._users.get(user_id, {})
@@ -0,0 +1,165 @@
+import asyncio
+import bisect
+import collections
+import datetime
+import logging
+import threading
+import time
+import weakref
+from utils import lazy_import
+
+realtime = lazy_import("realtime")
+
+# Per-session copy of the doubts feed. A session loads the newest `window`
+# doubts once, then only asks for rows created or answered since its
+# high-water marks (DatabaseManager.sync_doubt_store). With a live realtime
+# subscription (DoubtFeed) inserts and answers are pushed in and nothing is
+# polled; otherwise deltas are polled at most every poll_interval seconds.
+# Pages past the window fall back to keyset queries.
+
+def _shift(value, seconds):
+    # created_at / responded_at are stamped by the writing process, so a row
+    # can commit after a later-stamped one; deltas re-read an overlap.
+    if not value:
+        return None
+    moment = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return (moment - datetime.timedelta(seconds=seconds)).isoformat()
+
+class DoubtStore:
+    def __init__(self, overlap=30):
+        self.overlap = overlap
+        self.rows = {}
+        self.high_water = {"created_at": None, "responded_at": None}
+        self.total = 0
+        self.complete = False
+        self.loaded = False
+        self.synced_at = None
+        self.generation = None
+        self._keys = None
+        self._pushed = collections.deque()
+
+    def load(self, rows, total, complete):
+        self.rows = {}
+        self.high_water = {"created_at": None, "responded_at": None}
+        self._keys = None
+        self.merge(rows, advance=True)
+        self.total = max(total or 0, len(self.rows))
+        self.complete = complete
+        self.loaded = True
+
+    def merge(self, rows, advance=False):
+        # Only rows read from storage advance the high-water marks: local
+        # writes and realtime pushes may be ahead of rows not yet seen.
+        for row in rows:
+            if row['id'] not in self.rows:
+                self.total += 1
+                self._keys = None
+            self.rows[row['id']] = {**self.rows.get(row['id'], {}), **row}
+            if advance:
+                for field, mark in self.high_water.items():
+                    if row.get(field) and (mark is None or row[field] > mark):
+                        self.high_water[field] = row[field]
+
+    def push(self, row):
+        # Called from the realtime thread; applied by drain() on the next rerun.
+        self._pushed.append(row)
+
+    def drain(self):
+        rows = []
+        while self._pushed:
+            rows.append(self._pushed.popleft())
+        self.merge(rows)
+        return len(rows)
+
+    def since(self, field):
+        # Before any answer has been seen, answers written after the load
+        # are at least as new as the newest doubt.
+        return _shift(self.high_water[field] or self.high_water['created_at'], self.overlap)
+
+    def due(self, poll_interval, feed=None):
+        # A live subscription that has not reconnected since the last sync
+        # makes polling unnecessary; a reconnect may have missed events.
+        if not self.loaded:
+            return True
+        if feed is not None and feed.live and feed.generation == self.generation:
+            return False
+        return self.synced_at is None or time.monotonic() - self.synced_at >= poll_interval
+
+    def mark_synced(self, generation=None):
+        self.synced_at = time.monotonic()
+        self.generation = generation
+
+    def page(self, cursor=None, limit=10):
+        # Keyset page over (created_at, id), newest first, in the shape of
+        # DatabaseManager.get_doubts_page; None when it reaches past the window.
+        if self._keys is None:
+            self._keys = sorted((row['created_at'], doubt_id) for doubt_id, row in self.rows.items())
+        end = bisect.bisect_left(self._keys, tuple(cursor)) if cursor else len(self._keys)
+        if end < limit and not self.complete:
+            return None
+        keys = self._keys[max(end - limit, 0):end][::-1]
+        # An incomplete window was loaded from a longer table, so older rows exist.
+        next_cursor = keys[-1] if keys and (end > limit or not self.complete) else None
+        return {"items": [self.rows[doubt_id] for _, doubt_id in keys], "next_cursor": next_cursor, "total": self.total}
+
+class DoubtFeed:
+    # One Supabase Realtime subscription to doubts per process, on its own
+    # event loop thread (each Streamlit rerun's loop ends with the rerun).
+    # Inserts and updates are pushed to every registered store. `generation`
+    # counts joins, so stores re-poll once after a reconnect.
+    def __init__(self, url, key):
+        self.url = url
+        self.key = key
+        self.live = False
+        self.generation = 0
+        self.logger = logging.getLogger(__name__)
+        self._stores = weakref.WeakSet()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="doubt-feed", daemon=True)
+                self._thread.start()
+        return self
+
+    def register(self, store):
+        with self._lock:
+            self._stores.add(store)
+
+    def _run(self):
+        try:
+            asyncio.run(self._listen())
+        except Exception as e:
+            self.logger.error("Doubt feed stopped, falling back to polling: %s", e)
+        finally:
+            self.live = False
+
+    async def _listen(self):
+        client = realtime.AsyncRealtimeClient(f"{self.url}/realtime/v1", self.key)
+        channel = client.channel("doubts-feed")
+        channel.on_postgres_changes("*", table="doubts", schema="public", callback=self.on_change)
+        await channel.subscribe(self.on_state)
+        # Older realtime releases block in listen(); newer ones read in a
+        # background task, so stay up for as long as the socket is.
+        await client.listen()
+        while client.is_connected:
+            await asyncio.sleep(1)
+
+    def on_state(self, state, error=None):
+        joined = str(getattr(state, "value", state)) == "SUBSCRIBED"
+        if joined and not self.live:
+            self.generation += 1
+        self.live = joined
+        if error:
+            self.logger.warning("Doubt feed %s: %s", state, error)
+
+    def on_change(self, payload):
+        record = (payload.get('data') or {}).get('record')
+        if not record or not record.get('id'):
+            return
+        with self._lock:
+            stores = list(self._stores)
+        for store in stores:
+            store.push(record)
@@ -0,0 +1,219 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Query instrumentation. DatabaseManager reports every round trip here with
+# its table, operation, duration, row count and response size. Queries are
+# summed per rerun (track_rerun) for the sidebar debug panel and a structured
+# log record, and per process for the optional Prometheus endpoint.
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+HTTP_OPERATIONS = {"GET": "select", "PATCH": "update", "DELETE": "delete"}
+
+settings = {"payload_sizes": True}
+
+def configure(config):
+    settings["payload_sizes"] = config.get('payload_sizes', True)
+
+def describe_query(query):
+    # (table, operation) for a postgrest builder, a SqliteClient builder or
+    # an RPC call from either.
+    path = getattr(query, "path", None)
+    if isinstance(path, str):
+        name = path.rsplit("/", 1)[-1]
+        if path.startswith("/rpc/"):
+            return name, "rpc"
+        if query.http_method == "POST":
+            return name, "upsert" if "resolution=" in query.headers.get("Prefer", "") else "insert"
+        return name, HTTP_OPERATIONS.get(query.http_method, query.http_method.lower())
+    table = getattr(query, "table", None)
+    if isinstance(table, str):
+        return table, query.action
+    name = getattr(getattr(query, "function", None), "__name__", None)
+    if isinstance(name, str):
+        return name, "rpc"
+    return "unknown", "unknown"
+
+def payload_size(data):
+    if data is None or not settings["payload_sizes"]:
+        return 0
+    return len(json.dumps(data, default=str, separators=(",", ":")))
+
+def row_count(data):
+    if isinstance(data, list):
+        return len(data)
+    return 0 if data is None else 1
+
+class RerunStats:
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.finished = None
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def record(self, table, operation, seconds, rows, size, ok):
+        with self._lock:
+            self.queries.append((table, operation, seconds, rows, size, ok))
+
+    def breakdown(self):
+        groups = {}
+        with self._lock:
+            queries = list(self.queries)
+        for table, operation, seconds, rows, size, ok in queries:
+            group = groups.setdefault((table, operation), {
+                "table": table, "operation": operation, "calls": 0, "errors": 0, "ms": 0.0, "rows": 0, "bytes": 0
+            })
+            group["calls"] += 1
+            group["errors"] += 0 if ok else 1
+            group["ms"] += seconds * 1000
+            group["rows"] += rows
+            group["bytes"] += size
+        return sorted(groups.values(), key=lambda group: -group["ms"])
+
+    def totals(self):
+        breakdown = self.breakdown()
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return {
+            "rerun_id": self.id,
+            "wall_ms": round((end - self.started) * 1000, 2),
+            "queries": sum(group["calls"] for group in breakdown),
+            "errors": sum(group["errors"] for group in breakdown),
+            "db_ms": round(sum(group["ms"] for group in breakdown), 2),
+            "rows": sum(group["rows"] for group in breakdown),
+            "bytes": sum(group["bytes"] for group in breakdown)
+        }
+
+class MetricsRegistry:
+    # Process-wide counters and latency histograms in Prometheus text format.
+    def __init__(self, prefix="tracker"):
+        self.prefix = prefix
+        self._queries = {}
+        self._reruns = self._histogram()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def register_counter(self, name, help_text, read):
+        # A counter kept elsewhere (e.g. log_pipeline's dropped records),
+        # read each time the metrics are rendered.
+        with self._lock:
+            self._counters[name] = (help_text, read)
+
+    def _histogram(self):
+        return {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0}
+
+    def _observe(self, histogram, seconds):
+        histogram["count"] += 1
+        histogram["sum"] += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+
+    def record_query(self, table, operation, seconds, rows, size, ok):
+        with self._lock:
+            entry = self._queries.setdefault((table, operation), {"errors": 0, "rows": 0, "bytes": 0, "latency": self._histogram()})
+            entry["errors"] += 0 if ok else 1
+            entry["rows"] += rows
+            entry["bytes"] += size
+            self._observe(entry["latency"], seconds)
+
+    def record_rerun(self, seconds):
+        with self._lock:
+            self._observe(self._reruns, seconds)
+
+    def render(self):
+        p = self.prefix
+        lines = []
+        with self._lock:
+            queries = sorted(self._queries.items())
+            lines += [f"# HELP {p}_db_query_seconds Database round-trip latency.", f"# TYPE {p}_db_query_seconds histogram"]
+            for (table, operation), entry in queries:
+                lines += _histogram_lines(f"{p}_db_query_seconds", f'table="{table}",operation="{operation}"', entry["latency"])
+            for name, key, help_text in (
+                ("db_query_errors_total", "errors", "Failed database round trips."),
+                ("db_rows_total", "rows", "Rows returned by database round trips."),
+                ("db_response_bytes_total", "bytes", "JSON size of database responses.")
+            ):
+                lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} counter"]
+                for (table, operation), entry in queries:
+                    lines.append(f'{p}_{name}{{table="{table}",operation="{operation}"}} {entry[key]}')
+            lines += [f"# HELP {p}_rerun_seconds Streamlit rerun duration.", f"# TYPE {p}_rerun_seconds histogram"]
+            lines += _histogram_lines(f"{p}_rerun_seconds", "", self._reruns)
+            for name, (help_text, read) in sorted(self._counters.items()):
+                lines += [f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} counter", f"{p}_{name} {read()}"]
+        return "\n".join(lines) + "\n"
+
+def _histogram_lines(name, labels, histogram):
+    prefix = f"{labels}," if labels else ""
+    lines = [f'{name}_bucket{{{prefix}le="{bound}"}} {count}' for bound, count in zip(BUCKETS, histogram["buckets"])]
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram["count"]}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram['sum']}")
+    lines.append(f"{name}_count{suffix} {histogram['count']}")
+    return lines
+
+metrics = MetricsRegistry()
+_current = contextvars.ContextVar("rerun_stats", default=None)
+
+def record_query(table, operation, seconds, data, ok=True):
+    rows, size = row_count(data), payload_size(data)
+    metrics.record_query(table, operation, seconds, rows, size, ok)
+    rerun = _current.get()
+    if rerun is not None:
+        rerun.record(table, operation, seconds, rows, size, ok)
+
+def current_rerun():
+    return _current.get()
+
+@contextmanager
+def track_rerun():
+    # Tasks started inside the block (asyncio.gather included) inherit the
+    # context, so their queries land in the same RerunStats.
+    rerun = RerunStats()
+    token = _current.set(rerun)
+    try:
+        yield rerun
+    finally:
+        _current.reset(token)
+        rerun.finished = time.perf_counter()
+        metrics.record_rerun(rerun.finished - rerun.started)
+        totals = rerun.totals()
+        totals["breakdown"] = rerun.breakdown()
+        logger.info("rerun_stats", extra={"rerun_stats": totals})
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port, host="127.0.0.1"):
+    # One /metrics listener per process; later calls return the running one.
+    # The endpoint has no authentication, so it binds to loopback unless a
+    # host is configured.
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            logger.info("Serving Prometheus metrics on %s:%s/metrics", host, _server.server_address[1])
+        return _server
@@ -0,0 +1,30 @@
+-- Append-only study log store. Check-ins insert one row here instead of
+-- rewriting the users.logs JSON array.
+create table if not exists study_logs (
+    id uuid primary key default gen_random_uuid(),
+    user_id uuid not null references users (id) on delete cascade,
+    date date not null,
+    subject text,
+    topics jsonb not null default '[]'::jsonb,
+    notes text,
+    timestamp timestamptz not null default now(),
+    unique (user_id, timestamp)
+);
+
+create index if not exists study_logs_user_id_timestamp_idx on study_logs (user_id, timestamp);
+
+-- Backfill existing users.logs arrays, then clear the column. Safe to re-run:
+-- rows already copied are skipped by the (user_id, timestamp) constraint.
+insert into study_logs (user_id, date, subject, topics, notes, timestamp)
+select
+    u.id,
+    (log ->> 'date')::date,
+    log ->> 'subject',
+    coalesce(log -> 'topics', '[]'::jsonb),
+    log ->> 'notes',
+    coalesce((log ->> 'timestamp')::timestamptz, (log ->> 'date')::timestamptz)
+from users u
+cross join lateral jsonb_array_elements(coalesce(u.logs, '[]'::jsonb)) as log
+on conflict (user_id, timestamp) do nothing;
+
+update users set logs = '[]'::jsonb where logs is not null and logs <> '[]'::jsonb;
@@ -0,0 +1,24 @@
+-- Atomic gamification writes. Each call is a single UPDATE, so concurrent
+-- sessions for the same user never overwrite each other's points or badges.
+create or replace function increment_user_points(p_user_id uuid, p_amount integer)
+returns integer
+language sql
+as $$
+    update users
+    set points = coalesce(points, 0) + p_amount
+    where id = p_user_id
+    returning points;
+$$;
+
+create or replace function append_user_badge(p_user_id uuid, p_badge text)
+returns jsonb
+language sql
+as $$
+    update users
+    set badges = case
+        when coalesce(badges, '[]'::jsonb) ? p_badge then badges
+        else coalesce(badges, '[]'::jsonb) || to_jsonb(p_badge)
+    end
+    where id = p_user_id
+    returning badges;
+$$;
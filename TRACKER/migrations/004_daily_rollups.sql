@@ -0,0 +1,53 @@
+-- Per-user, per-day, per-subject check-in aggregates for the dashboard.
+create table if not exists daily_rollups (
+    user_id uuid not null references users (id) on delete cascade,
+    day date not null,
+    subject text not null default '',
+    checkins integer not null default 0,
+    topics integer not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, day, subject)
+);
+
+-- Every check-in path writes study_logs, so the rollup is maintained by a
+-- trigger in the same transaction rather than by each caller.
+create or replace function bump_daily_rollup()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into daily_rollups (user_id, day, subject, checkins, topics, updated_at)
+    values (new.user_id, new.date, coalesce(new.subject, ''), 1, jsonb_array_length(coalesce(new.topics, '[]'::jsonb)), now())
+    on conflict (user_id, day, subject) do update
+    set checkins = daily_rollups.checkins + 1,
+        topics = daily_rollups.topics + excluded.topics,
+        updated_at = now();
+    return new;
+end;
+$$;
+
+drop trigger if exists study_logs_daily_rollup on study_logs;
+create trigger study_logs_daily_rollup
+after insert on study_logs
+for each row execute function bump_daily_rollup();
+
+-- Rebuilds rollups from study_logs, for one user or (with null) everyone.
+create or replace function backfill_daily_rollups(p_user_id uuid default null)
+returns integer
+language plpgsql
+as $$
+declare
+    affected integer;
+begin
+    delete from daily_rollups where p_user_id is null or user_id = p_user_id;
+    insert into daily_rollups (user_id, day, subject, checkins, topics, updated_at)
+    select user_id, date, coalesce(subject, ''), count(*), sum(jsonb_array_length(coalesce(topics, '[]'::jsonb))), now()
+    from study_logs
+    where p_user_id is null or user_id = p_user_id
+    group by user_id, date, coalesce(subject, '');
+    get diagnostics affected = row_count;
+    return affected;
+end;
+$$;
+
+select backfill_daily_rollups();
@@ -0,0 +1,58 @@
+-- Quiz question banks, grouped by the topics teachers publish in class_data,
+-- and one row per submitted attempt (quiz.py). Answers are buffered in the
+-- session and written once, with the score, when the attempt is submitted.
+create table if not exists quiz_questions (
+    id uuid primary key default gen_random_uuid(),
+    topic text not null,
+    prompt text not null,
+    options jsonb not null,
+    answer integer not null,
+    explanation text,
+    created_by uuid references users (id) on delete set null,
+    created_at timestamptz not null default now()
+);
+create index if not exists quiz_questions_topic_idx on quiz_questions (topic);
+
+create table if not exists quiz_attempts (
+    id uuid primary key,
+    user_id uuid not null references users (id) on delete cascade,
+    topic text not null,
+    question_ids jsonb not null,
+    answers jsonb not null,
+    score integer not null,
+    total integer not null,
+    started_at timestamptz not null,
+    submitted_at timestamptz not null default now()
+);
+create index if not exists quiz_attempts_user_id_submitted_at_idx on quiz_attempts (user_id, submitted_at desc);
+
+-- Class-wide results per topic. Maintained by trigger in the submitting
+-- transaction, so reading them is one row per topic, not a scan of attempts.
+create table if not exists quiz_topic_stats (
+    topic text primary key,
+    attempts integer not null default 0,
+    correct integer not null default 0,
+    questions integer not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create or replace function bump_quiz_topic_stats()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into quiz_topic_stats (topic, attempts, correct, questions, updated_at)
+    values (new.topic, 1, new.score, new.total, now())
+    on conflict (topic) do update
+    set attempts = quiz_topic_stats.attempts + 1,
+        correct = quiz_topic_stats.correct + excluded.correct,
+        questions = quiz_topic_stats.questions + excluded.questions,
+        updated_at = now();
+    return new;
+end;
+$$;
+
+drop trigger if exists quiz_attempts_topic_stats on quiz_attempts;
+create trigger quiz_attempts_topic_stats
+after insert on quiz_attempts
+for each row execute function bump_quiz_topic_stats();
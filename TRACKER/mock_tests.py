@@ -0,0 +1,55 @@
+import datetime
+import random
+from quiz import SKIPPED
+
+# Timed mock tests (migrations/009). Start, deadline and submission times
+# come from the database clock: the page keeps only the offset between that
+# clock and its own to show the time left. Picks are staged in
+# DatabaseManager.mock_answers and autosaved in coalesced batches; the
+# submit RPC scores the session in one pass and adds it to the sharded
+# per-question counters, so teachers read sums instead of recomputing.
+
+def parse_time(value):
+    # Postgres returns offsets, SQLite naive UTC.
+    moment = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return moment if moment.tzinfo else moment.replace(tzinfo=datetime.timezone.utc)
+
+def utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+def clock_offset(server_now, now=None):
+    # Seconds the database clock is ahead of this process's clock.
+    return (parse_time(server_now) - (now or utcnow())).total_seconds()
+
+def remaining_seconds(session, offset=0.0, now=None):
+    server_now = (now or utcnow()) + datetime.timedelta(seconds=offset)
+    return max((parse_time(session['deadline']) - server_now).total_seconds(), 0.0)
+
+def option_order(session_id, question):
+    # Shuffled per session but stable across reruns and reconnects.
+    count = len(question['options'])
+    return random.Random(f"{session_id}:{question['id']}").sample(range(count), count)
+
+def test_questions(test, pool):
+    by_id = {question['id']: question for question in pool}
+    return [by_id[question_id] for question_id in test['question_ids'] if question_id in by_id]
+
+def result_view(questions, session):
+    # The shape PageRenderer.render_quiz_result shows.
+    answers = [session['answers'].get(question['id'], SKIPPED) for question in questions]
+    return {
+        "questions": questions,
+        "answers": answers,
+        "correct": [answer == question['answer'] for answer, question in zip(answers, questions)],
+        "score": session.get('score') or 0,
+        "total": session.get('total') or len(questions)
+    }
+
+def aggregate_stats(rows):
+    # Sums the shards of mock_question_stats per question.
+    stats = {}
+    for row in rows:
+        entry = stats.setdefault(row['question_id'], {"attempts": 0, "correct": 0, "skipped": 0})
+        for key in entry:
+            entry[key] += row[key]
+    return stats
@@ -1,11 +1,24 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
 import datetime
+import math
+import os
+import tempfile
 import uuid
-from ratelimit import limits, sleep_and_retry
 import logging
 import asyncio
+from database import UserIdentityMap
+from analytics import engine as analytics_engine
+import export
+from doubt_store import DoubtStore
+from rate_limiter import get_limiter
+from similarity import doubt_text
+import mock_tests
+import quiz
+from utils import lazy_import
+
+# Charting dependencies are only imported when a page first draws a chart.
+pd = lazy_import("pandas")
+alt = lazy_import("altair")
 
 class PageRenderer:
     def __init__(self, db_manager, t, config):
@@ -14,6 +27,13 @@ class PageRenderer:
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.items_per_page = config['app'].get('items_per_page', 10)
+        self.users = UserIdentityMap(db_manager)
+        self.class_data = None
+        self.doubt_limiter = get_limiter("doubts", config.get('rate_limits', {}).get('doubts', {}), db_manager)
+        self.similarity = config.get('similarity', {})
+        self.doubt_sync = config.get('doubt_sync', {})
+        self.quizzes = config.get('quizzes', {})
+        self.mock_tests = config.get('mock_tests', {})
 
     def render_sidebar(self, user):
         st.sidebar.header(f"{self.t('welcome').format(name=user['name'], role=user['role'].capitalize())}")
@@ -65,7 +85,7 @@ class PageRenderer:
                 if st.button(self.t("next")) and goals:
                     user_data['goals'] = goals
                     st.session_state.onboarding_step = current_step + 1
-                    await self.db_manager.update_user(user['id'], user_data)
+                    await self.db_manager.patch_user(user['id'], st.session_state.user_snapshot, user_data)
                     st.rerun()
             elif step['action'] == 'preferences':
                 col1, col2 = st.columns(2)
@@ -82,7 +102,7 @@ class PageRenderer:
                     }
                     st.session_state.language = language
                     st.session_state.onboarding_step = current_step + 1
-                    await self.db_manager.update_user(user['id'], user_data)
+                    await self.db_manager.patch_user(user['id'], st.session_state.user_snapshot, user_data)
                     st.rerun()
             elif step['action'] == 'first_checkin':
                 with st.form("onboarding_checkin"):
@@ -98,9 +118,17 @@ class PageRenderer:
                                 "notes": notes,
                                 "timestamp": datetime.datetime.utcnow().isoformat()
                             }
-                            user_data['logs'].append(first_log)
+                            saved_log = await self.db_manager.append_log(user['id'], first_log)
+                            user_data['logs'].append(saved_log or first_log)
                             user_data['onboarded'] = True
-                            await self.db_manager.update_user(user['id'], user_data)
+                            await self.db_manager.patch_user(user['id'], st.session_state.user_snapshot, user_data)
+                            # Onboarding is a commit point: write the buffered
+                            # goals, preferences and flag now.
+                            try:
+                                await self.db_manager.commit_user(user['id'])
+                            except Exception:
+                                st.error(self.t("save_error"))
+                                return
                             st.success(self.t("onboarding_complete"))
                             st.rerun()
             else:
@@ -109,6 +137,28 @@ class PageRenderer:
                     st.rerun()
         st.progress((current_step + 1) / len(steps))
 
+    async def render_dashboard_page(self, user, user_data):
+        st.header(self.t("dashboard"))
+        today = datetime.date.today()
+        since = today - datetime.timedelta(days=self.config['app'].get('dashboard_days', 30) - 1)
+        rollups = await self.db_manager.get_rollups(user['id'], since.isoformat())
+        if not rollups:
+            st.info(self.t("no_logs"))
+            return
+        frame = pd.DataFrame.from_records(rollups)
+        daily = frame.groupby("day")["checkins"].sum()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric(self.t("points"), user_data.get('points', 0))
+        col2.metric(self.t("checkins_today"), int(daily.get(today.isoformat(), 0)))
+        col3.metric(self.t("checkins_period"), int(daily.sum()))
+        col4.metric(self.t("active_days"), int((daily > 0).sum()))
+        st.subheader(self.t("daily_checkins"))
+        st.altair_chart(alt.Chart(frame).mark_bar().encode(
+            x=alt.X('day:T', title=None),
+            y=alt.Y('sum(checkins):Q', title=self.t("checkins")),
+            color=alt.Color('subject:N', title=self.t("subject"))
+        ), use_container_width=True)
+
     async def render_history_page(self, user, user_data):
         st.header(self.t("history"))
         logs = user_data.get('logs', []) if user['role'] == 'student' else []
@@ -126,53 +176,128 @@ class PageRenderer:
                 st.write(f"**{self.t('notes')}:** {log.get('notes', self.t('no_notes'))}")
         st.write(f"{self.t('page')} {page} {self.t('of')} {total_pages}")
 
-    @sleep_and_retry
-    @limits(calls=5, period=60)  # 5 doubts per minute
+    async def render_analytics_page(self, user, user_data):
+        st.header(self.t("analytics"))
+        logs = user_data.get('logs', []) if user['role'] == 'student' else []
+        if not logs:
+            st.info(self.t("no_logs"))
+            return
+        result = analytics_engine.analyze(user['id'], logs)
+        col1, col2, col3 = st.columns(3)
+        col1.metric(self.t("current_streak"), result['streaks']['current'])
+        col2.metric(self.t("longest_streak"), result['streaks']['longest'])
+        col3.metric(self.t("total_checkins"), result['total'])
+        st.subheader(self.t("subjects_breakdown"))
+        st.altair_chart(alt.Chart(result['subjects']).mark_bar().encode(
+            x=alt.X('count:Q', title=self.t("checkins")),
+            y=alt.Y('subject:N', sort='-x', title=self.t("subject"))
+        ), use_container_width=True)
+        st.subheader(self.t("weekly_activity"))
+        st.altair_chart(alt.Chart(result['heatmap']).mark_rect().encode(
+            x=alt.X('week:T', title=self.t("week")),
+            y=alt.Y('weekday:O', sort=None, title=None),
+            color=alt.Color('count:Q', title=self.t("checkins"))
+        ), use_container_width=True)
+        st.subheader(self.t("topic_recurrence"))
+        st.dataframe(result['topics'], use_container_width=True, hide_index=True)
+
     async def render_doubts_page(self, user, user_data):
         st.header(self.t("doubts"))
         st.subheader(self.t("ask_doubt"))
-        topics = set(t for log in user_data['logs'] for t in log.get('topics', [])).union(
-            t for cd in await self.db_manager.get_class_data() for t in cd.get('topics', [])
-        )
-        with st.form("doubt_form"):
-            topic = st.selectbox(self.t("topic"), list(topics) + ["Other"])
-            if topic == "Other":
-                topic = st.text_input(self.t("custom_topic"))
-            question = st.text_area(self.t("question"), placeholder=self.t("question_placeholder"))
-            if st.form_submit_button(self.t("submit_doubt")):
-                if topic and question:
-                    doubt_data = {
-                        "id": str(uuid.uuid4()),
-                        "user_id": user['id'],
-                        "topic": topic,
-                        "question": question,
-                        "created_at": datetime.datetime.utcnow().isoformat()
-                    }
-                    with st.spinner(self.t("submitting_doubt")):
-                        if await self.db_manager.insert_doubt(doubt_data):
-                            st.markdown(f"<div class='success-message'>{self.t('doubt_submitted')} (+2 {self.t('points')})</div>", unsafe_allow_html=True)
-                            user_data['points'] = user_data.get('points', 0) + 2
-                            await self.db_manager.update_user(user['id'], user_data)
-                            self.logger.info(f"Doubt submitted by user {user['id']}")
-                        else:
-                            st.error(self.t("doubt_submit_error"))
+        topics = await self.db_manager.get_topic_suggestions(user['id'], class_data=self.class_data)
+        # Not a form: editing the question reruns the page, so answered
+        # lookalikes show up before the doubt is submitted.
+        topic = st.selectbox(self.t("topic"), topics + ["Other"], key="doubt_topic")
+        if topic == "Other":
+            topic = st.text_input(self.t("custom_topic"), key="doubt_custom_topic")
+        question = st.text_area(self.t("question"), placeholder=self.t("question_placeholder"), key="doubt_question")
+        if question.strip():
+            await self.render_similar_doubts(topic, question)
+        if st.button(self.t("submit_doubt"), key="submit_doubt"):
+            allowed, retry_after = await self.doubt_limiter.try_acquire(user['id']) if topic and question else (False, 0)
+            if allowed:
+                doubt_data = {
+                    "id": str(uuid.uuid4()),
+                    "user_id": user['id'],
+                    "topic": topic,
+                    "question": question,
+                    "created_at": datetime.datetime.utcnow().isoformat()
+                }
+                with st.spinner(self.t("submitting_doubt")):
+                    if await self.db_manager.insert_doubt(doubt_data):
+                        self.doubt_store().merge([doubt_data])
+                        st.markdown(f"<div class='success-message'>{self.t('doubt_submitted')} (+2 {self.t('points')})</div>", unsafe_allow_html=True)
+                        user_data['points'] = await self.db_manager.increment_points(user['id'], 2)
+                        st.session_state.doubts_cursors = [None]
+                        self.logger.info("Doubt submitted by user %s", user['id'])
+                    else:
+                        st.error(self.t("doubt_submit_error"))
+            elif retry_after is None:
+                st.error(self.t("doubt_limit_unavailable"))
+            elif retry_after:
+                st.warning(self.t("doubt_rate_limited").format(seconds=math.ceil(retry_after)))
+        st.subheader(self.t("search_doubts"))
+        query = st.text_input(self.t("search_query"), placeholder=self.t("search_placeholder"), key="doubt_search_query")
+        if query.strip():
+            await self.render_doubt_search(user, query.strip(), topics)
+            return
         st.subheader(self.t("all_doubts"))
-        doubts = await self.db_manager.get_doubts()
+        cursors = st.session_state.setdefault('doubts_cursors', [None])
+        store = self.doubt_store()
+        await self.db_manager.sync_doubt_store(
+            store, self.doubt_sync.get('window', 200), self.doubt_sync.get('poll_interval', 10), self.doubt_sync.get('max_changes', 500)
+        )
+        doubts_page = store.page(cursors[-1], self.items_per_page)
+        if doubts_page is None:
+            doubts_page = await self.db_manager.get_doubts_page(cursors[-1], self.items_per_page, columns="card")
+        if cursors[-1] is None:
+            st.session_state.doubts_total = doubts_page['total'] or 0
+        doubts = doubts_page['items']
         if not doubts:
             st.info(self.t("no_doubts"))
             return
-        total_pages = (len(doubts) + self.items_per_page - 1) // self.items_per_page
-        page = st.number_input(self.t("doubts_page_number"), min_value=1, max_value=max(total_pages, 1), value=1)
-        start_idx = (page - 1) * self.items_per_page
-        end_idx = start_idx + self.items_per_page
-        paginated_doubts = doubts[start_idx:end_idx]
-        for doubt in reversed(paginated_doubts):
+        await self.render_doubt_cards(user, doubts)
+        total_pages = max((st.session_state.get('doubts_total', 0) + self.items_per_page - 1) // self.items_per_page, len(cursors))
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if len(cursors) > 1 and st.button(self.t("previous"), key="doubts_previous"):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            st.write(f"{self.t('page')} {len(cursors)} {self.t('of')} {total_pages}")
+        with col3:
+            if doubts_page['next_cursor'] and st.button(self.t("next"), key="doubts_next"):
+                cursors.append(doubts_page['next_cursor'])
+                st.rerun()
+
+    def doubt_store(self):
+        if 'doubt_store' not in st.session_state:
+            st.session_state.doubt_store = DoubtStore(self.doubt_sync.get('overlap', 30))
+        return st.session_state.doubt_store
+
+    async def render_similar_doubts(self, topic, question):
+        similar = await self.db_manager.get_similar_doubts(
+            doubt_text({"topic": topic, "question": question}),
+            self.similarity.get('limit', 3),
+            self.similarity.get('min_score', 0.5)
+        )
+        if not similar:
+            return
+        st.info(self.t("similar_doubts"))
+        for doubt, score in similar:
+            with st.expander(f"{doubt['topic']} - {doubt['question'][:80]} ({score:.0%})"):
+                st.write(f"**{self.t('question')}:** {doubt['question']}")
+                st.write(f"**{self.t('response')}:** {doubt['response']}")
+
+    async def render_doubt_cards(self, user, doubts):
+        await self.users.load(doubt.get('response_by') for doubt in doubts if doubt.get('response'))
+        for doubt in doubts:
             with st.expander(f"{doubt['topic']} - {doubt['created_at'][:10]}"):
                 st.markdown(f"<div class='doubt-card'>**{self.t('question')}:** {doubt['question']}</div>", unsafe_allow_html=True)
                 if doubt.get('response'):
                     st.write(f"**{self.t('response')}:** {doubt['response']}")
-                    responder = await self.db_manager.get_user_by_id(doubt['response_by'])
-                    st.write(f"**{self.t('responded_by')}:** {responder['name']}")
+                    responder = self.users.get(doubt['response_by'])
+                    st.write(f"**{self.t('responded_by')}:** {responder.get('name', '')}")
                     st.write(f"**{self.t('responded_at')}:** {doubt['responded_at'][:10]}")
                 else:
                     st.info(self.t("no_response"))
@@ -187,17 +312,374 @@ class PageRenderer:
                                         "responded_at": datetime.datetime.utcnow().isoformat()
                                     }
                                     if await self.db_manager.update_doubt_response(doubt['id'], response_data):
+                                        self.doubt_store().merge([{**doubt, **response_data}])
                                         st.success(self.t("response_submitted"))
-                                        self.logger.info(f"Response submitted for doubt {doubt['id']}")
+                                        self.logger.info("Response submitted for doubt %s", doubt['id'])
                                     else:
                                         st.error(self.t("response_submit_error"))
 
+    async def render_doubt_search(self, user, query, topics):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            topic = st.selectbox(self.t("topic"), [""] + topics, format_func=lambda topic: topic or self.t("all_topics"), key="doubt_search_topic")
+        with col2:
+            status = st.selectbox(self.t("status"), ["all", "answered", "unanswered"], format_func=lambda status: self.t(f"status_{status}"), key="doubt_search_status")
+        with col3:
+            dates = st.date_input(self.t("date_range"), value=(), key="doubt_search_dates")
+        filters = {
+            "topic": topic,
+            "answered": {"answered": True, "unanswered": False}.get(status),
+            "since": dates[0] if len(dates) > 0 else None,
+            "until": dates[1] if len(dates) > 1 else None
+        }
+        # A new query or filter starts again from the first page.
+        search_key = (query, topic, status, tuple(dates))
+        if st.session_state.get('doubt_search_key') != search_key:
+            st.session_state.doubt_search_key = search_key
+            st.session_state.doubt_search_page = 0
+        page = st.session_state.doubt_search_page
+        results = await self.db_manager.search_doubts(query, filters, page, self.items_per_page)
+        if not results['items']:
+            st.info(self.t("no_search_results"))
+            return
+        st.caption(self.t("search_results").format(count=results['total']))
+        await self.render_doubt_cards(user, results['items'])
+        total_pages = max((results['total'] + self.items_per_page - 1) // self.items_per_page, 1)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if page > 0 and st.button(self.t("previous"), key="doubt_search_previous"):
+                st.session_state.doubt_search_page = page - 1
+                st.rerun()
+        with col2:
+            st.write(f"{self.t('page')} {page + 1} {self.t('of')} {total_pages}")
+        with col3:
+            if results['next_page'] is not None and st.button(self.t("next"), key="doubt_search_next"):
+                st.session_state.doubt_search_page = results['next_page']
+                st.rerun()
+
+    async def render_quizzes_page(self, user, user_data):
+        st.header(self.t("quizzes"))
+        class_data = await self.db_manager.get_class_data("summary")
+        topics = sorted({topic for row in class_data for topic in row.get('topics') or []})
+        if not topics:
+            st.info(self.t("no_quiz_topics"))
+            return
+        if user['role'] == 'teacher' and user.get('teacher_credentials', {}).get('verified'):
+            await self.render_quiz_question_form(user, topics)
+        attempt = st.session_state.get('quiz_attempt')
+        if attempt is not None:
+            await self.render_quiz_attempt(attempt)
+        else:
+            topic = st.selectbox(self.t("topic"), topics, key="quiz_topic")
+            if st.button(self.t("start_quiz"), key="start_quiz"):
+                pool = await self.db_manager.get_quiz_pool(topic)
+                if pool:
+                    st.session_state.quiz_attempt = quiz.new_attempt(user['id'], topic, pool, self.quizzes.get('questions_per_attempt', 10))
+                    st.session_state.pop('quiz_result', None)
+                    st.rerun()
+                else:
+                    st.info(self.t("no_quiz_questions"))
+            if st.session_state.get('quiz_result'):
+                self.render_quiz_result(st.session_state.quiz_result)
+        st.subheader(self.t("class_results"))
+        stats = await self.db_manager.get_quiz_topic_stats(tuple(topics))
+        if stats:
+            st.dataframe(pd.DataFrame([{
+                self.t("topic"): row['topic'],
+                self.t("attempts"): row['attempts'],
+                self.t("average_score"): f"{row['correct'] / row['questions']:.0%}" if row['questions'] else "-"
+            } for row in stats]), hide_index=True)
+        else:
+            st.info(self.t("no_quiz_results"))
+
+    async def render_quiz_attempt(self, attempt):
+        # A form, so picking answers does not rerun the page; the picks are
+        # kept in session state under per-question keys until submit.
+        with st.form(f"quiz_{attempt['id']}"):
+            for i, question in enumerate(attempt['questions']):
+                options = quiz.shown_options(question)
+                st.radio(
+                    f"{i + 1}. {question['prompt']}", list(range(len(options))),
+                    format_func=lambda position, options=options: options[position], index=None, key=f"quiz_{attempt['id']}_{i}"
+                )
+            submitted = st.form_submit_button(self.t("submit_quiz"))
+        if not submitted:
+            return
+        chosen = [st.session_state.get(f"quiz_{attempt['id']}_{i}") for i in range(len(attempt['questions']))]
+        graded = quiz.grade(attempt, chosen)
+        if await self.db_manager.submit_quiz_attempt(quiz.attempt_row(attempt, graded)):
+            st.session_state.quiz_result = {"questions": attempt['questions'], **graded}
+            del st.session_state.quiz_attempt
+            self.logger.info("Quiz attempt %s submitted by user %s", attempt['id'], attempt['user_id'])
+            st.rerun()
+        else:
+            # The attempt and its picks stay in the session for another try.
+            st.error(self.t("quiz_submit_error"))
+
+    def render_quiz_result(self, result):
+        st.success(self.t("quiz_score").format(score=result['score'], total=result['total']))
+        for i, (question, picked, correct) in enumerate(zip(result['questions'], result['answers'], result['correct'])):
+            with st.expander(f"{'✅' if correct else '❌'} {i + 1}. {question['prompt']}"):
+                your_answer = question['options'][picked] if picked != quiz.SKIPPED else self.t("skipped")
+                st.write(f"**{self.t('your_answer')}:** {your_answer}")
+                st.write(f"**{self.t('correct_answer')}:** {question['options'][question['answer']]}")
+                if question.get('explanation'):
+                    st.write(question['explanation'])
+
+    async def render_quiz_question_form(self, user, topics):
+        with st.expander(self.t("add_quiz_question")):
+            with st.form("quiz_question_form", clear_on_submit=True):
+                topic = st.selectbox(self.t("topic"), topics, key="quiz_question_topic")
+                prompt = st.text_area(self.t("quiz_prompt"))
+                options = quiz.parse_options(st.text_area(self.t("quiz_options")))
+                answer = st.number_input(self.t("quiz_answer"), min_value=1, step=1)
+                explanation = st.text_input(self.t("quiz_explanation"))
+                if st.form_submit_button(self.t("add_quiz_question")):
+                    if not prompt or len(options) < 2 or answer > len(options):
+                        st.warning(self.t("quiz_question_invalid"))
+                        return
+                    try:
+                        await self.db_manager.insert_quiz_question({
+                            "topic": topic,
+                            "prompt": prompt,
+                            "options": options,
+                            "answer": int(answer) - 1,
+                            "explanation": explanation or None,
+                            "created_by": user['id'],
+                            "created_at": datetime.datetime.utcnow().isoformat()
+                        })
+                        st.success(self.t("quiz_question_added"))
+                    except Exception:
+                        st.error(self.t("quiz_question_error"))
+
+    async def render_mock_tests_page(self, user, user_data):
+        st.header(self.t("mock_tests"))
+        is_teacher = user['role'] == 'teacher' and user.get('teacher_credentials', {}).get('verified')
+        if is_teacher:
+            class_data = await self.db_manager.get_class_data("summary")
+            topics = sorted({topic for row in class_data for topic in row.get('topics') or []})
+            if topics:
+                await self.render_mock_test_form(user, topics)
+        tests = await self.db_manager.get_mock_tests()
+        if not tests:
+            st.info(self.t("no_mock_tests"))
+            return
+        by_id = {test['id']: test for test in tests}
+        session = st.session_state.get('mock_session')
+        if session is not None and session['test_id'] in by_id:
+            test = by_id[session['test_id']]
+            pool = await self.db_manager.get_quiz_pool(test['topic'])
+            questions = mock_tests.test_questions(test, pool)
+            if session.get('submitted_at'):
+                st.subheader(test['title'])
+                self.render_quiz_result(mock_tests.result_view(questions, session))
+                if st.button(self.t("back_to_mock_tests"), key="mock_back"):
+                    del st.session_state.mock_session
+                    st.rerun()
+            else:
+                await self.render_mock_session(test, questions, session)
+        else:
+            test_id = st.selectbox(
+                self.t("mock_test"), list(by_id), key="mock_test_id",
+                format_func=lambda test_id: self.t("mock_test_label").format(**by_id[test_id])
+            )
+            if st.button(self.t("start_mock_test"), key="start_mock_test"):
+                try:
+                    session = await self.db_manager.start_mock_test(test_id, user['id'])
+                except Exception:
+                    session = None
+                if session:
+                    # Reopening a started test returns the same session, with
+                    # its original deadline and the answers saved so far.
+                    st.session_state.mock_clock_offset = mock_tests.clock_offset(session['server_now'])
+                    st.session_state.mock_session = session
+                    st.rerun()
+                else:
+                    st.error(self.t("mock_start_error"))
+        if is_teacher:
+            await self.render_mock_test_stats(by_id)
+
+    async def render_mock_session(self, test, questions, session):
+        session_id = session['id']
+        remaining = mock_tests.remaining_seconds(session, st.session_state.get('mock_clock_offset', 0.0))
+        st.subheader(test['title'])
+        self.render_mock_timer(session)
+        # Not a form: each pick reruns the page and is staged for autosave,
+        # so reopening the test after a reload restores it.
+        answers = {}
+        for i, question in enumerate(questions):
+            order = mock_tests.option_order(session_id, question)
+            saved = session['answers'].get(question['id'])
+            key = f"mock_{session_id}_{question['id']}"
+            st.radio(
+                f"{i + 1}. {question['prompt']}", order,
+                format_func=lambda option, question=question: question['options'][option],
+                index=order.index(saved) if saved in order else None, key=key
+            )
+            picked = st.session_state.get(key, saved)
+            if picked is not None:
+                answers[question['id']] = picked
+        changed = {question_id: option for question_id, option in answers.items() if session['answers'].get(question_id) != option}
+        if changed:
+            self.db_manager.stage_mock_answers(session_id, changed)
+            session['answers'].update(changed)
+        # A background autosave failed; the picks stay queued and are retried.
+        if self.db_manager.mock_answers.pop_error(session_id):
+            st.warning(self.t("mock_autosave_error"))
+        submitted = st.button(self.t("submit_mock_test"), key=f"mock_submit_{session_id}")
+        if not submitted and remaining > 0:
+            return
+        # Past the deadline the page submits by itself; the database decides
+        # which of these answers still count.
+        try:
+            result = await self.db_manager.submit_mock_test(session_id, answers, self.mock_tests.get('grace_seconds', 30))
+        except Exception:
+            result = None
+        if result:
+            st.session_state.mock_session = result
+            self.logger.info("Mock test session %s submitted", session_id)
+            st.rerun()
+        else:
+            st.error(self.t("mock_submit_error"))
+
+    @st.fragment(run_every=1)
+    def render_mock_timer(self, session):
+        # Reruns on its own every second; at the deadline it reruns the whole
+        # page once, which submits the session. Sessions nobody reruns are
+        # scored by finalize_mock_tests.
+        remaining = mock_tests.remaining_seconds(session, st.session_state.get('mock_clock_offset', 0.0))
+        st.metric(self.t("time_left"), f"{int(remaining) // 60:02d}:{int(remaining) % 60:02d}")
+        if remaining <= 0 and st.session_state.get('mock_expired') != session['id']:
+            st.session_state.mock_expired = session['id']
+            st.rerun()
+
+    async def render_mock_test_form(self, user, topics):
+        with st.expander(self.t("create_mock_test")):
+            with st.form("mock_test_form", clear_on_submit=True):
+                title = st.text_input(self.t("mock_test_title"))
+                topic = st.selectbox(self.t("topic"), topics, key="mock_test_topic")
+                size = st.number_input(self.t("mock_test_questions"), min_value=1, value=self.quizzes.get('questions_per_attempt', 10), step=1)
+                duration = st.number_input(self.t("mock_test_duration"), min_value=1, value=30, step=5)
+                if st.form_submit_button(self.t("create_mock_test")):
+                    pool = await self.db_manager.get_quiz_pool(topic)
+                    if not title or not pool:
+                        st.warning(self.t("mock_test_invalid"))
+                        return
+                    # Every student gets the same questions; option order is
+                    # shuffled per session.
+                    questions = quiz.new_attempt(user['id'], topic, pool, int(size))['questions']
+                    try:
+                        await self.db_manager.create_mock_test({
+                            "title": title,
+                            "topic": topic,
+                            "question_ids": [question['id'] for question in questions],
+                            "duration_minutes": int(duration),
+                            "created_by": user['id'],
+                            "created_at": datetime.datetime.utcnow().isoformat()
+                        })
+                        st.success(self.t("mock_test_created"))
+                    except Exception:
+                        st.error(self.t("mock_test_error"))
+
+    async def render_mock_test_stats(self, by_id):
+        st.subheader(self.t("mock_test_results"))
+        test_id = st.selectbox(
+            self.t("mock_test"), list(by_id), key="mock_stats_test_id",
+            format_func=lambda test_id: self.t("mock_test_label").format(**by_id[test_id])
+        )
+        test = by_id[test_id]
+        stats = await self.db_manager.get_mock_question_stats(test_id, self.mock_tests.get('grace_seconds', 30))
+        if not stats:
+            st.info(self.t("no_quiz_results"))
+            return
+        pool = await self.db_manager.get_quiz_pool(test['topic'])
+        rows = []
+        for i, question in enumerate(mock_tests.test_questions(test, pool)):
+            entry = stats.get(question['id'], {"attempts": 0, "correct": 0, "skipped": 0})
+            rows.append({
+                "#": i + 1,
+                self.t("quiz_prompt"): question['prompt'],
+                self.t("attempts"): entry['attempts'],
+                self.t("average_score"): f"{entry['correct'] / entry['attempts']:.0%}" if entry['attempts'] else "-",
+                self.t("skipped"): entry['skipped']
+            })
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+
+    async def render_export_page(self, user, user_data):
+        st.header(self.t("export"))
+        is_teacher = user['role'] == 'teacher' and user.get('teacher_credentials', {}).get('verified')
+        # Verified teachers export the whole class; students export their own rows.
+        scope_user = None if is_teacher else user['id']
+        dataset = st.selectbox(self.t("dataset"), ["logs", "doubts"], format_func=lambda d: self.t(f"export_{d}"))
+        fmt = st.selectbox(self.t("format"), list(export.FORMATS), format_func=lambda f: f.upper())
+        if st.button(self.t("generate_export")):
+            st.session_state.pop('export_file', None)
+            table = "study_logs" if dataset == "logs" else "doubts"
+            total = await self.db_manager.count_rows(table, scope_user)
+            progress = st.progress(0.0, text=self.t("exporting"))
+            page_size = self.config['app'].get('export_page_size', 500)
+            if dataset == "logs":
+                pages = self.db_manager.iter_log_pages(scope_user, page_size)
+            else:
+                pages = self.db_manager.iter_doubt_pages(scope_user, page_size)
+            def on_progress(rows):
+                progress.progress(min(rows / total, 1.0) if total else 0.0, text=f"{self.t('exporting')} {rows}")
+            extension, mime = export.FORMATS[fmt]
+            path = None
+            try:
+                with tempfile.NamedTemporaryFile(suffix=f".{extension}", delete=False) as f:
+                    path = f.name
+                    rows = await export.write_export(dataset, fmt, pages, f, on_progress)
+                # Read once: download_button holds these bytes for as long as
+                # it is shown, so keeping them saves re-reading the file on
+                # every rerun and nothing is left on disk when the session ends.
+                with open(path, 'rb') as f:
+                    data = f.read()
+                progress.progress(1.0, text=f"{self.t('export_ready')} ({rows})")
+                st.session_state.export_file = {
+                    "data": data,
+                    "name": f"{dataset}_{datetime.date.today().isoformat()}.{extension}",
+                    "mime": mime
+                }
+                self.logger.info("Exported %s %s rows as %s for user %s", rows, dataset, fmt, user['id'])
+            except Exception as e:
+                self.logger.error("Export failed: %s", e)
+                st.error(self.t("export_error").format(error=e))
+            finally:
+                if path and os.path.exists(path):
+                    os.remove(path)
+        export_file = st.session_state.get('export_file')
+        if export_file:
+            st.download_button(self.t("download"), export_file['data'], file_name=export_file['name'], mime=export_file['mime'])
+
+    def render_debug_panel(self, rerun, cache_stats):
+        totals = rerun.totals()
+        with st.sidebar.expander(self.t("performance")):
+            st.metric(self.t("rerun_time"), f"{totals['wall_ms']:.0f} ms")
+            st.metric(self.t("db_queries"), totals['queries'])
+            st.metric(self.t("db_time"), f"{totals['db_ms']:.0f} ms")
+            st.metric(self.t("db_rows"), f"{totals['rows']} ({totals['bytes'] / 1024:.1f} KiB)")
+            st.metric(self.t("cache_hit_rate"), f"{cache_stats['hit_rate']:.0%}")
+            breakdown = rerun.breakdown()
+            if breakdown:
+                st.dataframe(breakdown, use_container_width=True, hide_index=True)
+
     async def render_page(self, user, user_data):
         page = st.session_state.current_page
-        if page == self.t("history"):
+        if page == self.t("dashboard"):
+            await self.render_dashboard_page(user, user_data)
+        elif page == self.t("history"):
             await self.render_history_page(user, user_data)
+        elif page == self.t("export"):
+            await self.render_export_page(user, user_data)
+        elif page == self.t("analytics"):
+            await self.render_analytics_page(user, user_data)
         elif page == self.t("doubts"):
             await self.render_doubts_page(user, user_data)
+        elif page == self.t("quizzes"):
+            await self.render_quizzes_page(user, user_data)
+        elif page == self.t("mock_tests"):
+            await self.render_mock_tests_page(user, user_data)
         else:
             st.header(page)
             st.write(f"{self.t('under_construction')} {page}")
\ No newline at end of file
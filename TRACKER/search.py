@@ -0,0 +1,111 @@
+import heapq
+import math
+import re
+import threading
+
+# In-process inverted index over doubts for the SQLite backend; Postgres uses
+# the tsvector column and GIN index from migrations/007 instead. Scoring is
+# BM25 over a document where topic terms count three times, question terms
+# twice and response terms once. Every query term must match, as with
+# websearch_to_tsquery.
+
+TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or that the this to was what when where which who why with"
+    .split()
+)
+FIELD_WEIGHTS = {"topic": 3.0, "question": 2.0, "response": 1.0}
+
+def tokenize(text):
+    if not text:
+        return []
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+class DoubtSearchIndex:
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}
+        self._docs = {}
+        self._terms = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, row):
+        # Adding an id that is already indexed replaces it, so updates are adds.
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(row.get(field)):
+                weights[term] = weights.get(term, 0.0) + weight
+        length = sum(weights.values())
+        doc_id = row['id']
+        with self._lock:
+            self._remove(doc_id)
+            for term, frequency in weights.items():
+                self._postings.setdefault(term, {})[doc_id] = frequency
+            self._terms[doc_id] = tuple(weights)
+            self._docs[doc_id] = (length, row.get('topic'), row.get('response') is not None, row.get('created_at') or "")
+            self._total_length += length
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc[0]
+        for term in self._terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query, topic=None, answered=None, since=None, until=None, limit=10, offset=0):
+        # Returns ([(doc_id, score)], total matches), best first; ties go to
+        # the newest doubt. since/until compare against created_at strings
+        # (until is exclusive).
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], 0
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not all(postings):
+                return [], 0
+            # Walk the rarest term's postings and probe the others.
+            postings.sort(key=len)
+            first, others = postings[0], postings[1:]
+            count = len(self._docs)
+            idf = [math.log(1 + (count - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+            first_idf, other_idf = idf[0], list(zip(idf[1:], others))
+            # BM25 with the length normalisation split into constants.
+            k1_plus = self.k1 + 1
+            base = self.k1 * (1 - self.b)
+            per_length = self.k1 * self.b * count / self._total_length
+            filtered = topic is not None or answered is not None or since or until
+            docs = self._docs
+            scored = []
+            for doc_id, frequency in first.items():
+                length, doc_topic, doc_answered, created_at = docs[doc_id]
+                if filtered and (
+                    (topic is not None and doc_topic != topic)
+                    or (answered is not None and doc_answered != answered)
+                    or (since and created_at < since)
+                    or (until and created_at >= until)
+                ):
+                    continue
+                norm = base + per_length * length
+                score = first_idf * frequency * k1_plus / (frequency + norm)
+                for weight, other in other_idf:
+                    frequency = other.get(doc_id)
+                    if frequency is None:
+                        break
+                    score += weight * frequency * k1_plus / (frequency + norm)
+                else:
+                    scored.append((score, created_at, doc_id))
+        top = heapq.nlargest(offset + limit, scored)
+        return [(doc_id, score) for score, _, doc_id in top[offset:]], len(scored)
@@ -0,0 +1,85 @@
+import pytest
+import io
+import json
+import re
+import tracemalloc
+import zlib
+from export import write_csv, write_export, write_jsonl, write_pdf
+
+async def make_pages(count, page_size=100):
+    for start in range(0, count, page_size):
+        yield [
+            {"user_id": "u1", "date": "2024-01-01", "subject": "Math", "topics": ["Algebra", "Sets"], "notes": f"note {i}", "timestamp": f"t{i}"}
+            for i in range(start, min(start + page_size, count))
+        ]
+
+class CountingSink:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+@pytest.mark.asyncio
+async def test_csv_export():
+    out = io.BytesIO()
+    progress = []
+    rows = await write_export("logs", "csv", make_pages(250), out, progress.append)
+    lines = out.getvalue().decode("utf-8").splitlines()
+    assert rows == 250
+    assert lines[0] == "user_id,date,subject,topics,notes,timestamp"
+    assert lines[1] == 'u1,2024-01-01,Math,"[""Algebra"", ""Sets""]",note 0,t0'
+    assert len(lines) == 251
+    assert progress == [100, 200, 250]
+
+@pytest.mark.asyncio
+async def test_jsonl_export():
+    out = io.BytesIO()
+    await write_jsonl(make_pages(3), ["subject", "topics"], out)
+    records = [json.loads(line) for line in out.getvalue().decode("utf-8").splitlines()]
+    assert records[0] == {"subject": "Math", "topics": ["Algebra", "Sets"]}
+    assert len(records) == 3
+
+@pytest.mark.asyncio
+async def test_pdf_export():
+    out = io.BytesIO()
+    rows = await write_pdf(make_pages(120), ["user_id", "subject", "notes"], out)
+    data = out.getvalue()
+    assert rows == 120
+    assert data.startswith(b"%PDF") and data.endswith(b"%%EOF\n")
+    # Every cross-reference entry points at the object it names.
+    xref = int(re.search(rb"startxref\n(\d+)", data).group(1))
+    offsets = re.findall(rb"(\d{10}) 00000 n", data[xref:])
+    for number, offset in enumerate(offsets, 1):
+        assert data[int(offset):].startswith(b"%d 0 obj" % number)
+    assert b"/Count 3" in data
+    text = b"".join(zlib.decompress(stream) for stream in re.findall(rb"stream\n(.*?)\nendstream", data, re.S))
+    assert b"(note 119)" in text and text.count(b"(user_id)") == 3
+
+@pytest.mark.asyncio
+async def test_pdf_escapes_text():
+    out = io.BytesIO()
+    await write_pdf(make_pages(0), ["notes"], out, title="a (b) \\ c")
+    assert b"/Title (a \\(b\\) \\\\ c)" in out.getvalue()
+
+@pytest.mark.asyncio
+async def test_csv_memory_stays_flat():
+    async def peak_for(count):
+        tracemalloc.start()
+        await write_csv(make_pages(count), ["user_id", "subject", "topics", "notes"], CountingSink())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    small, large = await peak_for(1_000), await peak_for(50_000)
+    assert large < small * 2
+
+@pytest.mark.asyncio
+async def test_pdf_memory_stays_flat():
+    async def peak_for(count):
+        tracemalloc.start()
+        await write_pdf(make_pages(count), ["user_id", "subject", "topics", "notes"], CountingSink())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    small, large = await peak_for(1_000), await peak_for(20_000)
+    assert large < small * 2
@@ -0,0 +1,48 @@
+import pytest
+from search import DoubtSearchIndex, tokenize
+
+def doubt(doc_id, topic, question, response=None, created_at="2024-01-01T00:00:00"):
+    return {"id": doc_id, "topic": topic, "question": question, "response": response, "created_at": created_at}
+
+@pytest.fixture
+def index():
+    index = DoubtSearchIndex()
+    index.add(doubt("d1", "Algebra", "How do I solve quadratic equations?", "Use the quadratic formula", "2024-01-01T10:00:00"))
+    index.add(doubt("d2", "Geometry", "What is the area of a circle?", None, "2024-01-02T10:00:00"))
+    index.add(doubt("d3", "Physics", "Why do equations of motion use algebra?", None, "2024-01-03T10:00:00"))
+    return index
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("How do I solve Quadratic-equations?") == ["solve", "quadratic", "equations"]
+
+def test_topic_matches_rank_above_question_matches(index):
+    hits, total = index.search("algebra")
+    assert [doc_id for doc_id, _ in hits] == ["d1", "d3"]
+    assert total == 2
+
+def test_all_terms_must_match(index):
+    hits, _ = index.search("quadratic circle")
+    assert hits == []
+    hits, _ = index.search("equations algebra")
+    assert {doc_id for doc_id, _ in hits} == {"d1", "d3"}
+
+def test_filters(index):
+    assert [d for d, _ in index.search("equations", answered=True)[0]] == ["d1"]
+    assert [d for d, _ in index.search("equations", answered=False)[0]] == ["d3"]
+    assert [d for d, _ in index.search("equations", topic="Physics")[0]] == ["d3"]
+    assert [d for d, _ in index.search("equations", since="2024-01-02", until="2024-01-04")[0]] == ["d3"]
+    assert index.search("equations", until="2024-01-01")[0] == []
+
+def test_pagination(index):
+    first, total = index.search("algebra", limit=1)
+    second, _ = index.search("algebra", limit=1, offset=1)
+    assert total == 2
+    assert first[0][0] == "d1" and second[0][0] == "d3"
+
+def test_update_and_remove(index):
+    index.add(doubt("d2", "Geometry", "What is the area of a triangle?"))
+    assert index.search("circle")[0] == []
+    assert index.search("triangle")[0][0][0] == "d2"
+    index.remove("d2")
+    assert index.search("triangle")[0] == []
+    assert len(index) == 2
@@ -0,0 +1,53 @@
+import pytest
+from similarity import SimilarityIndex, doubt_text, hash_vector
+
+QUESTIONS = {
+    "d1": ("Algebra", "How do I solve quadratic equations?"),
+    "d2": ("Geometry", "What is the area of a circle?"),
+    "d3": ("Physics", "Why does a ball thrown upwards slow down?")
+}
+
+@pytest.fixture
+def index():
+    index = SimilarityIndex(dim=256, capacity=2)
+    index.add_many((doc_id, f"{topic} {question}", {"id": doc_id}) for doc_id, (topic, question) in QUESTIONS.items())
+    return index
+
+def test_vectors_are_normalised():
+    vector = hash_vector("quadratic equations", 256)
+    assert abs(float(vector @ vector) - 1.0) < 1e-5
+    assert not hash_vector("the of and", 256).any()
+
+def test_rephrased_question_finds_its_twin(index):
+    results = index.nearest("algebra: solving a quadratic equation", limit=2, min_score=-1.0)
+    assert results[0][0] == {"id": "d1"}
+    assert results[0][1] > results[1][1]
+
+def test_min_score_and_limit(index):
+    assert index.nearest("Geometry What is the area of a circle?", limit=1, min_score=0.99) == [({"id": "d2"}, pytest.approx(1.0, abs=1e-5))]
+    assert index.nearest("photosynthesis in leaves", min_score=0.5) == []
+    assert index.nearest("the of", limit=3) == []
+
+def test_add_replaces_and_grows(index):
+    for i in range(10):
+        index.add(f"extra{i}", f"Chemistry balancing equation number {i}", {"id": f"extra{i}"})
+    index.add("d2", "Geometry circle circumference", {"id": "d2", "v": 2})
+    assert len(index) == 13
+    assert index.nearest("circumference of a circle", limit=1)[0][0] == {"id": "d2", "v": 2}
+
+def test_remove_moves_last_row_into_gap(index):
+    index.remove("d1")
+    index.remove("missing")
+    assert len(index) == 2
+    assert index.nearest("Physics ball thrown upwards", limit=1)[0][0] == {"id": "d3"}
+    assert all(payload["id"] != "d1" for payload, _ in index.nearest("quadratic equations", limit=3))
+
+def test_stale_until_synced():
+    index = SimilarityIndex(refresh=60)
+    assert index.stale()
+    index.mark_synced("2024-01-01T00:00:00")
+    assert not index.stale()
+    assert index.high_water == "2024-01-01T00:00:00"
+
+def test_doubt_text():
+    assert doubt_text({"topic": "Algebra", "question": None}) == "Algebra "
@@ -0,0 +1,47 @@
+import pytest
+import json
+import os
+from utils import Message, TranslationCatalog, compile_message
+
+@pytest.fixture
+def translations_file(tmp_path):
+    path = tmp_path / "translations.json"
+    path.write_text(json.dumps({
+        "English": {"title": "Check-In", "welcome": "Welcome, {name} ({role})!", "logout": "Logout"},
+        "Español": {"title": "Registro", "welcome": "¡Bienvenido, {name} ({role})!"}
+    }), encoding="utf-8")
+    return path
+
+def test_translator_falls_back_to_english(translations_file):
+    t = TranslationCatalog(str(translations_file)).translator("Español")
+    assert t("title") == "Registro"
+    assert t("logout") == "Logout"
+    assert t("missing_key") == "missing_key"
+
+def test_unknown_language_uses_fallback(translations_file):
+    t = TranslationCatalog(str(translations_file)).translator("हिन्दी")
+    assert t("title") == "Check-In"
+
+def test_format_strings_are_preparsed(translations_file):
+    welcome = TranslationCatalog(str(translations_file)).translator("English")("welcome")
+    assert isinstance(welcome, Message)
+    assert welcome.format(name="Ana", role="Student") == "Welcome, Ana (Student)!"
+
+def test_compile_message_keeps_str_format_semantics():
+    assert compile_message("plain") == "plain"
+    assert not isinstance(compile_message("{value:.2f}"), Message)
+    assert compile_message("{value:.2f}").format(value=1.5) == "1.50"
+    assert compile_message("{{literal}} {name}").format(name="x") == "{literal} x"
+    assert compile_message("An error occurred: {error}").format(error=ValueError("boom")) == "An error occurred: boom"
+
+def test_languages_compile_lazily_and_reload_on_mtime_change(translations_file):
+    catalog = TranslationCatalog(str(translations_file))
+    catalog.translator("English")
+    assert set(catalog._compiled) == {"English"}
+    assert catalog.table("English") is catalog.table("English")
+    data = json.loads(translations_file.read_text(encoding="utf-8"))
+    data["English"]["title"] = "Daily Check-In"
+    translations_file.write_text(json.dumps(data), encoding="utf-8")
+    stat = os.stat(translations_file)
+    os.utime(translations_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert catalog.translator("English")("title") == "Daily Check-In"
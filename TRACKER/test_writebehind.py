@@ -0,0 +1,135 @@
+import gc
+import pytest
+import threading
+import weakref
+import writebehind
+from writebehind import WriteBehindBuffer
+
+class Recorder:
+    def __init__(self):
+        self.writes = []
+        self.fail = False
+        self.written = threading.Event()
+
+    def __call__(self, user_id, changes):
+        if self.fail:
+            raise RuntimeError("backend down")
+        self.writes.append((user_id, dict(changes)))
+        self.written.set()
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+@pytest.fixture
+def buffer(recorder):
+    buffer = WriteBehindBuffer(recorder, delay=60)
+    yield buffer
+    buffer.close()
+
+def test_stage_merges_changes_per_user(buffer, recorder):
+    buffer.stage("u1", {"goals": "a"})
+    buffer.stage("u1", {"goals": "b", "onboarded": True})
+    buffer.stage("u2", {"goals": "c"})
+    assert buffer.flush() == {}
+    assert sorted(recorder.writes) == [("u1", {"goals": "b", "onboarded": True}), ("u2", {"goals": "c"})]
+
+def test_flush_single_user_leaves_others_pending(buffer, recorder):
+    buffer.stage("u1", {"goals": "a"})
+    buffer.stage("u2", {"goals": "b"})
+    buffer.flush("u1")
+    assert recorder.writes == [("u1", {"goals": "a"})]
+    assert buffer.has_pending("u2")
+
+def test_failed_flush_is_requeued_and_reported(buffer, recorder):
+    buffer.stage("u1", {"goals": "a", "onboarded": True})
+    recorder.fail = True
+    failures = buffer.flush()
+    assert isinstance(failures["u1"], RuntimeError)
+    buffer.stage("u1", {"goals": "b"})
+    assert isinstance(buffer.pop_error("u1"), RuntimeError)
+    assert buffer.pop_error("u1") is None
+    recorder.fail = False
+    buffer.flush()
+    assert recorder.writes == [("u1", {"goals": "b", "onboarded": True})]
+
+def test_overlay_applies_pending_changes_to_selected_columns(buffer):
+    buffer.stage("u1", {"goals": "b", "onboarded": True})
+    assert buffer.overlay("u1", {"id": "u1", "goals": "a"}) == {"id": "u1", "goals": "b"}
+    assert buffer.overlay("u2", {"id": "u2", "goals": "a"}) == {"id": "u2", "goals": "a"}
+
+def test_discard_drops_pending_changes(buffer, recorder):
+    buffer.stage("s1", {"q0": 1})
+    buffer.stage("s2", {"q0": 2})
+    assert buffer.changes("s1") == {"q0": 1}
+    assert buffer.discard("s1") == {"q0": 1}
+    assert buffer.changes("s1") == {}
+    buffer.flush()
+    assert recorder.writes == [("s2", {"q0": 2})]
+    recorder.fail = True
+    buffer.stage("s3", {"q0": 3})
+    buffer.flush()
+    buffer.discard("s3")
+    assert buffer.pop_error("s3") is None
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_failed_writes_back_off_exponentially_up_to_the_cap(recorder):
+    clock = FakeClock()
+    buffer = WriteBehindBuffer(recorder, delay=60, max_delay=300, clock=clock)
+    recorder.fail = True
+    buffer.stage("u1", {"goals": "a"})
+    buffer.flush()
+    assert buffer._retries["u1"] == (1, 1120.0)
+    # Timed flushes leave a backing-off user alone until it is due.
+    clock.now = 1100.0
+    buffer.flush(due_only=True)
+    assert buffer._retries["u1"][0] == 1
+    clock.now = 1120.0
+    buffer.flush(due_only=True)
+    assert buffer._retries["u1"] == (2, 1360.0)
+    clock.now = 1360.0
+    buffer.flush(due_only=True)
+    assert buffer._retries["u1"] == (3, 1660.0)
+    recorder.fail = False
+    buffer.flush("u1")
+    assert recorder.writes == [("u1", {"goals": "a"})]
+    assert "u1" not in buffer._retries
+    buffer.close()
+
+def test_changes_are_dropped_after_max_retries(recorder):
+    buffer = WriteBehindBuffer(recorder, delay=60, max_retries=2)
+    recorder.fail = True
+    buffer.stage("u1", {"goals": "a"})
+    for _ in range(3):
+        buffer.flush()
+    assert not buffer.has_pending("u1")
+    assert isinstance(buffer.pop_error("u1"), RuntimeError)
+    buffer.close()
+
+def test_exit_hook_does_not_keep_buffers_alive(recorder):
+    buffer = WriteBehindBuffer(recorder, delay=60)
+    ref = weakref.ref(buffer)
+    assert buffer in writebehind._open_buffers
+    del buffer
+    gc.collect()
+    assert ref() is None
+
+def test_timer_flushes_after_delay(recorder):
+    buffer = WriteBehindBuffer(recorder, delay=0.01)
+    buffer.stage("u1", {"goals": "a"})
+    assert recorder.written.wait(5)
+    assert recorder.writes == [("u1", {"goals": "a"})]
+    buffer.close()
+
+def test_close_flushes_everything_and_writes_through_afterwards(buffer, recorder):
+    buffer.stage("u1", {"goals": "a"})
+    buffer.close()
+    assert recorder.writes == [("u1", {"goals": "a"})]
+    buffer.stage("u1", {"goals": "b"})
+    assert recorder.writes[-1] == ("u1", {"goals": "b"})
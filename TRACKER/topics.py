@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TopicIndex:
+    # Topic vocabulary with usage counts and last-seen timestamps. The ranked
+    # list is rebuilt only after a write, so reads are a cached lookup.
+    def __init__(self):
+        self.counts = {}
+        self.last_seen = {}
+        self.version = 0
+        self._ranked = None
+
+    def add(self, topics, seen_at=""):
+        for topic in topics:
+            topic = topic.strip() if isinstance(topic, str) else ""
+            if not topic:
+                continue
+            self.counts[topic] = self.counts.get(topic, 0) + 1
+            if seen_at > self.last_seen.get(topic, ""):
+                self.last_seen[topic] = seen_at
+            else:
+                self.last_seen.setdefault(topic, seen_at)
+        self.version += 1
+        self._ranked = None
+
+    def ranked(self):
+        if self._ranked is None:
+            self._ranked = rank_topics(self.counts, self.last_seen)
+        return self._ranked
+
+def rank_topics(counts, last_seen):
+    # Most frequent first; ties go to the most recently used topic.
+    topics = sorted(counts, key=lambda topic: last_seen.get(topic, ""), reverse=True)
+    topics.sort(key=lambda topic: counts[topic], reverse=True)
+    return topics
+
+class TopicIndexRegistry:
+    # Process-wide indexes: one per user (bounded LRU) plus one for class data.
+    def __init__(self, max_users=1024, class_ttl=600):
+        self.max_users = max_users
+        self.class_ttl = class_ttl
+        self.class_index = None
+        self._class_built_at = 0
+        self._users = OrderedDict()
+        self._merged = {}
+        self._lock = threading.Lock()
+
+    def has_user(self, user_id):
+        with self._lock:
+            return user_id in self._users
+
+    def class_stale(self):
+        with self._lock:
+            return self.class_index is None or time.monotonic() - self._class_built_at > self.class_ttl
+
+    def build_user(self, user_id, logs):
+        index = TopicIndex()
+        for log in logs:
+            index.add(log.get('topics', []), log.get('timestamp') or log.get('date') or "")
+        with self._lock:
+            self._users[user_id] = index
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                evicted, _ = self._users.popitem(last=False)
+                self._merged.pop(evicted, None)
+
+    def drop_user(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._merged.pop(user_id, None)
+
+    def record_log(self, user_id, log):
+        with self._lock:
+            index = self._users.get(user_id)
+            if index is not None:
+                index.add(log.get('topics', []), log.get('timestamp') or log.get('date') or "")
+
+    def build_class(self, class_data):
+        index = TopicIndex()
+        for row in class_data:
+            index.add(row.get('topics', []), row.get('created_at') or "")
+        with self._lock:
+            self.class_index = index
+            self._class_built_at = time.monotonic()
+
+    def record_class_row(self, row):
+        with self._lock:
+            if self.class_index is not None:
+                self.class_index.add(row.get('topics', []), row.get('created_at') or "")
+
+    def suggest(self, user_id, prefix="", limit=None):
+        with self._lock:
+            user_index = self._users.get(user_id) or TopicIndex()
+            class_index = self.class_index or TopicIndex()
+            versions = (id(user_index), user_index.version, id(class_index), class_index.version)
+            cached = self._merged.get(user_id)
+            if cached is None or cached[0] != versions:
+                counts = dict(class_index.counts)
+                last_seen = dict(class_index.last_seen)
+                for topic, count in user_index.counts.items():
+                    counts[topic] = counts.get(topic, 0) + count
+                    last_seen[topic] = max(last_seen.get(topic, ""), user_index.last_seen.get(topic, ""))
+                cached = (versions, rank_topics(counts, last_seen))
+                if user_id in self._users:
+                    self._merged[user_id] = cached
+            ranked = cached[1]
+        if prefix:
+            prefix = prefix.lower()
+            ranked = [topic for topic in ranked if topic.lower().startswith(prefix)]
+        return ranked[:limit] if limit else list(ranked)
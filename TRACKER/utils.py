@@ -0,0 +1,112 @@
+import streamlit as st
+import functools
+import importlib
+import json
+import logging
+import os
+import string
+import threading
+import types
+
+logger = logging.getLogger(__name__)
+
+_formatter = string.Formatter()
+
+class LazyModule(types.ModuleType):
+    # Stands in for a heavy dependency until an attribute is first used.
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+def lazy_import(name):
+    return LazyModule(name)
+
+class Message(str):
+    # A translation with named placeholders, parsed once when the language is
+    # compiled so format() is a join instead of a re-parse on every call.
+    def __new__(cls, text, parts):
+        message = super().__new__(cls, text)
+        message.parts = parts
+        return message
+
+    def format(self, *args, **kwargs):
+        if args:
+            return str.format(self, *args, **kwargs)
+        try:
+            return "".join(literal + (format(kwargs[field]) if field is not None else "") for literal, field in self.parts)
+        except KeyError:
+            return str.format(self, **kwargs)
+
+def compile_message(text):
+    if not isinstance(text, str) or "{" not in text and "}" not in text:
+        return text
+    try:
+        parsed = list(_formatter.parse(text))
+    except ValueError:
+        return text
+    parts = []
+    for literal, field, spec, conversion in parsed:
+        # Only plain named fields get the fast path; anything else keeps
+        # str.format semantics.
+        if field is not None and (spec or conversion or not field.isidentifier()):
+            return text
+        parts.append((literal, field))
+    return Message(text, tuple(parts))
+
+class TranslationCatalog:
+    def __init__(self, path, fallback="English"):
+        self.path = path
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._raw = {}
+        self._compiled = {}
+
+    def _refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._raw = json.load(f)
+            self._compiled = {}
+            self._mtime = mtime
+            logger.info("Loaded translations from %s", self.path)
+
+    def table(self, language):
+        with self._lock:
+            self._refresh()
+            table = self._compiled.get(language)
+            if table is None:
+                # Languages are flattened lazily, the first time a session uses
+                # them, with fallback entries resolved up front.
+                merged = {**self._raw.get(self.fallback, {}), **self._raw.get(language, {})}
+                table = {key: compile_message(value) for key, value in merged.items()}
+                self._compiled[language] = table
+            return table
+
+    def translator(self, language):
+        get = self.table(language).get
+        return lambda key: get(key, key)
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_catalog(path, fallback="English"):
+    with _catalogs_lock:
+        catalog = _catalogs.get(path)
+        if catalog is None:
+            catalog = _catalogs[path] = TranslationCatalog(path, fallback)
+        return catalog
+
+@functools.lru_cache(maxsize=8)
+def _read_css(path, mtime):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def apply_css(css_file):
+    try:
+        css = _read_css(css_file, os.stat(css_file).st_mtime_ns)
+    except OSError:
+        logger.warning("CSS file %s not found", css_file)
+        return
+    st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
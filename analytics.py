@@ -0,0 +1,90 @@
+import datetime
+import threading
+from collections import OrderedDict
+from utils import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def log_version(logs):
+    # study_logs is append-only, so the count plus the newest entry identifies
+    # a user's history without hashing it.
+    if not logs:
+        return (0, None)
+    last = logs[-1]
+    return (len(logs), last.get('id') or last.get('timestamp'))
+
+def build_frame(logs):
+    frame = pd.DataFrame.from_records(logs, columns=["date", "subject", "topics", "timestamp"])
+    frame["date"] = pd.to_datetime(frame["date"], errors="coerce").dt.normalize()
+    frame = frame.dropna(subset=["date"])
+    frame["subject"] = frame["subject"].fillna("").astype(str)
+    frame["topics"] = frame["topics"].apply(lambda topics: topics if isinstance(topics, list) else [])
+    return frame.reset_index(drop=True)
+
+def compute_streaks(frame, today=None):
+    if frame.empty:
+        return {"current": 0, "longest": 0, "active_days": 0}
+    days = np.unique(frame["date"].to_numpy().astype("datetime64[D]"))
+    # Consecutive days share a run id; run lengths come from one bincount.
+    breaks = np.diff(days).astype(int) != 1
+    run_ids = np.concatenate(([0], np.cumsum(breaks)))
+    run_lengths = np.bincount(run_ids)
+    today = np.datetime64(today or datetime.date.today(), "D")
+    current = int(run_lengths[-1]) if (today - days[-1]).astype(int) <= 1 else 0
+    return {"current": current, "longest": int(run_lengths.max()), "active_days": int(len(days))}
+
+def subject_counts(frame):
+    counts = frame.loc[frame["subject"] != "", "subject"].value_counts()
+    return counts.rename_axis("subject").reset_index(name="count")
+
+def weekly_heatmap(frame):
+    if frame.empty:
+        return pd.DataFrame(columns=["week", "weekday", "count"])
+    week = frame["date"] - pd.to_timedelta(frame["date"].dt.weekday, unit="D")
+    grid = frame.groupby([week.rename("week"), frame["date"].dt.weekday.rename("weekday")]).size()
+    grid = grid.reset_index(name="count")
+    grid["weekday"] = pd.Categorical.from_codes(grid["weekday"], WEEKDAYS)
+    return grid
+
+def topic_recurrence(frame):
+    topics = frame[["date", "topics"]].explode("topics").dropna(subset=["topics"])
+    topics["topics"] = topics["topics"].astype(str).str.strip()
+    topics = topics[topics["topics"] != ""]
+    if topics.empty:
+        return pd.DataFrame(columns=["topic", "count", "days", "first_seen", "last_seen"])
+    grouped = topics.groupby("topics")["date"].agg(count="size", days="nunique", first_seen="min", last_seen="max")
+    return grouped.rename_axis("topic").reset_index().sort_values(["count", "last_seen"], ascending=False, ignore_index=True)
+
+class AnalyticsEngine:
+    # Results are cached per (user, log version), so a rerun with unchanged
+    # history skips the frame build entirely.
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze(self, user_id, logs, today=None):
+        today = today or datetime.date.today()
+        key = (user_id, log_version(logs), today)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        frame = build_frame(logs)
+        result = {
+            "total": len(frame),
+            "streaks": compute_streaks(frame, today),
+            "subjects": subject_counts(frame),
+            "heatmap": weekly_heatmap(frame),
+            "topics": topic_recurrence(frame)
+        }
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result
+
+engine = AnalyticsEngine()
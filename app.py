@@ -2,18 +2,28 @@ import streamlit as st
 import yaml
 import logging
 from auth import AuthManager
-from database import DatabaseManager
+from database import DatabaseManager, take_snapshot
+from sqlite_backend import SqliteClient
+from cache import AsyncTTLCache
 from pages import PageRenderer
-from utils import load_translations, apply_css
+from utils import get_catalog, apply_css
+import instrumentation
+from log_pipeline import setup_logging, bind_user
 import asyncio
 
-# Configure logging
-logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 # Load configuration
 with open('config.yaml', 'r') as f:
     CONFIG = yaml.safe_load(f)
 
+# Configure logging: JSON lines written by a background thread
+setup_logging(CONFIG.get('logging', {}))
+
+# Query instrumentation, plus a Prometheus listener when a port is configured
+# (started once per process).
+instrumentation.configure(CONFIG.get('instrumentation', {}))
+if CONFIG.get('instrumentation', {}).get('metrics_port'):
+    instrumentation.start_metrics_server(CONFIG['instrumentation']['metrics_port'], CONFIG['instrumentation'].get('metrics_host', '127.0.0.1'))
+
 # Page configuration
 st.set_page_config(
     page_title=CONFIG['app']['title'],
@@ -22,6 +32,27 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# One database manager per server process: reruns and sessions share its
+# pooled HTTP connections, query executor and read cache.
+@st.cache_resource
+def get_database_manager(supabase_config, storage_config, similarity_config, mock_test_config):
+    client = None
+    if storage_config.get('backend', 'supabase') == 'sqlite':
+        client = SqliteClient(storage_config.get('path', 'tracker.db'))
+    db_manager = DatabaseManager(
+        supabase_config['url'],
+        supabase_config['key'],
+        supabase_config.get('max_workers', 8),
+        AsyncTTLCache(maxsize=supabase_config.get('cache_size', 1024)),
+        supabase_config.get('pool', {}),
+        supabase_config.get('write_delay', 2.0),
+        client,
+        similarity_config,
+        mock_test_config.get('autosave_seconds', 10.0)
+    )
+    db_manager.warm_similar_doubts()
+    return db_manager
+
 # Initialize session state
 def init_session_state():
     defaults = {
@@ -37,6 +68,12 @@ def init_session_state():
             st.session_state[key] = value
 
 async def main():
+    # Every database round trip made while rendering is counted against this
+    # rerun and logged as one record when it ends.
+    with instrumentation.track_rerun() as rerun:
+        await render_app(rerun)
+
+async def render_app(rerun):
     try:
         # Apply custom CSS
         apply_css(CONFIG['app']['css_file'])
@@ -45,11 +82,16 @@ async def main():
         init_session_state()
 
         # Load translations
-        translations = load_translations('translations.json')
-        t = lambda key: translations.get(st.session_state.language, {}).get(key, key)
+        t = get_catalog('translations.json').translator(st.session_state.language)
 
         # Initialize managers
-        db_manager = DatabaseManager(CONFIG['supabase']['url'], CONFIG['supabase']['key'])
+        db_manager = get_database_manager(CONFIG['supabase'], CONFIG.get('storage', {}), CONFIG.get('similarity', {}), CONFIG.get('mock_tests', {}))
+        if CONFIG.get('doubt_sync', {}).get('realtime') and CONFIG.get('storage', {}).get('backend', 'supabase') == 'supabase':
+            db_manager.start_doubt_feed(CONFIG['supabase']['url'], CONFIG['supabase']['key'])
+        if 'db_health' not in st.session_state:
+            st.session_state.db_health = await db_manager.health_check()
+            if not st.session_state.db_health['ok']:
+                logging.error("Database unavailable: %s", st.session_state.db_health.get('error'))
         auth_manager = AuthManager(db_manager, t)
         page_renderer = PageRenderer(db_manager, t, CONFIG)
 
@@ -59,10 +101,33 @@ async def main():
             st.markdown(f'<h1 class="main-header">📚 {t("title")}</h1>', unsafe_allow_html=True)
             st.info(t("login_prompt"))
             return
+        bind_user(user['id'])
 
         # Load user data
-        user_data = await db_manager.get_user_data(user['id'])
+        # Independent reads run concurrently; the rerun waits for the slowest one.
+        user_data, logs, class_data = await asyncio.gather(
+            db_manager.get_user_data(user['id']),
+            db_manager.get_logs(user['id']),
+            db_manager.get_class_data("summary")
+        )
+        if user_data.get('logs'):
+            # Keep showing the legacy array if migration fails, and only retry
+            # it in a later session rather than on every rerun.
+            migrated = 0
+            if not st.session_state.get('logs_migration_failed'):
+                migrated = await db_manager.migrate_logs(user['id'], user_data['logs'])
+                st.session_state.logs_migration_failed = not migrated
+            if migrated:
+                logs = await db_manager.get_logs(user['id'])
+            logs = logs or user_data['logs']
+        user_data['logs'] = logs
+        # A background flush of this user's buffered changes failed; they are
+        # still queued and will be retried.
+        if db_manager.writes.pop_error(user['id']):
+            st.warning(t("save_pending_error"))
+        page_renderer.class_data = class_data
         st.session_state.user_data = user_data
+        st.session_state.user_snapshot = take_snapshot(user_data)
 
         # Handle onboarding
         if not user_data.get('onboarded', False):
@@ -72,9 +137,11 @@ async def main():
         # Render sidebar and pages
         page_renderer.render_sidebar(user)
         await page_renderer.render_page(user, user_data)
+        if CONFIG.get('instrumentation', {}).get('debug_panel'):
+            page_renderer.render_debug_panel(rerun, db_manager.cache.stats())
 
     except Exception as e:
-        logging.error(f"Main app error: {e}")
+        logging.error("Main app error: %s", e)
         st.error(t("app_error").format(error=e))
 
 if __name__ == "__main__":
@@ -22,7 +22,7 @@ class AuthManager:
 
             if submit and email and name and role:
                 try:
-                    user = await self.db_manager.get_user_by_email(email)
+                    user = await self.db_manager.get_user_by_email(email, "session")
                     if user:
                         if user['role'] != role.lower():
                             st.sidebar.error(self.t("role_mismatch").format(role=user['role']))
@@ -49,7 +49,7 @@ class AuthManager:
                         await self.db_manager.insert_user(user)
                     
                     if role.lower() == 'teacher':
-                        teacher = await self.db_manager.get_teacher_by_email(email)
+                        teacher = await self.db_manager.get_teacher_by_email(email, "summary")
                         if not teacher:
                             st.sidebar.error(self.t("teacher_not_found"))
                             return None
@@ -60,10 +60,10 @@ class AuthManager:
 
                     st.session_state.user = user
                     st.sidebar.success(self.t("welcome").format(name=user['name'], role=user['role'].capitalize()))
-                    self.logger.info(f"User {email} logged in as {role.lower()}")
+                    self.logger.info("User %s logged in as %s", email, role.lower())
                     st.rerun()
                     return user
                 except Exception as e:
-                    self.logger.error(f"Authentication error: {e}")
+                    self.logger.error("Authentication error: %s", e)
                     st.sidebar.error(self.t("auth_error").format(error=e))
         return None
\ No newline at end of file
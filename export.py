@@ -0,0 +1,146 @@
+import csv
+import io
+import json
+import zlib
+
+# Streaming exporters. Each one consumes an async iterator of row pages and
+# writes to a file object as it goes, so memory holds one page at a time
+# whatever the size of the export.
+
+EXPORT_COLUMNS = {
+    "logs": ["user_id", "date", "subject", "topics", "notes", "timestamp"],
+    "doubts": ["id", "user_id", "topic", "question", "response", "response_by", "created_at", "responded_at"]
+}
+
+FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "jsonl": ("jsonl", "application/x-ndjson"),
+    "pdf": ("pdf", "application/pdf")
+}
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+async def write_csv(pages, columns, fileobj, on_progress=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    async for page in pages:
+        for row in page:
+            writer.writerow([_cell(row.get(column)) for column in columns])
+        fileobj.write(buffer.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        buffer.truncate()
+        rows += len(page)
+        if on_progress:
+            on_progress(rows)
+    fileobj.write(buffer.getvalue().encode("utf-8"))
+    return rows
+
+async def write_jsonl(pages, columns, fileobj, on_progress=None):
+    rows = 0
+    async for page in pages:
+        chunk = "".join(json.dumps({column: row.get(column) for column in columns}, ensure_ascii=False) + "\n" for row in page)
+        fileobj.write(chunk.encode("utf-8"))
+        rows += len(page)
+        if on_progress:
+            on_progress(rows)
+    return rows
+
+class PdfStream:
+    # Writes PDF objects as they are produced and remembers only their byte
+    # offsets, so the cross-reference table can be written at the end.
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.position = 0
+        self.offsets = {}
+        self.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def write(self, data):
+        self.fileobj.write(data)
+        self.position += len(data)
+
+    def reserve(self):
+        number = len(self.offsets) + 1
+        self.offsets[number] = None
+        return number
+
+    def object(self, number, body):
+        self.offsets[number] = self.position
+        self.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+
+    def stream(self, number, content):
+        data = zlib.compress(content)
+        self.object(number, b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(data), data))
+
+    def close(self, root, info):
+        xref = self.position
+        self.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.offsets) + 1))
+        self.write(b"".join(b"%010d 00000 n \n" % self.offsets[number] for number in range(1, len(self.offsets) + 1)))
+        self.write(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(self.offsets) + 1, root, info, xref))
+
+def _pdf_string(text):
+    # Standard Type 1 fonts use WinAnsiEncoding; anything outside it prints as "?".
+    data = " ".join(text.split()).encode("cp1252", "replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+async def write_pdf(pages, columns, fileobj, on_progress=None, title="Export"):
+    # Each sheet is written out as soon as it is full, so memory holds one
+    # sheet of rows rather than the whole document (a reportlab canvas keeps
+    # every page until save()).
+    width, height = 842, 595  # A4 landscape, in points
+    margin, line_height = 36, 12
+    column_width = (width - 2 * margin) / len(columns)
+    max_chars = max(int(column_width / 5), 4)
+    pdf = PdfStream(fileobj)
+    catalog, tree, regular, bold = (pdf.reserve() for _ in range(4))
+    pdf.object(regular, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pdf.object(bold, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+    header = b"".join(
+        b"BT /F2 8 Tf %.2f %.2f Td %s Tj ET\n" % (margin + i * column_width, height - margin, _pdf_string(column))
+        for i, column in enumerate(columns)
+    )
+    sheets = []
+    lines = []
+
+    def emit_sheet():
+        content, page = pdf.reserve(), pdf.reserve()
+        pdf.stream(content, header + b"".join(lines))
+        pdf.object(page, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                         b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> >>" % (tree, width, height, content, regular, bold))
+        sheets.append(page)
+        lines.clear()
+
+    y = height - margin - 2 * line_height
+    rows = 0
+    async for page in pages:
+        for row in page:
+            if y < margin:
+                emit_sheet()
+                y = height - margin - 2 * line_height
+            lines.append(b"BT /F1 7 Tf " + b"".join(
+                b"1 0 0 1 %.2f %.2f Tm %s Tj " % (margin + i * column_width, y, _pdf_string(_cell(row.get(column))[:max_chars]))
+                for i, column in enumerate(columns)
+            ) + b"ET\n")
+            y -= line_height
+        rows += len(page)
+        if on_progress:
+            on_progress(rows)
+    if lines or not sheets:
+        emit_sheet()
+    pdf.object(tree, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % page for page in sheets), len(sheets)))
+    pdf.object(catalog, b"<< /Type /Catalog /Pages %d 0 R >>" % tree)
+    info = pdf.reserve()
+    pdf.object(info, b"<< /Title %s >>" % _pdf_string(title))
+    pdf.close(catalog, info)
+    return rows
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "pdf": write_pdf}
+
+async def write_export(dataset, fmt, pages, fileobj, on_progress=None):
+    return await WRITERS[fmt](pages, EXPORT_COLUMNS[dataset], fileobj, on_progress)
@@ -0,0 +1,150 @@
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import instrumentation
+from instrumentation import current_rerun
+
+# Non-blocking logging. Records are stamped with the current user and rerun
+# ids, sampled per logger and put on a bounded in-memory queue on the request
+# path. A background listener formats them as JSON lines and writes them to a
+# size-rotated file. Records dropped on a full queue are counted in the
+# Prometheus metrics. Configured from config.yaml (logging).
+
+_user_id = contextvars.ContextVar("log_user_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra`.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "user_id", "rerun_id"}
+_SCALARS = (str, int, float, bool, type(None))
+
+def bind_user(user_id):
+    # Scoped to the current rerun: asyncio.run gives each rerun its own context.
+    _user_id.set(user_id)
+
+class ContextFilter(logging.Filter):
+    def filter(self, record):
+        rerun = current_rerun()
+        record.user_id = _user_id.get()
+        record.rerun_id = rerun.id if rerun is not None else None
+        return True
+
+class SamplingFilter(logging.Filter):
+    # Keeps one in every 1/rate records below WARNING for each configured
+    # logger (and its children). Warnings and errors are never dropped.
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = {name: min(max(float(rate), 0.0), 1.0) for name, rate in (rates or {}).items()}
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def rate_for(self, name):
+        while name:
+            if name in self.rates:
+                return name, self.rates[name]
+            name = name.rpartition(".")[0]
+        return None, 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        name, rate = self.rate_for(record.name)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        with self._lock:
+            seen = self._seen.get(name, 0)
+            self._seen[name] = seen + 1
+        return seen % round(1 / rate) == 0
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "user_id": getattr(record, "user_id", None),
+            "rerun_id": getattr(record, "rerun_id", None),
+            "thread": record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    # Never waits on a full queue: the record is dropped and counted instead.
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Formatting is left to the listener thread. Arguments that could be
+        # mutated before then are rendered into the message now.
+        if record.args and not (isinstance(record.args, tuple) and all(isinstance(arg, _SCALARS) for arg in record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener = None
+_handler = None
+_setup_lock = threading.Lock()
+
+def setup_logging(config):
+    # Idempotent: Streamlit re-executes app.py on every rerun, but the queue,
+    # listener and file handler are created once per process.
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is not None:
+            return _handler
+        file_handler = logging.handlers.RotatingFileHandler(
+            config.get('file', 'app.log'),
+            maxBytes=config.get('max_bytes', 10 * 1024 * 1024),
+            backupCount=config.get('backup_count', 5),
+            encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonFormatter())
+        _handler = NonBlockingQueueHandler(queue.Queue(config.get('queue_size', 10000)))
+        handler = _handler
+        instrumentation.metrics.register_counter(
+            "log_records_dropped_total", "Log records dropped because the log queue was full.", lambda: handler.dropped
+        )
+        _handler.addFilter(SamplingFilter(config.get('sampling', {})))
+        _handler.addFilter(ContextFilter())
+        root = logging.getLogger()
+        root.setLevel(config.get('level', 'INFO'))
+        root.addHandler(_handler)
+        _listener = logging.handlers.QueueListener(_handler.queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _handler
+
+def shutdown_logging():
+    # Drains the queue and closes the file.
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logging.getLogger().removeHandler(_handler)
+        _listener = _handler = None
@@ -0,0 +1,4 @@
+-- Supports the (created_at, id) keyset used by DatabaseManager.get_doubts_page,
+-- so each page is an index range scan instead of a sort over the whole table.
+create index if not exists doubts_created_at_id_idx on doubts (created_at desc, id desc);
+create index if not exists doubts_user_id_created_at_idx on doubts (user_id, created_at desc);
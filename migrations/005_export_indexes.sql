@@ -0,0 +1,2 @@
+-- Keyset order used by DatabaseManager.iter_log_pages for class-wide exports.
+create index if not exists study_logs_timestamp_id_idx on study_logs (timestamp, id);
@@ -0,0 +1,29 @@
+-- Shared token buckets for rate_limiter.SupabaseBucketBackend. The row lock
+-- taken by the upsert serialises concurrent takes for the same key.
+create table if not exists rate_limit_buckets (
+    key text primary key,
+    tokens double precision not null,
+    updated_at timestamptz not null default now()
+);
+
+create or replace function take_rate_token(p_key text, p_capacity integer, p_refill_per_second double precision)
+returns jsonb
+language plpgsql
+as $$
+declare
+    current_tokens double precision;
+begin
+    insert into rate_limit_buckets as b (key, tokens, updated_at)
+    values (p_key, p_capacity, now())
+    on conflict (key) do update
+    set tokens = least(p_capacity, b.tokens + extract(epoch from now() - b.updated_at) * p_refill_per_second),
+        updated_at = now()
+    returning tokens into current_tokens;
+
+    if current_tokens >= 1 then
+        update rate_limit_buckets set tokens = current_tokens - 1 where key = p_key;
+        return jsonb_build_object('allowed', true, 'retry_after', 0);
+    end if;
+    return jsonb_build_object('allowed', false, 'retry_after', (1 - current_tokens) / p_refill_per_second);
+end;
+$$;
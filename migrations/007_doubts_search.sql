@@ -0,0 +1,50 @@
+-- Full-text search over doubts. The weighted document (topic > question >
+-- response) is a generated column, so every write keeps it current, and the
+-- GIN index makes matching independent of table size.
+alter table doubts add column if not exists search tsvector
+    generated always as (
+        setweight(to_tsvector('english', coalesce(topic, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(question, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(response, '')), 'C')
+    ) stored;
+
+create index if not exists doubts_search_idx on doubts using gin (search);
+
+-- Ranked, filtered, paginated search. Every row carries the total match
+-- count so one call serves both the page and the pager.
+create or replace function search_doubts(
+    p_query text,
+    p_topic text default null,
+    p_answered boolean default null,
+    p_since timestamptz default null,
+    p_until timestamptz default null,
+    p_limit integer default 10,
+    p_offset integer default 0
+)
+returns table (
+    id uuid,
+    user_id uuid,
+    topic text,
+    question text,
+    response text,
+    response_by uuid,
+    created_at timestamptz,
+    responded_at timestamptz,
+    rank real,
+    total bigint
+)
+language sql
+stable
+as $$
+    select d.id, d.user_id, d.topic, d.question, d.response, d.response_by, d.created_at, d.responded_at,
+           ts_rank_cd(d.search, q.query) as rank,
+           count(*) over () as total
+    from doubts d, websearch_to_tsquery('english', p_query) as q(query)
+    where d.search @@ q.query
+      and (p_topic is null or d.topic = p_topic)
+      and (p_answered is null or (d.response is not null) = p_answered)
+      and (p_since is null or d.created_at >= p_since)
+      and (p_until is null or d.created_at < p_until)
+    order by rank desc, d.created_at desc, d.id desc
+    limit p_limit offset p_offset;
+$$;
@@ -0,0 +1,147 @@
+-- Timed mock tests over the quiz question banks (migrations/008). Start
+-- times and deadlines come from the database clock, answers are autosaved
+-- in batches into the session row, and a submission is scored in one
+-- statement that also adds its counts to the per-question statistics.
+create table if not exists mock_tests (
+    id uuid primary key default gen_random_uuid(),
+    title text not null,
+    topic text not null,
+    question_ids jsonb not null,
+    duration_minutes integer not null check (duration_minutes > 0),
+    created_by uuid references users (id) on delete set null,
+    created_at timestamptz not null default now()
+);
+
+create table if not exists mock_test_sessions (
+    id uuid primary key default gen_random_uuid(),
+    test_id uuid not null references mock_tests (id) on delete cascade,
+    user_id uuid not null references users (id) on delete cascade,
+    started_at timestamptz not null default now(),
+    deadline timestamptz not null,
+    answers jsonb not null default '{}'::jsonb,
+    saved_at timestamptz,
+    submitted_at timestamptz,
+    score integer,
+    total integer,
+    unique (test_id, user_id)
+);
+
+-- Counters are spread over a few shards per question, so concurrent
+-- submissions to one exam rarely wait on the same row; readers sum them.
+create table if not exists mock_question_stats (
+    test_id uuid not null references mock_tests (id) on delete cascade,
+    question_id uuid not null,
+    shard smallint not null,
+    attempts integer not null default 0,
+    correct integer not null default 0,
+    skipped integer not null default 0,
+    primary key (test_id, question_id, shard)
+);
+
+-- Returns the caller's session, creating it on the first call; reopening a
+-- test never moves its deadline. server_now lets the page show the time left.
+create or replace function start_mock_test(p_test_id uuid, p_user_id uuid)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_session mock_test_sessions;
+begin
+    insert into mock_test_sessions (test_id, user_id, started_at, deadline)
+    select t.id, p_user_id, now(), now() + make_interval(mins => t.duration_minutes)
+    from mock_tests t
+    where t.id = p_test_id
+    on conflict (test_id, user_id) do nothing;
+
+    select * into v_session from mock_test_sessions where test_id = p_test_id and user_id = p_user_id;
+    if not found then
+        return null;
+    end if;
+    return to_jsonb(v_session) || jsonb_build_object('server_now', now());
+end;
+$$;
+
+-- Merges a batch of {question_id: option} answers. Ignored once the
+-- session is submitted or past its deadline.
+create or replace function save_mock_answers(p_session_id uuid, p_answers jsonb)
+returns boolean
+language sql
+as $$
+    update mock_test_sessions
+    set answers = answers || p_answers,
+        saved_at = now()
+    where id = p_session_id and submitted_at is null and now() <= deadline
+    returning true;
+$$;
+
+-- Scores the session once and adds it to mock_question_stats. Answers sent
+-- later than the deadline plus p_grace_seconds are dropped; autosaved ones
+-- still count. Submitting again returns the stored result.
+create or replace function submit_mock_test(p_session_id uuid, p_answers jsonb, p_grace_seconds integer default 30)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_session mock_test_sessions;
+    v_answers jsonb;
+    v_shard smallint := floor(random() * 8);
+begin
+    select * into v_session from mock_test_sessions where id = p_session_id for update;
+    if not found then
+        return null;
+    end if;
+    if v_session.submitted_at is not null then
+        return to_jsonb(v_session);
+    end if;
+    v_answers := case
+        when now() <= v_session.deadline + make_interval(secs => p_grace_seconds) then v_session.answers || coalesce(p_answers, '{}'::jsonb)
+        else v_session.answers
+    end;
+
+    with graded as (
+        select q.id, coalesce((v_answers ->> q.id::text)::integer = q.answer, false) as correct, not (v_answers ? q.id::text) as skipped
+        from mock_tests t
+        cross join lateral jsonb_array_elements_text(t.question_ids) as item (question_id)
+        join quiz_questions q on q.id = item.question_id::uuid
+        where t.id = v_session.test_id
+    ), stats as (
+        insert into mock_question_stats (test_id, question_id, shard, attempts, correct, skipped)
+        select v_session.test_id, id, v_shard, 1, correct::integer, skipped::integer from graded
+        on conflict (test_id, question_id, shard) do update
+        set attempts = mock_question_stats.attempts + 1,
+            correct = mock_question_stats.correct + excluded.correct,
+            skipped = mock_question_stats.skipped + excluded.skipped
+    )
+    update mock_test_sessions
+    set answers = v_answers,
+        submitted_at = now(),
+        score = (select count(*) filter (where correct) from graded),
+        total = (select count(*) from graded)
+    where id = p_session_id
+    returning * into v_session;
+    return to_jsonb(v_session);
+end;
+$$;
+
+-- Scores every session of a test whose deadline and grace period have
+-- passed without a submission (the student closed the page), so teacher
+-- statistics include them. Returns how many sessions were finalised.
+create or replace function finalize_mock_tests(p_test_id uuid, p_grace_seconds integer default 30)
+returns integer
+language plpgsql
+as $$
+declare
+    v_session_id uuid;
+    v_count integer := 0;
+begin
+    for v_session_id in
+        select id from mock_test_sessions
+        where test_id = p_test_id and submitted_at is null and now() > deadline + make_interval(secs => p_grace_seconds)
+        for update skip locked
+    loop
+        perform submit_mock_test(v_session_id, '{}'::jsonb, p_grace_seconds);
+        v_count := v_count + 1;
+    end loop;
+    return v_count;
+end;
+$$;
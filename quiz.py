@@ -0,0 +1,64 @@
+import datetime
+import random
+import uuid
+from utils import lazy_import
+
+np = lazy_import("numpy")
+
+# Quiz engine. Question pools are read once per topic and cached
+# (DatabaseManager.get_quiz_pool); each attempt draws its own sample and
+# option order from the pool, answers stay in session state until submit,
+# and grade() scores the whole attempt with array operations in one pass.
+# The attempt is then written as a single quiz_attempts row (migrations/008).
+
+SKIPPED = -1
+
+def new_attempt(user_id, topic, pool, size, rng=None):
+    rng = rng or random.Random()
+    questions = rng.sample(pool, min(size, len(pool)))
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "topic": topic,
+        # order[i] is the pool index of the option shown in position i.
+        "questions": [{**question, "order": rng.sample(range(len(question['options'])), len(question['options']))} for question in questions],
+        "started_at": datetime.datetime.utcnow().isoformat()
+    }
+
+def shown_options(question):
+    return [question['options'][i] for i in question['order']]
+
+def grade(attempt, chosen):
+    # chosen: the shown position picked for each question, None if skipped.
+    # Returns the picks mapped back to pool option indexes, per-question
+    # correctness and the score.
+    questions = attempt['questions']
+    count = len(questions)
+    if not count:
+        return {"answers": [], "correct": [], "score": 0, "total": 0}
+    width = max(len(question['order']) for question in questions)
+    orders = np.full((count, width), SKIPPED, dtype=np.int64)
+    for row, question in enumerate(questions):
+        orders[row, :len(question['order'])] = question['order']
+    shown = np.array([SKIPPED if pick is None else pick for pick in chosen], dtype=np.int64)
+    answered = shown >= 0
+    picked = np.where(answered, orders[np.arange(count), np.clip(shown, 0, width - 1)], SKIPPED)
+    key = np.array([question['answer'] for question in questions], dtype=np.int64)
+    correct = answered & (picked == key)
+    return {"answers": picked.tolist(), "correct": correct.tolist(), "score": int(correct.sum()), "total": count}
+
+def attempt_row(attempt, graded):
+    return {
+        "id": attempt['id'],
+        "user_id": attempt['user_id'],
+        "topic": attempt['topic'],
+        "question_ids": [question['id'] for question in attempt['questions']],
+        "answers": graded['answers'],
+        "score": graded['score'],
+        "total": graded['total'],
+        "started_at": attempt['started_at'],
+        "submitted_at": datetime.datetime.utcnow().isoformat()
+    }
+
+def parse_options(text):
+    return [line.strip() for line in (text or "").splitlines() if line.strip()]
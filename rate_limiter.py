@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+
+# Token-bucket limiting keyed by an arbitrary string (e.g. a user id). Callers
+# get an immediate allow/deny with a retry hint; nothing ever sleeps.
+
+class MemoryBucketBackend:
+    # Per-process buckets. Full buckets are pruned once the map grows past
+    # max_keys, since a full bucket is the same as no bucket.
+    def __init__(self, clock=time.monotonic, max_keys=10000):
+        self.clock = clock
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    async def take(self, key, capacity, refill_per_second):
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, capacity, refill_per_second)
+        retry_after = 0.0 if allowed else (1 - tokens) / refill_per_second
+        return allowed, retry_after
+
+    def _prune(self, now, capacity, refill_per_second):
+        full_after = capacity / refill_per_second
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if now - updated >= full_after:
+                del self._buckets[key]
+
+class SupabaseBucketBackend:
+    # Buckets live in Postgres (take_rate_token in migrations/006), so every
+    # worker process shares the same limits.
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    async def take(self, key, capacity, refill_per_second):
+        return await self.db_manager.take_rate_token(key, capacity, refill_per_second)
+
+class TokenBucketLimiter:
+    def __init__(self, backend, capacity=5, period=60, name="default"):
+        self.backend = backend
+        self.capacity = capacity
+        self.refill_per_second = capacity / period
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+
+    async def try_acquire(self, key):
+        # Fails closed: when the backend is unreachable the call is denied
+        # with retry_after None, since no wait time is known.
+        try:
+            return await self.backend.take(f"{self.name}:{key}", self.capacity, self.refill_per_second)
+        except Exception as e:
+            self.logger.error("Rate limiter %s unavailable: %s", self.name, e)
+            return False, None
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name, config, db_manager=None):
+    # One limiter per name per process, so memory buckets survive reruns.
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            if config.get('backend', 'memory') == 'supabase':
+                backend = SupabaseBucketBackend(db_manager)
+            else:
+                backend = MemoryBucketBackend()
+            limiter = _limiters[name] = TokenBucketLimiter(
+                backend, config.get('capacity', 5), config.get('period', 60), name
+            )
+        return limiter
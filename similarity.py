@@ -0,0 +1,150 @@
+import threading
+import time
+import zlib
+from functools import lru_cache
+from search import tokenize
+from utils import lazy_import
+
+np = lazy_import("numpy")
+
+# Near-duplicate lookup over answered doubts. Each doubt's topic and question
+# become a signed, hashed bag of words, word bigrams and character trigrams
+# (so typos and inflections still overlap), L2-normalised into one row of a
+# float32 matrix. A lookup is a single matrix-vector product and an
+# argpartition for the top k. The matrix doubles when full, so inserts are
+# amortised O(dim) and never rebuild it; syncs with storage only fetch
+# answers newer than the high-water mark.
+
+# Rows vectorised per batch in add_many, bounding the temporary arrays.
+BATCH_SIZE = 4096
+
+def _hash(gram):
+    return zlib.crc32(gram.encode("utf-8"))
+
+@lru_cache(maxsize=65536)
+def word_hashes(word):
+    # The word and its character trigrams, hashed once per distinct word.
+    padded = f"#{word}#"
+    return (_hash(word),) + tuple(_hash(padded[i:i + 3]) for i in range(len(padded) - 2))
+
+def feature_hashes(text):
+    words = tokenize(text)
+    hashes = [value for word in words for value in word_hashes(word)]
+    hashes += [_hash(f"{a} {b}") for a, b in zip(words, words[1:])]
+    return hashes
+
+def hash_vectors(texts, dim, out=None):
+    # One L2-normalised row per text, hashed in a single batch.
+    texts = list(texts)
+    matrix = out if out is not None else np.zeros((len(texts), dim), dtype=np.float32)
+    per_text = [feature_hashes(text) for text in texts]
+    total = sum(len(row) for row in per_text)
+    if not total:
+        return matrix
+    rows = np.repeat(np.arange(len(texts)), [len(row) for row in per_text])
+    hashes = np.fromiter((value for row in per_text for value in row), dtype=np.uint64, count=total)
+    # The top bit picks the sign, so colliding features tend to cancel out
+    # instead of inflating each other.
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    cells = rows * dim + (hashes % dim).astype(np.intp)
+    matrix[:len(texts)] += np.bincount(cells, weights=signs, minlength=len(texts) * dim).reshape(len(texts), dim)
+    norms = np.linalg.norm(matrix[:len(texts)], axis=1, keepdims=True)
+    np.divide(matrix[:len(texts)], norms, out=matrix[:len(texts)], where=norms > 0)
+    return matrix
+
+def hash_vector(text, dim):
+    return hash_vectors([text], dim)[0]
+
+def doubt_text(doubt):
+    return f"{doubt.get('topic') or ''} {doubt.get('question') or ''}"
+
+class SimilarityIndex:
+    def __init__(self, dim=512, capacity=1024, refresh=60):
+        self.dim = dim
+        self.refresh = refresh
+        self.high_water = None
+        self._capacity = capacity
+        self._matrix = None
+        self._ids = []
+        self._rows = {}
+        self._payloads = {}
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def stale(self):
+        # Due for a sync with storage: never synced, or last synced more than
+        # `refresh` seconds ago (answers written by other processes).
+        with self._lock:
+            return self._synced_at is None or time.monotonic() - self._synced_at > self.refresh
+
+    def mark_synced(self, high_water):
+        with self._lock:
+            self.high_water = high_water
+            self._synced_at = time.monotonic()
+
+    def add(self, doc_id, text, payload=None):
+        self.add_many([(doc_id, text, payload)])
+
+    def add_many(self, items):
+        # items: (doc_id, text, payload) triples. Adding an id that is
+        # already indexed replaces its vector and payload.
+        items = list(items)
+        if not items:
+            return
+        vectors = np.zeros((len(items), self.dim), dtype=np.float32)
+        for start in range(0, len(items), BATCH_SIZE):
+            chunk = items[start:start + BATCH_SIZE]
+            hash_vectors((text for _, text, _ in chunk), self.dim, out=vectors[start:start + len(chunk)])
+        with self._lock:
+            rows = []
+            for doc_id, _, payload in items:
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = self._rows[doc_id] = len(self._ids)
+                    self._ids.append(doc_id)
+                rows.append(row)
+                self._payloads[doc_id] = payload
+            self._reserve(len(self._ids))
+            self._matrix[rows] = vectors
+
+    def _reserve(self, size):
+        current = len(self._matrix) if self._matrix is not None else 0
+        if size <= current:
+            return
+        matrix = np.zeros((max(size, current * 2, self._capacity), self.dim), dtype=np.float32)
+        if current:
+            matrix[:current] = self._matrix
+        self._matrix = matrix
+
+    def remove(self, doc_id):
+        with self._lock:
+            row = self._rows.pop(doc_id, None)
+            if row is None:
+                return
+            # The last row moves into the gap, keeping the live rows contiguous.
+            last = len(self._ids) - 1
+            if row != last:
+                moved = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+            self._ids.pop()
+            self._payloads.pop(doc_id, None)
+
+    def nearest(self, text, limit=5, min_score=0.0):
+        # [(payload, cosine similarity)], most similar first.
+        vector = hash_vector(text, self.dim)
+        if not vector.any():
+            return []
+        with self._lock:
+            count = len(self._ids)
+            if not count:
+                return []
+            scores = self._matrix[:count] @ vector
+            k = min(limit, count)
+            top = np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._payloads[self._ids[row]], float(scores[row])) for row in top if scores[row] >= min_score]
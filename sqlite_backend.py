@@ -0,0 +1,675 @@
+import datetime
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from search import DoubtSearchIndex
+
+# Embedded storage backend. SqliteClient implements the part of the supabase
+# client DatabaseManager uses: table(...) query builders with PostgREST-style
+# filters, ordering and counts, plus the RPCs and triggers from migrations/.
+# Doubt search is served from an in-process inverted index (search.py).
+# Selected with storage.backend: sqlite in config.yaml.
+
+SCHEMA = """
+create table if not exists users (
+    id text primary key,
+    email text not null unique,
+    name text,
+    role text,
+    points integer not null default 0,
+    badges text not null default '[]',
+    logs text not null default '[]',
+    groups text not null default '[]',
+    difficult_topics text not null default '[]',
+    onboarded integer not null default 0,
+    preferences text not null default '{}',
+    goals text,
+    created_at text
+);
+
+create table if not exists teachers (
+    id text primary key default (lower(hex(randomblob(16)))),
+    email text not null unique,
+    name text,
+    verified integer not null default 0,
+    created_at text
+);
+
+create table if not exists class_data (
+    id text primary key default (lower(hex(randomblob(16)))),
+    user_id text,
+    subject text,
+    topics text not null default '[]',
+    notes text,
+    created_at text
+);
+create index if not exists class_data_created_at_idx on class_data (created_at);
+
+create table if not exists doubts (
+    id text primary key,
+    user_id text not null references users (id) on delete cascade,
+    topic text,
+    question text,
+    response text,
+    response_by text,
+    created_at text not null,
+    responded_at text
+);
+create index if not exists doubts_created_at_id_idx on doubts (created_at desc, id desc);
+create index if not exists doubts_user_id_created_at_idx on doubts (user_id, created_at desc);
+
+create table if not exists study_logs (
+    id text primary key default (lower(hex(randomblob(16)))),
+    user_id text not null references users (id) on delete cascade,
+    date text not null,
+    subject text,
+    topics text not null default '[]',
+    notes text,
+    timestamp text not null,
+    unique (user_id, timestamp)
+);
+create index if not exists study_logs_timestamp_id_idx on study_logs (timestamp, id);
+
+create table if not exists daily_rollups (
+    user_id text not null references users (id) on delete cascade,
+    day text not null,
+    subject text not null default '',
+    checkins integer not null default 0,
+    topics integer not null default 0,
+    updated_at text,
+    primary key (user_id, day, subject)
+);
+
+create trigger if not exists study_logs_daily_rollup after insert on study_logs
+begin
+    insert into daily_rollups (user_id, day, subject, checkins, topics, updated_at)
+    values (new.user_id, new.date, coalesce(new.subject, ''), 1, json_array_length(coalesce(new.topics, '[]')), strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+    on conflict (user_id, day, subject) do update
+    set checkins = checkins + 1,
+        topics = topics + excluded.topics,
+        updated_at = excluded.updated_at;
+end;
+
+create table if not exists rate_limit_buckets (
+    key text primary key,
+    tokens real not null,
+    updated_at real not null
+);
+
+create table if not exists quiz_questions (
+    id text primary key default (lower(hex(randomblob(16)))),
+    topic text not null,
+    prompt text not null,
+    options text not null,
+    answer integer not null,
+    explanation text,
+    created_by text references users (id) on delete set null,
+    created_at text
+);
+create index if not exists quiz_questions_topic_idx on quiz_questions (topic);
+
+create table if not exists quiz_attempts (
+    id text primary key,
+    user_id text not null references users (id) on delete cascade,
+    topic text not null,
+    question_ids text not null,
+    answers text not null,
+    score integer not null,
+    total integer not null,
+    started_at text not null,
+    submitted_at text
+);
+create index if not exists quiz_attempts_user_id_submitted_at_idx on quiz_attempts (user_id, submitted_at desc);
+
+create table if not exists quiz_topic_stats (
+    topic text primary key,
+    attempts integer not null default 0,
+    correct integer not null default 0,
+    questions integer not null default 0,
+    updated_at text
+);
+
+create trigger if not exists quiz_attempts_topic_stats after insert on quiz_attempts
+begin
+    insert into quiz_topic_stats (topic, attempts, correct, questions, updated_at)
+    values (new.topic, 1, new.score, new.total, strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+    on conflict (topic) do update
+    set attempts = attempts + 1,
+        correct = correct + excluded.correct,
+        questions = questions + excluded.questions,
+        updated_at = excluded.updated_at;
+end;
+
+create table if not exists mock_tests (
+    id text primary key default (lower(hex(randomblob(16)))),
+    title text not null,
+    topic text not null,
+    question_ids text not null,
+    duration_minutes integer not null check (duration_minutes > 0),
+    created_by text references users (id) on delete set null,
+    created_at text
+);
+
+create table if not exists mock_test_sessions (
+    id text primary key default (lower(hex(randomblob(16)))),
+    test_id text not null references mock_tests (id) on delete cascade,
+    user_id text not null references users (id) on delete cascade,
+    started_at text not null,
+    deadline text not null,
+    answers text not null default '{}',
+    saved_at text,
+    submitted_at text,
+    score integer,
+    total integer,
+    unique (test_id, user_id)
+);
+
+create table if not exists mock_question_stats (
+    test_id text not null references mock_tests (id) on delete cascade,
+    question_id text not null,
+    shard integer not null,
+    attempts integer not null default 0,
+    correct integer not null default 0,
+    skipped integer not null default 0,
+    primary key (test_id, question_id, shard)
+);
+"""
+
+JSON_COLUMNS = {
+    "users": {"badges", "logs", "groups", "difficult_topics", "preferences"},
+    "class_data": {"topics"},
+    "study_logs": {"topics"},
+    "quiz_questions": {"options"},
+    "quiz_attempts": {"question_ids", "answers"},
+    "mock_tests": {"question_ids"},
+    "mock_test_sessions": {"answers"}
+}
+
+BOOL_COLUMNS = {"users": {"onboarded"}, "teachers": {"verified"}}
+
+# Doubts read and indexed per lock acquisition while the search index builds.
+SEARCH_INDEX_BATCH = 5000
+
+OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+class SqliteBackendError(Exception):
+    pass
+
+class Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class SqliteClient:
+    def __init__(self, path="tracker.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # One connection shared by the query executor's threads; sqlite3
+        # connections must not be used concurrently.
+        self.lock = threading.RLock()
+        self.functions = {**RPCS, "search_doubts": self.search_doubts}
+        self.logger = logging.getLogger(__name__)
+        self.search_index = None
+        self.search_ready = threading.Event()
+        self._building = None
+        self._data_version = None
+        with self.lock:
+            if path != ":memory:":
+                self.conn.execute("pragma journal_mode = wal")
+            self.conn.execute("pragma synchronous = normal")
+            self.conn.execute("pragma foreign_keys = on")
+            self.conn.executescript(SCHEMA)
+            self.columns = {
+                table: [row["name"] for row in self.conn.execute(f"pragma table_info({table})")]
+                for (table,) in self.conn.execute("select name from sqlite_master where type = 'table'")
+            }
+        self.search_thread = self._start_search_build()
+
+    def table(self, name):
+        if name not in self.columns:
+            raise SqliteBackendError(f"Unknown table {name}")
+        return QueryBuilder(self, name)
+
+    def rpc(self, name, params=None):
+        function = self.functions.get(name)
+        if function is None:
+            raise SqliteBackendError(f"Unknown function {name}")
+        # Searches wait, without holding the lock, for the first index build.
+        return RpcCall(self, function, params or {}, self.search_ready if name == "search_doubts" else None)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def search_doubts(self, conn, p_query, p_topic=None, p_answered=None, p_since=None, p_until=None, p_limit=10, p_offset=0):
+        # Same contract as the search_doubts function in migrations/007.
+        # Writes through this client update the index directly. data_version
+        # changes only when another connection (another process sharing the
+        # file) commits; the index is then rebuilt in the background and this
+        # search is answered from the current one.
+        if conn.execute("pragma data_version").fetchone()[0] != self._data_version and self._building is None:
+            self.search_thread = self._start_search_build()
+        if self.search_index is None:
+            return []
+        hits, total = self.search_index.search(p_query, p_topic, p_answered, p_since, p_until, p_limit, p_offset)
+        if not hits:
+            return []
+        ids = [doc_id for doc_id, _ in hits]
+        rows = {row["id"]: dict(row) for row in conn.execute(f"select * from doubts where id in ({', '.join('?' * len(ids))})", ids)}
+        return [{**rows[doc_id], "rank": score, "total": total} for doc_id, score in hits if doc_id in rows]
+
+    def _start_search_build(self):
+        with self.lock:
+            self._building = DoubtSearchIndex()
+            self._data_version = self.conn.execute("pragma data_version").fetchone()[0]
+        thread = threading.Thread(target=self._build_search_index, args=(self._building,), name="doubt-search-index", daemon=True)
+        thread.start()
+        return thread
+
+    def _build_search_index(self, index):
+        # Reads in id order, one batch per lock acquisition, so queries and
+        # writes interleave with a build over a large table. Writes made
+        # meanwhile are applied to the new index too (see written).
+        last = ""
+        try:
+            while True:
+                with self.lock:
+                    rows = self.conn.execute(
+                        "select id, topic, question, response, created_at from doubts where id > ? order by id limit ?",
+                        (last, SEARCH_INDEX_BATCH)
+                    ).fetchall()
+                    for row in rows:
+                        index.add(dict(row))
+                if len(rows) < SEARCH_INDEX_BATCH:
+                    break
+                last = rows[-1]["id"]
+            with self.lock:
+                self.search_index = index
+        except sqlite3.Error as e:
+            self.logger.error("Error building the doubt search index: %s", e)
+        finally:
+            with self.lock:
+                self._building = None
+            self.search_ready.set()
+
+    def written(self, table, action, rows):
+        # Keeps the search index, and one being built, in step with doubt writes.
+        if table != "doubts":
+            return
+        for index in (self.search_index, self._building):
+            if index is None:
+                continue
+            for row in rows:
+                if action == "delete":
+                    index.remove(row["id"])
+                else:
+                    index.add(row)
+
+    def encode(self, table, row):
+        encoded = {}
+        for column, value in row.items():
+            self.check_column(table, column)
+            if column in JSON_COLUMNS.get(table, ()):
+                value = json.dumps(value, ensure_ascii=False) if value is not None else None
+            elif isinstance(value, bool):
+                value = int(value)
+            encoded[column] = value
+        return encoded
+
+    def decode(self, table, row):
+        decoded = dict(row)
+        for column in JSON_COLUMNS.get(table, ()):
+            if decoded.get(column) is not None:
+                decoded[column] = json.loads(decoded[column])
+        for column in BOOL_COLUMNS.get(table, ()):
+            if decoded.get(column) is not None:
+                decoded[column] = bool(decoded[column])
+        return decoded
+
+    def check_column(self, table, column):
+        # Column names are interpolated into SQL, so only known ones pass.
+        if column not in self.columns[table]:
+            raise SqliteBackendError(f"Unknown column {table}.{column}")
+        return column
+
+class RpcCall:
+    def __init__(self, client, function, params, ready=None):
+        self.client = client
+        self.function = function
+        self.params = params
+        self.ready = ready
+
+    def execute(self):
+        if self.ready is not None:
+            self.ready.wait()
+        with self.client.lock, self.client.conn:
+            return Response(self.function(self.client.conn, **self.params))
+
+class QueryBuilder:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.columns = ["*"]
+        self.count = None
+        self.values = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.where = []
+        self.params = []
+        self.ordering = []
+        self.row_limit = None
+        self.single_row = False
+        self._negate = False
+
+    def select(self, *columns, count=None):
+        names = [name.strip() for column in columns for name in column.split(",") if name.strip()]
+        self.columns = names or ["*"]
+        for name in self.columns:
+            if name != "*":
+                self.client.check_column(self.table, name)
+        self.count = count
+        return self
+
+    def insert(self, values):
+        self.action, self.values = "insert", values
+        return self
+
+    def upsert(self, values, on_conflict="", ignore_duplicates=False):
+        self.action, self.values = "upsert", values
+        self.on_conflict = [self.client.check_column(self.table, c.strip()) for c in on_conflict.split(",") if c.strip()]
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values):
+        self.action, self.values = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", list(values))
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def or_(self, filters):
+        sql, params = self._parse_group("or", filters)
+        return self._add(sql, params)
+
+    def order(self, column, desc=False):
+        self.ordering.append(f"{self.client.check_column(self.table, column)} {'desc' if desc else 'asc'}")
+        return self
+
+    def limit(self, size):
+        self.row_limit = int(size)
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def execute(self):
+        with self.client.lock:
+            if self.action == "select":
+                return self._select()
+            with self.client.conn:
+                rows = self._insert() if self.action in ("insert", "upsert") else self._update_or_delete()
+            self.client.written(self.table, self.action, rows)
+            return Response(rows)
+
+    def _filter(self, column, op, value):
+        return self._add(*self._condition(column, op, value))
+
+    def _add(self, sql, params):
+        if self._negate:
+            sql, self._negate = f"not ({sql})", False
+        self.where.append(sql)
+        self.params.extend(params)
+        return self
+
+    def _condition(self, column, op, value):
+        column = self.client.check_column(self.table, column)
+        if op == "in":
+            if not value:
+                return "0", []
+            return f"{column} in ({', '.join('?' * len(value))})", value
+        if op == "is":
+            literal = {"null": "null", "true": "1", "false": "0"}.get(str(value).lower())
+            if literal is None:
+                raise SqliteBackendError(f"Unsupported is_ value {value}")
+            return f"{column} is {literal}", []
+        if op not in OPERATORS:
+            raise SqliteBackendError(f"Unsupported operator {op}")
+        if isinstance(value, bool):
+            value = int(value)
+        return f"{column} {OPERATORS[op]} ?", [value]
+
+    def _parse_group(self, connector, text):
+        # PostgREST logic trees: "a.eq.1,and(b.gt.\"x\",c.lt.2)".
+        parts, params = [], []
+        for item in _split_top_level(text):
+            for nested in ("and", "or"):
+                if item.startswith(f"{nested}(") and item.endswith(")"):
+                    sql, nested_params = self._parse_group(nested, item[len(nested) + 1:-1])
+                    break
+            else:
+                column, op, value = item.split(".", 2)
+                if len(value) >= 2 and value[0] == value[-1] == '"':
+                    value = value[1:-1]
+                sql, nested_params = self._condition(column, op, value)
+            parts.append(f"({sql})")
+            params.extend(nested_params)
+        return f" {connector} ".join(parts), params
+
+    def _where_sql(self):
+        return f" where {' and '.join(self.where)}" if self.where else ""
+
+    def _select(self):
+        sql = f"select {', '.join(self.columns)} from {self.table}{self._where_sql()}"
+        if self.ordering:
+            sql += f" order by {', '.join(self.ordering)}"
+        params = list(self.params)
+        if self.row_limit is not None:
+            sql += " limit ?"
+            params.append(self.row_limit)
+        rows = [self.client.decode(self.table, row) for row in self.client.conn.execute(sql, params)]
+        count = None
+        if self.count:
+            count = self.client.conn.execute(f"select count(*) from {self.table}{self._where_sql()}", self.params).fetchone()[0]
+        if self.single_row:
+            if len(rows) != 1:
+                raise SqliteBackendError(f"Expected one row from {self.table}, got {len(rows)}")
+            return Response(rows[0], count)
+        return Response(rows, count)
+
+    def _insert(self):
+        rows = self.values if isinstance(self.values, list) else [self.values]
+        inserted = []
+        for row in rows:
+            row = self.client.encode(self.table, row)
+            columns = list(row)
+            sql = f"insert into {self.table} ({', '.join(columns)}) values ({', '.join('?' * len(columns))})"
+            if self.action == "upsert":
+                conflict = ", ".join(self.on_conflict) if self.on_conflict else "id"
+                updates = [column for column in columns if column not in self.on_conflict]
+                if self.ignore_duplicates or not updates:
+                    sql += f" on conflict ({conflict}) do nothing"
+                else:
+                    sql += f" on conflict ({conflict}) do update set {', '.join(f'{c} = excluded.{c}' for c in updates)}"
+            inserted.extend(self.client.decode(self.table, r) for r in self.client.conn.execute(sql + " returning *", list(row.values())))
+        return inserted
+
+    def _update_or_delete(self):
+        if self.action == "update":
+            values = self.client.encode(self.table, self.values)
+            sql = f"update {self.table} set {', '.join(f'{column} = ?' for column in values)}{self._where_sql()}"
+            params = list(values.values()) + self.params
+        else:
+            sql, params = f"delete from {self.table}{self._where_sql()}", self.params
+        return [self.client.decode(self.table, row) for row in self.client.conn.execute(sql + " returning *", params)]
+
+def _split_top_level(text):
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+# RPCs from migrations/002, 004, 006 and 009 (search_doubts from 007 is a
+# SqliteClient method). Each runs inside one transaction.
+
+def increment_user_points(conn, p_user_id, p_amount):
+    row = conn.execute("update users set points = coalesce(points, 0) + ? where id = ? returning points", (p_amount, p_user_id)).fetchone()
+    return row[0] if row else None
+
+def append_user_badge(conn, p_user_id, p_badge):
+    row = conn.execute(
+        """update users set badges = case
+               when exists (select 1 from json_each(coalesce(badges, '[]')) where value = ?) then badges
+               else json_insert(coalesce(badges, '[]'), '$[#]', ?)
+           end
+           where id = ? returning badges""",
+        (p_badge, p_badge, p_user_id)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+def backfill_daily_rollups(conn, p_user_id=None):
+    conn.execute("delete from daily_rollups where ? is null or user_id = ?", (p_user_id, p_user_id))
+    cursor = conn.execute(
+        """insert into daily_rollups (user_id, day, subject, checkins, topics, updated_at)
+           select user_id, date, coalesce(subject, ''), count(*), sum(json_array_length(coalesce(topics, '[]'))), strftime('%Y-%m-%dT%H:%M:%f', 'now')
+           from study_logs
+           where ? is null or user_id = ?
+           group by user_id, date, coalesce(subject, '')""",
+        (p_user_id, p_user_id)
+    )
+    return cursor.rowcount
+
+def take_rate_token(conn, p_key, p_capacity, p_refill_per_second, now=None):
+    now = time.time() if now is None else now
+    tokens = conn.execute(
+        """insert into rate_limit_buckets (key, tokens, updated_at) values (?, ?, ?)
+           on conflict (key) do update
+           set tokens = min(?, tokens + (excluded.updated_at - updated_at) * ?),
+               updated_at = excluded.updated_at
+           returning tokens""",
+        (p_key, p_capacity, now, p_capacity, p_refill_per_second)
+    ).fetchone()[0]
+    if tokens >= 1:
+        conn.execute("update rate_limit_buckets set tokens = ? where key = ?", (tokens - 1, p_key))
+        return {"allowed": True, "retry_after": 0}
+    return {"allowed": False, "retry_after": (1 - tokens) / p_refill_per_second}
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+def _session(row):
+    return {**dict(row), "answers": json.loads(row["answers"])} if row else None
+
+def start_mock_test(conn, p_test_id, p_user_id, now=None):
+    now = now or _utcnow()
+    test = conn.execute("select duration_minutes from mock_tests where id = ?", (p_test_id,)).fetchone()
+    if test is None:
+        return None
+    conn.execute(
+        """insert into mock_test_sessions (test_id, user_id, started_at, deadline) values (?, ?, ?, ?)
+           on conflict (test_id, user_id) do nothing""",
+        (p_test_id, p_user_id, now.isoformat(), (now + datetime.timedelta(minutes=test[0])).isoformat())
+    )
+    session = _session(conn.execute("select * from mock_test_sessions where test_id = ? and user_id = ?", (p_test_id, p_user_id)).fetchone())
+    return {**session, "server_now": now.isoformat()}
+
+def save_mock_answers(conn, p_session_id, p_answers, now=None):
+    now = (now or _utcnow()).isoformat()
+    row = conn.execute(
+        """update mock_test_sessions
+           set answers = json_patch(answers, ?), saved_at = ?
+           where id = ? and submitted_at is null and ? <= deadline
+           returning 1""",
+        (json.dumps(p_answers), now, p_session_id, now)
+    ).fetchone()
+    return True if row else None
+
+def submit_mock_test(conn, p_session_id, p_answers, p_grace_seconds=30, now=None):
+    now = now or _utcnow()
+    session = _session(conn.execute("select * from mock_test_sessions where id = ?", (p_session_id,)).fetchone())
+    if session is None or session["submitted_at"] is not None:
+        return session
+    answers = session["answers"]
+    if now <= datetime.datetime.fromisoformat(session["deadline"]) + datetime.timedelta(seconds=p_grace_seconds):
+        answers = {**answers, **(p_answers or {})}
+    question_ids = json.loads(conn.execute("select question_ids from mock_tests where id = ?", (session["test_id"],)).fetchone()[0])
+    keys = dict(conn.execute(
+        f"select id, answer from quiz_questions where id in ({', '.join('?' * len(question_ids))})", question_ids
+    ).fetchall()) if question_ids else {}
+    graded = [(question_id, answers.get(question_id) == keys[question_id], question_id not in answers) for question_id in question_ids if question_id in keys]
+    shard = random.randrange(8)
+    conn.executemany(
+        """insert into mock_question_stats (test_id, question_id, shard, attempts, correct, skipped)
+           values (?, ?, ?, 1, ?, ?)
+           on conflict (test_id, question_id, shard) do update
+           set attempts = attempts + 1, correct = correct + excluded.correct, skipped = skipped + excluded.skipped""",
+        [(session["test_id"], question_id, shard, int(correct), int(skipped)) for question_id, correct, skipped in graded]
+    )
+    return _session(conn.execute(
+        "update mock_test_sessions set answers = ?, submitted_at = ?, score = ?, total = ? where id = ? returning *",
+        (json.dumps(answers), now.isoformat(), sum(correct for _, correct, _ in graded), len(graded), p_session_id)
+    ).fetchone())
+
+def finalize_mock_tests(conn, p_test_id, p_grace_seconds=30, now=None):
+    now = now or _utcnow()
+    expired = [row[0] for row in conn.execute(
+        "select id, deadline from mock_test_sessions where test_id = ? and submitted_at is null", (p_test_id,)
+    ) if now > datetime.datetime.fromisoformat(row[1]) + datetime.timedelta(seconds=p_grace_seconds)]
+    for session_id in expired:
+        submit_mock_test(conn, session_id, {}, p_grace_seconds, now)
+    return len(expired)
+
+RPCS = {
+    "increment_user_points": increment_user_points,
+    "append_user_badge": append_user_badge,
+    "backfill_daily_rollups": backfill_daily_rollups,
+    "take_rate_token": take_rate_token,
+    "start_mock_test": start_mock_test,
+    "save_mock_answers": save_mock_answers,
+    "submit_mock_test": submit_mock_test,
+    "finalize_mock_tests": finalize_mock_tests
+}
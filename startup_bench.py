@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+import yaml
+
+# Cold-start benchmark: imports each entry module in a fresh interpreter with
+# -X importtime and checks the cumulative import time against the budget in
+# config.yaml (performance.cold_start).
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def measure_imports(module, runs=3):
+    # Returns {imported module: cumulative ms}, taking the best of `runs`
+    # fresh interpreters so a noisy run does not fail the budget.
+    best = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=HERE, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+        timings = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            timings[name.strip()] = int(cumulative) / 1000
+        for name, ms in timings.items():
+            best[name] = min(ms, best.get(name, ms))
+    return best
+
+def check_budget(budget):
+    report = {}
+    violations = []
+    for module, limit_ms in budget.get('modules', {}).items():
+        timings = measure_imports(module)
+        report[module] = timings.get(module, 0.0)
+        if report[module] > limit_ms:
+            violations.append(f"{module}: {report[module]:.0f} ms > budget {limit_ms} ms")
+        for lazy in budget.get('lazy_modules', []):
+            if lazy in timings:
+                violations.append(f"{module}: imports {lazy} at startup ({timings[lazy]:.0f} ms)")
+    return report, violations
+
+def load_budget(config_path=os.path.join(HERE, 'config.yaml')):
+    with open(config_path, 'r') as f:
+        return yaml.safe_load(f).get('performance', {}).get('cold_start', {})
+
+if __name__ == "__main__":
+    report, violations = check_budget(load_budget())
+    for module, ms in sorted(report.items(), key=lambda item: -item[1]):
+        print(f"{module:<12} {ms:8.1f} ms")
+    for violation in violations:
+        print(f"FAIL {violation}")
+    sys.exit(1 if violations else 0)
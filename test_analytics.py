@@ -0,0 +1,56 @@
+import pytest
+import datetime
+from analytics import AnalyticsEngine, build_frame, compute_streaks, subject_counts, topic_recurrence, weekly_heatmap
+
+def make_logs(*days):
+    return [
+        {"id": f"log-{i}", "date": day, "subject": subject, "topics": topics, "timestamp": f"{day}T10:00:00"}
+        for i, (day, subject, topics) in enumerate(days)
+    ]
+
+@pytest.fixture
+def logs():
+    return make_logs(
+        ("2024-01-01", "Math", ["Algebra"]),
+        ("2024-01-02", "Math", ["Algebra", "Calculus"]),
+        ("2024-01-03", "Physics", ["Optics"]),
+        ("2024-01-03", "Math", ["Calculus"]),
+        ("2024-01-06", "Math", ["Algebra"]),
+        ("2024-01-07", "Physics", [])
+    )
+
+def test_streaks(logs):
+    streaks = compute_streaks(build_frame(logs), today=datetime.date(2024, 1, 8))
+    assert streaks == {"current": 2, "longest": 3, "active_days": 5}
+    assert compute_streaks(build_frame(logs), today=datetime.date(2024, 1, 10))["current"] == 0
+
+def test_subject_counts(logs):
+    counts = subject_counts(build_frame(logs))
+    assert dict(zip(counts["subject"], counts["count"])) == {"Math": 4, "Physics": 2}
+
+def test_weekly_heatmap(logs):
+    grid = weekly_heatmap(build_frame(logs))
+    assert grid["count"].sum() == 6
+    wednesday = grid[(grid["weekday"] == "Wed")]
+    assert wednesday["count"].tolist() == [2]
+
+def test_topic_recurrence(logs):
+    topics = topic_recurrence(build_frame(logs))
+    algebra = topics[topics["topic"] == "Algebra"].iloc[0]
+    assert topics["topic"].iloc[0] == "Algebra"
+    assert algebra["count"] == 3
+    assert algebra["days"] == 3
+
+def test_empty_logs():
+    result = AnalyticsEngine().analyze("u1", [])
+    assert result["total"] == 0
+    assert result["streaks"]["longest"] == 0
+    assert result["heatmap"].empty
+
+def test_results_cached_per_log_version(logs):
+    engine = AnalyticsEngine()
+    today = datetime.date(2024, 1, 8)
+    first = engine.analyze("u1", logs, today)
+    assert engine.analyze("u1", list(logs), today) is first
+    logs.append({"id": "log-new", "date": "2024-01-08", "subject": "Math", "topics": []})
+    assert engine.analyze("u1", logs, today)["total"] == 7
@@ -0,0 +1,28 @@
+import pytest
+from bench import LatencyClient, compare, run_suite
+from sqlite_backend import SqliteClient
+
+SMALL = {"latency_ms": 0, "users": 2, "doubts": 30, "logs_per_user": 20, "iterations": 2}
+
+def test_latency_client_counts_round_trips():
+    client = LatencyClient(SqliteClient(":memory:"))
+    client.table("users").select("id").not_.is_("email", "null").limit(1).execute()
+    client.rpc("backfill_daily_rollups", {"p_user_id": None}).execute()
+    assert client.round_trips == 2
+
+def test_suite_reports_every_scenario_in_both_modes():
+    results = run_suite(SMALL)
+    assert len(results) == 10
+    assert results["pages.doubts.cold"]["round_trips"] > results["pages.doubts.warm"]["round_trips"]
+    assert results["app.main.warm"]["round_trips"] == 0
+    assert all(result["peak_kib"] > 0 for result in results.values())
+
+def test_compare_flags_round_trip_and_latency_regressions():
+    baseline = {"a": {"median_ms": 10.0, "peak_kib": 100.0, "round_trips": 2}}
+    assert compare({"a": {"median_ms": 12.0, "peak_kib": 100.0, "round_trips": 2}}, baseline, 0.25) == []
+    regressions = compare({"a": {"median_ms": 13.0, "peak_kib": 100.0, "round_trips": 3}}, baseline, 0.25)
+    assert len(regressions) == 2
+
+def test_compare_ignores_sub_millisecond_latency_noise():
+    baseline = {"a": {"median_ms": 0.3, "peak_kib": 10.0, "round_trips": 0}}
+    assert compare({"a": {"median_ms": 0.6, "peak_kib": 10.0, "round_trips": 0}}, baseline, 0.25) == []
@@ -0,0 +1,107 @@
+import pytest
+import asyncio
+from cache import AsyncTTLCache, cached
+
+class Reader:
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = 0
+        self.fail = False
+
+    @cached(ttl=60, tags=lambda row, item_id: [f"item:{item_id}"], default={})
+    async def get_item(self, item_id):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("backend down")
+        return {"id": item_id, "calls": self.calls}
+
+@pytest.fixture
+def reader():
+    return Reader(AsyncTTLCache(maxsize=2))
+
+@pytest.mark.asyncio
+async def test_hit_returns_cached_copy(reader):
+    first = await reader.get_item("a")
+    first["calls"] = 99
+    second = await reader.get_item("a")
+    assert second == {"id": "a", "calls": 1}
+    assert reader.calls == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_single_flight(reader):
+    results = await asyncio.gather(*(reader.get_item("a") for _ in range(5)))
+    assert reader.calls == 1
+    assert all(r == {"id": "a", "calls": 1} for r in results)
+    stats = reader.cache.stats()
+    assert stats["coalesced"] == 4
+    assert stats["hits"] == 0
+
+@pytest.mark.asyncio
+async def test_ttl_expiry():
+    now = [1000.0]
+    reader = Reader(AsyncTTLCache(maxsize=2, clock=lambda: now[0]))
+    await reader.get_item("a")
+    now[0] += 59
+    await reader.get_item("a")
+    assert reader.calls == 1
+    now[0] += 61
+    await reader.get_item("a")
+    assert reader.calls == 2
+
+@pytest.mark.asyncio
+async def test_lru_eviction(reader):
+    await reader.get_item("a")
+    await reader.get_item("b")
+    await reader.get_item("a")
+    await reader.get_item("c")
+    await reader.get_item("a")
+    assert reader.calls == 3
+    await reader.get_item("b")
+    assert reader.calls == 4
+    assert reader.cache.stats()["evictions"] == 2
+
+@pytest.mark.asyncio
+async def test_invalidate_by_tag(reader):
+    await reader.get_item("a")
+    await reader.get_item("b")
+    reader.cache.invalidate("item:a")
+    await reader.get_item("a")
+    await reader.get_item("b")
+    assert reader.calls == 3
+
+@pytest.mark.asyncio
+async def test_failures_return_default_and_are_not_cached(reader):
+    reader.fail = True
+    assert await reader.get_item("a") == {}
+    reader.fail = False
+    assert (await reader.get_item("a"))["id"] == "a"
+    assert reader.calls == 2
+
+@pytest.mark.asyncio
+async def test_write_during_load_is_not_cached(reader):
+    task = asyncio.ensure_future(reader.get_item("a"))
+    await asyncio.sleep(0)
+    reader.cache.invalidate("item:a")
+    await task
+    await reader.get_item("a")
+    assert reader.calls == 2
+
+@pytest.mark.asyncio
+async def test_unrelated_write_during_load_keeps_result(reader):
+    task = asyncio.ensure_future(reader.get_item("a"))
+    await asyncio.sleep(0)
+    reader.cache.invalidate("item:b")
+    await task
+    await reader.get_item("a")
+    assert reader.calls == 1
+
+@pytest.mark.asyncio
+async def test_stats_hit_rate(reader):
+    await reader.get_item("a")
+    await reader.get_item("a")
+    await reader.get_item("a")
+    stats = reader.cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
@@ -1,7 +1,9 @@
 import pytest
 import asyncio
-from unittest.mock import Mock
-from database import DatabaseManager
+import threading
+from unittest.mock import Mock, patch
+from database import DatabaseManager, UserIdentityMap, configure_pool, diff_fields, resolve_columns, take_snapshot
+from supabase import create_client
 
 @pytest.fixture
 def supabase_client():
@@ -13,11 +15,19 @@ def supabase_client():
     client.execute = Mock()
     client.insert = Mock(return_value=client)
     client.update = Mock(return_value=client)
+    client.upsert = Mock(return_value=client)
+    client.order = Mock(return_value=client)
+    client.rpc = Mock(return_value=client)
+    client.or_ = Mock(return_value=client)
+    client.limit = Mock(return_value=client)
+    client.in_ = Mock(return_value=client)
+    client.gte = Mock(return_value=client)
     return client
 
 @pytest.fixture
 def db_manager(supabase_client):
-    db = DatabaseManager("mock_url", "mock_key")
+    with patch("database.create_client", return_value=supabase_client):
+        db = DatabaseManager("mock_url", "mock_key")
     db.supabase = supabase_client
     return db
 
@@ -56,4 +66,286 @@ async def test_insert_doubt(db_manager, supabase_client):
     doubt_data = {"id": "789", "user_id": "123", "question": "Test doubt"}
     result = await db_manager.insert_doubt(doubt_data)
     assert result is True
-    supabase_client.insert.assert_called_with(doubt_data)
\ No newline at end of file
+    supabase_client.insert.assert_called_with(doubt_data)
+
+@pytest.mark.asyncio
+async def test_append_log_inserts_single_row(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = [{"id": "log-1", "user_id": "123", "subject": "Math"}]
+    log = {"date": "2024-01-01", "subject": "Math", "topics": ["Algebra"]}
+    result = await db_manager.append_log("123", log)
+    assert result["id"] == "log-1"
+    supabase_client.table.assert_called_with("study_logs")
+    supabase_client.insert.assert_called_with({"user_id": "123", **log})
+    supabase_client.update.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_logs(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = [{"id": "log-1", "subject": "Math"}]
+    logs = await db_manager.get_logs("123")
+    assert logs == [{"id": "log-1", "subject": "Math"}]
+    supabase_client.eq.assert_called_with("user_id", "123")
+    supabase_client.order.assert_called_with("timestamp")
+
+@pytest.mark.asyncio
+async def test_migrate_logs_moves_legacy_array(db_manager, supabase_client):
+    legacy = [{"date": "2024-01-01", "subject": "Math", "timestamp": "2024-01-01T10:00:00"}]
+    migrated = await db_manager.migrate_logs("123", legacy)
+    assert migrated == 1
+    supabase_client.upsert.assert_called_with(
+        [{"user_id": "123", **legacy[0]}], on_conflict="user_id,timestamp", ignore_duplicates=True
+    )
+    supabase_client.update.assert_called_with({"logs": []})
+
+@pytest.mark.asyncio
+async def test_migrate_logs_noop_without_legacy_logs(db_manager, supabase_client):
+    assert await db_manager.migrate_logs("123", []) == 0
+    supabase_client.upsert.assert_not_called()
+
+def test_diff_fields_skips_unchanged_and_counter_fields():
+    snapshot = {"id": "123", "name": "A", "goals": "x", "points": 4}
+    current = {"id": "123", "name": "A", "goals": "y", "points": 6, "logs": [{}], "onboarded": True}
+    assert diff_fields(snapshot, current) == {"goals": "y", "onboarded": True}
+
+@pytest.mark.asyncio
+async def test_patch_user_writes_only_changed_fields(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = [{"id": "123", "goals": "y"}]
+    user_data = {"id": "123", "goals": "x", "preferences": {"language": "English"}, "logs": []}
+    snapshot = take_snapshot(user_data)
+    user_data["goals"] = "y"
+    await db_manager.patch_user("123", snapshot, user_data)
+    assert snapshot["goals"] == "y"
+    supabase_client.update.assert_not_called()
+    await db_manager.commit_user("123")
+    supabase_client.update.assert_called_once_with({"goals": "y"})
+
+@pytest.mark.asyncio
+async def test_patch_user_coalesces_changes_into_one_write(db_manager, supabase_client):
+    user_data = {"id": "123", "goals": "x", "onboarded": False}
+    snapshot = take_snapshot(user_data)
+    user_data["goals"] = "y"
+    await db_manager.patch_user("123", snapshot, user_data)
+    user_data["goals"] = "z"
+    user_data["onboarded"] = True
+    await db_manager.patch_user("123", snapshot, user_data)
+    await db_manager.commit_user("123")
+    supabase_client.update.assert_called_once_with({"goals": "z", "onboarded": True})
+
+@pytest.mark.asyncio
+async def test_get_user_data_overlays_buffered_changes(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = {"id": "123", "goals": "x"}
+    user_data = {"id": "123", "goals": "x"}
+    snapshot = take_snapshot(user_data)
+    user_data["goals"] = "y"
+    await db_manager.patch_user("123", snapshot, user_data)
+    assert (await db_manager.get_user_data("123"))["goals"] == "y"
+
+@pytest.mark.asyncio
+async def test_commit_user_raises_and_keeps_changes_on_failure(db_manager, supabase_client):
+    supabase_client.execute.side_effect = RuntimeError("down")
+    user_data = {"id": "123", "goals": "x"}
+    snapshot = take_snapshot(user_data)
+    user_data["goals"] = "y"
+    await db_manager.patch_user("123", snapshot, user_data)
+    with pytest.raises(RuntimeError):
+        await db_manager.commit_user("123")
+    assert db_manager.writes.has_pending("123")
+    supabase_client.execute.side_effect = None
+    await db_manager.commit_user("123")
+    assert not db_manager.writes.has_pending("123")
+
+@pytest.mark.asyncio
+async def test_patch_user_skips_round_trip_when_unchanged(db_manager, supabase_client):
+    user_data = {"id": "123", "goals": "x"}
+    result = await db_manager.patch_user("123", take_snapshot(user_data), user_data)
+    assert result is None
+    supabase_client.update.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_increment_points_uses_rpc(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = 12
+    points = await db_manager.increment_points("123", 2)
+    assert points == 12
+    supabase_client.rpc.assert_called_with("increment_user_points", {"p_user_id": "123", "p_amount": 2})
+    supabase_client.update.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_append_badge_uses_rpc(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = ["first_doubt"]
+    badges = await db_manager.append_badge("123", "first_doubt")
+    assert badges == ["first_doubt"]
+    supabase_client.rpc.assert_called_with("append_user_badge", {"p_user_id": "123", "p_badge": "first_doubt"})
+
+@pytest.mark.asyncio
+async def test_get_doubts_page_first_page_counts_and_returns_cursor(db_manager, supabase_client):
+    rows = [{"id": f"d{i}", "created_at": f"2024-01-0{9 - i}T00:00:00"} for i in range(3)]
+    supabase_client.execute.return_value.data = rows
+    supabase_client.execute.return_value.count = 42
+    page = await db_manager.get_doubts_page(limit=2)
+    assert page["items"] == rows[:2]
+    assert page["next_cursor"] == ("2024-01-08T00:00:00", "d1")
+    assert page["total"] == 42
+    supabase_client.select.assert_called_with("*", count="estimated")
+    supabase_client.limit.assert_called_with(3)
+    supabase_client.or_.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_doubts_page_applies_keyset_cursor(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = [{"id": "d5", "created_at": "2024-01-01T00:00:00"}]
+    page = await db_manager.get_doubts_page(cursor=("2024-01-02T00:00:00", "d4"), limit=2)
+    assert page["next_cursor"] is None
+    supabase_client.select.assert_called_with("*", count=None)
+    supabase_client.or_.assert_called_with(
+        'created_at.lt."2024-01-02T00:00:00",and(created_at.eq."2024-01-02T00:00:00",id.lt.d4)'
+    )
+
+@pytest.mark.asyncio
+async def test_get_users_by_ids_single_query(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = [{"id": "t1", "name": "Teacher"}, {"id": "t2", "name": "Other"}]
+    users = await db_manager.get_users_by_ids(["t1", "t2", "t1", None])
+    assert users["t1"]["name"] == "Teacher"
+    supabase_client.select.assert_called_once_with("id, name")
+    supabase_client.in_.assert_called_once_with("id", ["t1", "t2"])
+
+@pytest.mark.asyncio
+async def test_user_identity_map_resolves_each_id_once(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = [{"id": "t1", "name": "Teacher"}]
+    users = UserIdentityMap(db_manager)
+    await users.load(["t1", "t1", "t2"])
+    await users.load(["t1", "t2"])
+    assert users.get("t1")["name"] == "Teacher"
+    assert users.get("t2") == {}
+    assert supabase_client.execute.call_count == 1
+
+@pytest.mark.asyncio
+async def test_independent_queries_run_concurrently(db_manager, supabase_client):
+    # Each query waits until all three are in flight at once; run serially the
+    # barrier would time out and the reads would fall back to empty results.
+    barrier = threading.Barrier(3, timeout=5)
+    def blocking_execute():
+        barrier.wait()
+        return Mock(data=[{"id": "t1"}], count=1)
+    supabase_client.execute.side_effect = blocking_execute
+    logs, page, users = await asyncio.gather(
+        db_manager.get_logs("123"), db_manager.get_doubts_page(), db_manager.get_users_by_ids(["t1"])
+    )
+    assert logs == [{"id": "t1"}]
+    assert page["items"] == [{"id": "t1"}]
+    assert "t1" in users
+
+@pytest.mark.asyncio
+async def test_get_user_data_is_cached_until_update(db_manager, supabase_client):
+    supabase_client.execute.side_effect = [
+        Mock(data={"id": "123", "points": 1}),
+        Mock(data=[{"id": "123", "goals": "y"}]),
+        Mock(data={"id": "123", "goals": "y"})
+    ]
+    await db_manager.get_user_data("123")
+    await db_manager.get_user_data("123")
+    assert supabase_client.execute.call_count == 1
+    await db_manager.update_user("123", {"goals": "y"})
+    await db_manager.get_user_data("123")
+    assert supabase_client.execute.call_count == 3
+
+@pytest.mark.asyncio
+async def test_insert_doubt_invalidates_doubt_pages(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = []
+    await db_manager.get_doubts_page()
+    await db_manager.get_doubts_page()
+    assert supabase_client.execute.call_count == 1
+    await db_manager.insert_doubt({"id": "d1"})
+    await db_manager.get_doubts_page()
+    assert supabase_client.execute.call_count == 3
+
+def test_configure_pool_sets_keepalive_limits():
+    client = create_client("https://example.supabase.co", "eyJhbGciOiJIUzI1NiJ9.e30.signature")
+    configure_pool(client, {"max_connections": 5, "max_keepalive_connections": 3})
+    session = client.postgrest.session
+    assert str(session.base_url) == "https://example.supabase.co/rest/v1/"
+    assert session._transport._pool._max_connections == 5
+    assert session._transport._pool._max_keepalive_connections == 3
+
+@pytest.mark.asyncio
+async def test_health_check(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = [{"id": "123"}]
+    assert (await db_manager.health_check())["ok"] is True
+    supabase_client.execute.side_effect = RuntimeError("connection refused")
+    health = await db_manager.health_check()
+    assert health["ok"] is False
+    assert "connection refused" in health["error"]
+
+@pytest.mark.asyncio
+async def test_topic_suggestions_built_once_then_incremental(db_manager, supabase_client):
+    supabase_client.execute.side_effect = [
+        Mock(data=[{"topics": ["Algebra"], "timestamp": "2024-01-01"}]),
+        Mock(data=[{"topics": ["Optics"]}]),
+        Mock(data=[{"id": "log-2"}])
+    ]
+    assert await db_manager.get_topic_suggestions("123") == ["Algebra", "Optics"]
+    await db_manager.append_log("123", {"topics": ["Optics"], "timestamp": "2024-01-02"})
+    assert await db_manager.get_topic_suggestions("123") == ["Optics", "Algebra"]
+    assert supabase_client.execute.call_count == 3
+
+@pytest.mark.asyncio
+async def test_get_rollups_reads_window_and_is_invalidated_by_check_in(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = [{"day": "2024-01-02", "subject": "Math", "checkins": 2, "topics": 3}]
+    rows = await db_manager.get_rollups("123", "2024-01-01")
+    assert rows[0]["checkins"] == 2
+    supabase_client.table.assert_called_with("daily_rollups")
+    supabase_client.gte.assert_called_with("day", "2024-01-01")
+    await db_manager.get_rollups("123", "2024-01-01")
+    assert supabase_client.execute.call_count == 1
+    await db_manager.append_log("123", {"date": "2024-01-02", "subject": "Math", "topics": []})
+    await db_manager.get_rollups("123", "2024-01-01")
+    assert supabase_client.execute.call_count == 3
+
+@pytest.mark.asyncio
+async def test_backfill_rollups_uses_rpc(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = 7
+    assert await db_manager.backfill_rollups() == 7
+    supabase_client.rpc.assert_called_with("backfill_daily_rollups", {"p_user_id": None})
+
+@pytest.mark.asyncio
+async def test_iter_log_pages_walks_keyset(db_manager, supabase_client):
+    supabase_client.execute.side_effect = [
+        Mock(data=[{"id": "a", "timestamp": "t1"}, {"id": "b", "timestamp": "t2"}]),
+        Mock(data=[{"id": "c", "timestamp": "t3"}])
+    ]
+    pages = [page async for page in db_manager.iter_log_pages(page_size=2)]
+    assert [len(page) for page in pages] == [2, 1]
+    supabase_client.or_.assert_called_once_with('timestamp.gt."t2",and(timestamp.eq."t2",id.gt.b)')
+
+def test_resolve_columns_presets():
+    assert resolve_columns("users", "full") == "*"
+    assert resolve_columns("users", "summary") == "id, name, role, points"
+    assert resolve_columns("users", ["id", "name"]) == "id, name"
+    assert resolve_columns("users", "id, email") == "id, email"
+
+@pytest.mark.asyncio
+async def test_reads_accept_projection(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = [{"id": "123", "name": "A"}]
+    await db_manager.get_user_by_email("a@example.com", "session")
+    supabase_client.select.assert_called_with("id, email, name, role")
+    await db_manager.get_logs("123", ["id", "topics"])
+    supabase_client.select.assert_called_with("id, topics")
+
+@pytest.mark.asyncio
+async def test_doubts_page_projection_keeps_keyset_columns(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = []
+    await db_manager.get_doubts_page(limit=5, columns="id, topic")
+    supabase_client.select.assert_called_with("id, topic, created_at", count="estimated")
+
+@pytest.mark.asyncio
+async def test_take_rate_token_uses_rpc(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = {"allowed": False, "retry_after": 4.0}
+    assert await db_manager.take_rate_token("doubts:123", 5, 5 / 60) == (False, 4.0)
+    supabase_client.rpc.assert_called_with("take_rate_token", {"p_key": "doubts:123", "p_capacity": 5, "p_refill_per_second": 5 / 60})
+
+@pytest.mark.asyncio
+async def test_search_doubts_uses_rpc_with_day_bounds(db_manager, supabase_client):
+    supabase_client.execute.return_value.data = [{"id": "d1", "rank": 0.5, "total": 1}]
+    results = await db_manager.search_doubts("algebra", {"topic": "Math", "answered": False, "since": "2024-01-01", "until": "2024-01-31"})
+    supabase_client.rpc.assert_called_with("search_doubts", {
+        "p_query": "algebra", "p_topic": "Math", "p_answered": False,
+        "p_since": "2024-01-01", "p_until": "2024-02-01", "p_limit": 11, "p_offset": 0
+    })
+    assert results == {"items": [{"id": "d1", "rank": 0.5}], "total": 1, "next_page": None}
@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import Mock
+from doubt_store import DoubtFeed, DoubtStore
+
+def doubt(i, responded_at=None):
+    return {"id": f"d{i}", "topic": "t", "question": f"q{i}", "created_at": f"2024-01-01T00:00:{i:02d}", "responded_at": responded_at}
+
+@pytest.fixture
+def store():
+    store = DoubtStore(overlap=30)
+    store.load([doubt(i) for i in range(5, 0, -1)], total=5, complete=True)
+    return store
+
+def test_page_walks_keyset_newest_first(store):
+    first = store.page(None, 2)
+    assert [row["id"] for row in first["items"]] == ["d5", "d4"]
+    assert first["total"] == 5
+    second = store.page(first["next_cursor"], 2)
+    assert [row["id"] for row in second["items"]] == ["d3", "d2"]
+    last = store.page(second["next_cursor"], 2)
+    assert [row["id"] for row in last["items"]] == ["d1"]
+    assert last["next_cursor"] is None
+
+def test_page_past_an_incomplete_window_defers_to_storage():
+    store = DoubtStore()
+    store.load([doubt(3), doubt(2)], total=100, complete=False)
+    assert store.page(None, 3) is None
+    page = store.page(None, 2)
+    assert [row["id"] for row in page["items"]] == ["d3", "d2"]
+    assert page["next_cursor"] == ("2024-01-01T00:00:02", "d2")
+    assert store.page(page["next_cursor"], 2) is None
+
+def test_high_water_marks_advance_only_from_storage(store):
+    assert store.high_water["created_at"] == "2024-01-01T00:00:05"
+    assert store.since("created_at") == "2023-12-31T23:59:35"
+    assert store.since("responded_at") == store.since("created_at")
+    store.merge([doubt(9)])
+    store.merge([{**doubt(2), "response": "r", "responded_at": "2024-01-02T00:00:00"}], advance=True)
+    assert store.high_water == {"created_at": "2024-01-01T00:00:05", "responded_at": "2024-01-02T00:00:00"}
+    assert store.total == 6
+    assert store.rows["d2"]["question"] == "q2"
+    assert store.page(None, 1)["items"][0]["id"] == "d9"
+
+def test_pushes_apply_on_drain(store):
+    store.push(doubt(7))
+    assert "d7" not in store.rows
+    assert store.drain() == 1
+    assert store.page(None, 1)["items"][0]["id"] == "d7"
+
+def test_due_polls_on_interval_unless_feed_is_live():
+    store = DoubtStore()
+    assert store.due(10)
+    store.load([], 0, True)
+    store.mark_synced(generation=1)
+    assert not store.due(10)
+    assert store.due(0)
+    feed = Mock(live=True, generation=1)
+    assert not store.due(0, feed)
+    feed.generation = 2
+    assert store.due(0, feed)
+    feed.live = False
+    feed.generation = 1
+    assert store.due(0, feed)
+
+def test_feed_pushes_changes_to_registered_stores():
+    feed = DoubtFeed("https://example.supabase.co", "key")
+    store = DoubtStore()
+    feed.register(store)
+    feed.on_state("SUBSCRIBED")
+    feed.on_state("SUBSCRIBED")
+    assert feed.live and feed.generation == 1
+    feed.on_change({"data": {"type": "INSERT", "record": doubt(1)}})
+    feed.on_change({"data": {"type": "DELETE", "record": None}})
+    assert store.drain() == 1
+    feed.on_state("CLOSED")
+    feed.on_state("SUBSCRIBED")
+    assert feed.generation == 2
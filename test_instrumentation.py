@@ -0,0 +1,100 @@
+import pytest
+import asyncio
+import logging
+import urllib.request
+from supabase import create_client
+import instrumentation
+from instrumentation import MetricsRegistry, describe_query, record_query, track_rerun
+from database import DatabaseManager
+from log_pipeline import ContextFilter, bind_user
+from sqlite_backend import SqliteClient
+
+@pytest.fixture
+def supabase():
+    return create_client("http://localhost:1", "eyJhbGciOiJIUzI1NiJ9.e30.signature")
+
+@pytest.fixture
+def metrics(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(instrumentation, "metrics", registry)
+    return registry
+
+def test_describe_postgrest_queries(supabase):
+    assert describe_query(supabase.table("users").select("id").eq("id", "1")) == ("users", "select")
+    assert describe_query(supabase.table("doubts").insert({"id": "1"})) == ("doubts", "insert")
+    assert describe_query(supabase.table("study_logs").upsert({"id": "1"})) == ("study_logs", "upsert")
+    assert describe_query(supabase.table("users").update({"goals": "x"}).eq("id", "1")) == ("users", "update")
+    assert describe_query(supabase.rpc("increment_user_points", {})) == ("increment_user_points", "rpc")
+
+def test_describe_sqlite_queries():
+    client = SqliteClient(":memory:")
+    assert describe_query(client.table("users").select("id")) == ("users", "select")
+    assert describe_query(client.table("users").update({"name": "x"})) == ("users", "update")
+    assert describe_query(client.rpc("take_rate_token", {})) == ("take_rate_token", "rpc")
+
+@pytest.mark.asyncio
+async def test_rerun_collects_queries_from_gathered_tasks(metrics):
+    async def query(table):
+        record_query(table, "select", 0.002, [{"id": 1}, {"id": 2}])
+
+    with track_rerun() as rerun:
+        await asyncio.gather(query("users"), query("doubts"), query("users"))
+    record_query("users", "select", 0.002, [])
+    totals = rerun.totals()
+    assert totals["queries"] == 3
+    assert totals["rows"] == 6
+    assert totals["bytes"] > 0
+    assert {group["table"]: group["calls"] for group in rerun.breakdown()} == {"users": 2, "doubts": 1}
+
+def test_rerun_log_record_is_structured(metrics, caplog):
+    with caplog.at_level("INFO", logger="instrumentation"):
+        with track_rerun():
+            record_query("users", "select", 0.001, None, ok=False)
+    record = [r for r in caplog.records if hasattr(r, "rerun_stats")][-1]
+    assert record.rerun_stats["errors"] == 1
+    assert record.rerun_stats["breakdown"][0]["table"] == "users"
+
+def test_metrics_render_prometheus_text(metrics):
+    record_query("users", "select", 0.003, [{"id": 1}])
+    record_query("users", "select", 0.2, None, ok=False)
+    text = metrics.render()
+    assert 'tracker_db_query_seconds_bucket{table="users",operation="select",le="0.005"} 1' in text
+    assert 'tracker_db_query_seconds_count{table="users",operation="select"} 2' in text
+    assert 'tracker_db_query_errors_total{table="users",operation="select"} 1' in text
+
+def test_metrics_server_serves_metrics(metrics, monkeypatch):
+    monkeypatch.setattr(instrumentation, "_server", None)
+    server = instrumentation.start_metrics_server(0)
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+        assert instrumentation.start_metrics_server(0) is server
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert b"tracker_rerun_seconds_count" in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+@pytest.mark.asyncio
+async def test_database_manager_round_trips_are_recorded(metrics):
+    db = DatabaseManager(None, None, client=SqliteClient(":memory:"))
+    with track_rerun() as rerun:
+        await db.get_class_data()
+        await db.health_check()
+    db.writes.close()
+    assert [(g["table"], g["operation"], g["calls"]) for g in sorted(rerun.breakdown(), key=lambda g: g["table"])] == [
+        ("class_data", "select", 1), ("users", "select", 1)
+    ]
+
+@pytest.mark.asyncio
+async def test_executor_threads_keep_the_log_context(metrics):
+    db = DatabaseManager(None, None, client=SqliteClient(":memory:"))
+    records = []
+    def execute():
+        record = logging.LogRecord("database", logging.INFO, __file__, 1, "from the executor", (), None)
+        ContextFilter().filter(record)
+        records.append(record)
+    with track_rerun() as rerun:
+        bind_user("u1")
+        await db._run_in_executor(execute)
+    db.writes.close()
+    assert (records[0].user_id, records[0].rerun_id) == ("u1", rerun.id)
@@ -0,0 +1,90 @@
+import pytest
+import json
+import logging
+import os
+import queue
+import yaml
+import log_pipeline
+from log_pipeline import ContextFilter, JsonFormatter, NonBlockingQueueHandler, SamplingFilter, bind_user, setup_logging, shutdown_logging
+import instrumentation
+from instrumentation import MetricsRegistry, track_rerun
+
+def make_record(name="database", level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_sampling_keeps_one_in_n_per_logger_and_all_warnings():
+    sampler = SamplingFilter({"instrumentation": 0.25})
+    kept = [sampler.filter(make_record("instrumentation.sub")) for _ in range(8)]
+    assert kept.count(True) == 2
+    assert sampler.filter(make_record("instrumentation", logging.WARNING))
+    assert all(sampler.filter(make_record("database")) for _ in range(3))
+
+def test_default_sampling_keeps_every_rerun_stats_record():
+    with open(os.path.join(os.path.dirname(__file__), "config.yaml")) as f:
+        sampler = SamplingFilter(yaml.safe_load(f)['logging']['sampling'])
+    assert all(sampler.filter(make_record("instrumentation", msg="rerun_stats", args=())) for _ in range(20))
+
+def test_context_filter_stamps_user_and_rerun(monkeypatch):
+    monkeypatch.setattr(log_pipeline, "_user_id", log_pipeline.contextvars.ContextVar("test_user", default=None))
+    record = make_record()
+    with track_rerun() as rerun:
+        bind_user("u1")
+        ContextFilter().filter(record)
+    assert record.user_id == "u1"
+    assert record.rerun_id == rerun.id
+
+def test_json_formatter_includes_context_and_extra():
+    record = make_record(user_id="u1", rerun_id="r1", rerun_stats={"queries": 3})
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "hello world"
+    assert entry["user_id"] == "u1"
+    assert entry["rerun_id"] == "r1"
+    assert entry["rerun_stats"] == {"queries": 3}
+    assert entry["logger"] == "database"
+
+def test_queue_handler_defers_scalar_formatting_and_freezes_mutable_args():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    scalar = handler.prepare(make_record())
+    assert scalar.args == ("world",)
+    state = {"n": 1}
+    frozen = handler.prepare(make_record(msg="state %s", args=(state,)))
+    state["n"] = 2
+    assert frozen.getMessage() == "state {'n': 1}"
+
+def test_queue_handler_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.enqueue(make_record())
+    handler.enqueue(make_record())
+    assert handler.dropped == 1
+
+def test_setup_logging_writes_rotated_json_lines(tmp_path):
+    path = tmp_path / "app.log"
+    root = logging.getLogger()
+    level = root.level
+    try:
+        handler = setup_logging({"file": str(path), "max_bytes": 300, "backup_count": 2})
+        assert setup_logging({"file": str(tmp_path / "other.log")}) is handler
+        for i in range(10):
+            logging.getLogger("test_pipeline").info("record %s", i)
+    finally:
+        shutdown_logging()
+        root.setLevel(level)
+    lines = path.read_text().splitlines()
+    assert json.loads(lines[-1])["message"] == "record 9"
+    assert (tmp_path / "app.log.1").exists()
+    assert not (tmp_path / "app.log.3").exists()
+
+def test_dropped_records_are_exported_as_a_metric(tmp_path, monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(instrumentation, "metrics", registry)
+    root = logging.getLogger()
+    level = root.level
+    try:
+        handler = setup_logging({"file": str(tmp_path / "app.log")})
+        handler.dropped = 3
+        assert "tracker_log_records_dropped_total 3" in registry.render().splitlines()
+    finally:
+        shutdown_logging()
+        root.setLevel(level)
@@ -0,0 +1,45 @@
+import datetime
+import mock_tests
+from quiz import SKIPPED
+
+def question(i, answer=0):
+    return {"id": f"q{i}", "prompt": f"p{i}", "options": ["a", "b", "c", "d"], "answer": answer}
+
+def test_times_are_read_as_utc():
+    naive = mock_tests.parse_time("2024-01-01T10:00:00")
+    assert naive == mock_tests.parse_time("2024-01-01T11:00:00+01:00") == mock_tests.parse_time("2024-01-01T10:00:00Z")
+
+def test_remaining_seconds_follow_the_server_clock():
+    now = datetime.datetime(2024, 1, 1, 10, 0, tzinfo=datetime.timezone.utc)
+    # The database clock runs a minute ahead of this process.
+    offset = mock_tests.clock_offset("2024-01-01T10:01:00+00:00", now)
+    assert offset == 60
+    session = {"deadline": "2024-01-01T10:30:00+00:00"}
+    assert mock_tests.remaining_seconds(session, offset, now) == 29 * 60
+    assert mock_tests.remaining_seconds(session, offset, now + datetime.timedelta(hours=1)) == 0
+
+def test_option_order_is_stable_per_session():
+    q = question(0)
+    order = mock_tests.option_order("s1", q)
+    assert sorted(order) == [0, 1, 2, 3]
+    assert mock_tests.option_order("s1", q) == order
+    assert any(mock_tests.option_order(f"s{i}", q) != order for i in range(2, 10))
+
+def test_result_view_and_question_lookup():
+    test = {"question_ids": ["q2", "q0", "gone"]}
+    questions = mock_tests.test_questions(test, [question(0, 1), question(1), question(2, 3)])
+    assert [q["id"] for q in questions] == ["q2", "q0"]
+    view = mock_tests.result_view(questions, {"answers": {"q2": 3}, "score": 1, "total": 2})
+    assert view["answers"] == [3, SKIPPED] and view["correct"] == [True, False]
+    assert (view["score"], view["total"]) == (1, 2)
+
+def test_aggregate_stats_sums_shards():
+    rows = [
+        {"question_id": "q0", "attempts": 3, "correct": 2, "skipped": 0},
+        {"question_id": "q0", "attempts": 2, "correct": 1, "skipped": 1},
+        {"question_id": "q1", "attempts": 1, "correct": 0, "skipped": 1}
+    ]
+    assert mock_tests.aggregate_stats(rows) == {
+        "q0": {"attempts": 5, "correct": 3, "skipped": 1},
+        "q1": {"attempts": 1, "correct": 0, "skipped": 1}
+    }
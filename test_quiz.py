@@ -0,0 +1,44 @@
+import random
+import pytest
+import quiz
+
+def question(i, answer=0, options=("a", "b", "c", "d")):
+    return {"id": f"q{i}", "topic": "t", "prompt": f"p{i}", "options": list(options), "answer": answer, "explanation": None}
+
+@pytest.fixture
+def attempt():
+    pool = [question(i, answer=i % 4) for i in range(8)]
+    return quiz.new_attempt("u1", "t", pool, 5, random.Random(0))
+
+def test_new_attempt_samples_and_shuffles_per_attempt(attempt):
+    assert len(attempt["questions"]) == 5
+    assert len({q["id"] for q in attempt["questions"]}) == 5
+    for q in attempt["questions"]:
+        assert sorted(q["order"]) == [0, 1, 2, 3]
+    other = quiz.new_attempt("u1", "t", [question(i) for i in range(8)], 5, random.Random(1))
+    assert [q["id"] for q in other["questions"]] != [q["id"] for q in attempt["questions"]]
+    assert len(quiz.new_attempt("u1", "t", [question(0)], 5)["questions"]) == 1
+
+def test_grade_maps_shown_positions_back_to_the_key(attempt):
+    questions = attempt["questions"]
+    right = [q["order"].index(q["answer"]) for q in questions]
+    wrong = [(position + 1) % 4 for position in right]
+    chosen = [right[0], wrong[1], None, right[3], right[4]]
+    graded = quiz.grade(attempt, chosen)
+    assert graded["correct"] == [True, False, False, True, True]
+    assert graded["score"] == 3 and graded["total"] == 5
+    assert graded["answers"][0] == questions[0]["answer"]
+    assert graded["answers"][2] == quiz.SKIPPED
+    assert quiz.shown_options(questions[1])[wrong[1]] == questions[1]["options"][graded["answers"][1]]
+
+def test_grade_handles_uneven_option_counts():
+    attempt = quiz.new_attempt("u1", "t", [question(0, 1, ("x", "y")), question(1, 2)], 2, random.Random(0))
+    chosen = [q["order"].index(q["answer"]) for q in attempt["questions"]]
+    assert quiz.grade(attempt, chosen)["score"] == 2
+    assert quiz.grade({"questions": []}, [])["total"] == 0
+
+def test_attempt_row_and_options(attempt):
+    row = quiz.attempt_row(attempt, quiz.grade(attempt, [None] * 5))
+    assert row["question_ids"] == [q["id"] for q in attempt["questions"]]
+    assert row["answers"] == [quiz.SKIPPED] * 5 and row["score"] == 0
+    assert quiz.parse_options(" a \n\n b\n") == ["a", "b"]
@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+import rate_limiter
+from rate_limiter import MemoryBucketBackend, SupabaseBucketBackend, TokenBucketLimiter, get_limiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def limiter(clock):
+    return TokenBucketLimiter(MemoryBucketBackend(clock=clock), capacity=5, period=60, name="doubts")
+
+@pytest.mark.asyncio
+async def test_allows_burst_up_to_capacity_then_denies(limiter):
+    results = [await limiter.try_acquire("u1") for _ in range(5)]
+    assert all(allowed for allowed, _ in results)
+    allowed, retry_after = await limiter.try_acquire("u1")
+    assert not allowed
+    assert retry_after == pytest.approx(12.0)
+
+@pytest.mark.asyncio
+async def test_tokens_refill_over_time(limiter, clock):
+    for _ in range(5):
+        await limiter.try_acquire("u1")
+    clock.now = 12.0
+    assert (await limiter.try_acquire("u1"))[0]
+    assert not (await limiter.try_acquire("u1"))[0]
+
+@pytest.mark.asyncio
+async def test_users_have_separate_buckets(limiter):
+    for _ in range(5):
+        await limiter.try_acquire("u1")
+    assert (await limiter.try_acquire("u2"))[0]
+
+@pytest.mark.asyncio
+async def test_full_buckets_are_pruned(clock):
+    backend = MemoryBucketBackend(clock=clock, max_keys=2)
+    await backend.take("a", 5, 1)
+    await backend.take("b", 5, 1)
+    clock.now = 10.0
+    await backend.take("c", 5, 1)
+    assert set(backend._buckets) == {"c"}
+
+@pytest.mark.asyncio
+async def test_supabase_backend_delegates_to_rpc():
+    db_manager = Mock()
+    db_manager.take_rate_token = AsyncMock(return_value=(False, 3.5))
+    limiter = TokenBucketLimiter(SupabaseBucketBackend(db_manager), capacity=5, period=60, name="doubts")
+    assert await limiter.try_acquire("u1") == (False, 3.5)
+    db_manager.take_rate_token.assert_awaited_once_with("doubts:u1", 5, 5 / 60)
+
+@pytest.mark.asyncio
+async def test_failing_backend_denies_without_retry_hint():
+    db_manager = Mock()
+    db_manager.take_rate_token = AsyncMock(side_effect=RuntimeError("rpc failed"))
+    limiter = TokenBucketLimiter(SupabaseBucketBackend(db_manager), name="doubts")
+    assert await limiter.try_acquire("u1") == (False, None)
+
+def test_get_limiter_is_shared_per_name(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    first = get_limiter("doubts", {"capacity": 3, "period": 30})
+    assert get_limiter("doubts", {}) is first
+    assert first.capacity == 3
+    assert isinstance(first.backend, MemoryBucketBackend)
+    assert isinstance(get_limiter("other", {"backend": "supabase"}, Mock()).backend, SupabaseBucketBackend)
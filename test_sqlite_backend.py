@@ -0,0 +1,273 @@
+import asyncio
+import datetime
+import pytest
+from unittest.mock import AsyncMock
+from database import DatabaseManager
+from doubt_store import DoubtStore
+import sqlite_backend
+from sqlite_backend import SqliteBackendError, SqliteClient
+
+@pytest.fixture
+def client():
+    client = SqliteClient(":memory:")
+    yield client
+    client.close()
+
+@pytest.fixture
+def db_manager(client):
+    db = DatabaseManager(None, None, client=client)
+    yield db
+    db.writes.close()
+    db.mock_answers.close()
+
+def make_user(user_id, email=None, **fields):
+    return {"id": user_id, "email": email or f"{user_id}@example.com", "name": user_id.upper(), "role": "student", **fields}
+
+def test_insert_round_trips_json_and_bool_columns(client):
+    user = make_user("u1", badges=["first_doubt"], preferences={"language": "English"}, onboarded=True)
+    inserted = client.table("users").insert(user).execute().data[0]
+    assert inserted["badges"] == ["first_doubt"]
+    assert inserted["preferences"] == {"language": "English"}
+    assert inserted["onboarded"] is True
+    assert inserted["points"] == 0
+
+def test_single_raises_when_row_missing(client):
+    with pytest.raises(SqliteBackendError):
+        client.table("users").select("*").eq("id", "missing").single().execute()
+
+def test_unknown_column_is_rejected(client):
+    with pytest.raises(SqliteBackendError):
+        client.table("users").select("id; drop table users").execute()
+
+def test_filters_order_limit_and_count(client):
+    client.table("users").insert([make_user("u1"), make_user("u2"), make_user("u3")]).execute()
+    response = client.table("users").select("id", count="exact").in_("id", ["u1", "u3"]).order("id", desc=True).limit(1).execute()
+    assert response.data == [{"id": "u3"}]
+    assert response.count == 2
+
+def test_or_keyset_expression(client):
+    client.table("users").insert(make_user("u1")).execute()
+    rows = [{"id": f"d{i}", "user_id": "u1", "question": "q", "created_at": f"2024-01-0{1 + i // 2}T00:00:00"} for i in range(4)]
+    client.table("doubts").insert(rows).execute()
+    response = client.table("doubts").select("id").or_(
+        'created_at.lt."2024-01-02T00:00:00",and(created_at.eq."2024-01-02T00:00:00",id.lt.d3)'
+    ).order("created_at", desc=True).order("id", desc=True).execute()
+    assert [row["id"] for row in response.data] == ["d2", "d1", "d0"]
+
+def test_not_is_null(client):
+    client.table("users").insert(make_user("u1")).execute()
+    client.table("doubts").insert([
+        {"id": "d1", "user_id": "u1", "created_at": "2024-01-01", "response": "yes"},
+        {"id": "d2", "user_id": "u1", "created_at": "2024-01-02"}
+    ]).execute()
+    answered = client.table("doubts").select("id").not_.is_("response", "null").execute().data
+    assert answered == [{"id": "d1"}]
+
+def test_upsert_ignore_duplicates(client):
+    client.table("users").insert(make_user("u1")).execute()
+    log = {"user_id": "u1", "date": "2024-01-01", "subject": "Math", "topics": ["a"], "timestamp": "2024-01-01T10:00:00"}
+    client.table("study_logs").upsert([log], on_conflict="user_id,timestamp", ignore_duplicates=True).execute()
+    client.table("study_logs").upsert([log], on_conflict="user_id,timestamp", ignore_duplicates=True).execute()
+    assert len(client.table("study_logs").select("id").execute().data) == 1
+
+@pytest.mark.asyncio
+async def test_manager_user_round_trip(db_manager):
+    await db_manager.insert_user(make_user("u1", badges=[]))
+    assert (await db_manager.get_user_by_email("u1@example.com", "session"))["name"] == "U1"
+    assert await db_manager.increment_points("u1", 2) == 2
+    assert await db_manager.append_badge("u1", "first_doubt") == ["first_doubt"]
+    assert await db_manager.append_badge("u1", "first_doubt") == ["first_doubt"]
+    user = await db_manager.get_user_data("u1")
+    assert user["points"] == 2
+    assert user["badges"] == ["first_doubt"]
+    assert await db_manager.get_user_data("missing") == {}
+
+@pytest.mark.asyncio
+async def test_manager_logs_maintain_rollups(db_manager):
+    await db_manager.insert_user(make_user("u1"))
+    for hour in (9, 10):
+        await db_manager.append_log("u1", {"date": "2024-01-01", "subject": "Math", "topics": ["a", "b"], "timestamp": f"2024-01-01T{hour:02d}:00:00"})
+    rollups = await db_manager.get_rollups("u1")
+    assert rollups == [{"day": "2024-01-01", "subject": "Math", "checkins": 2, "topics": 4}]
+    assert await db_manager.backfill_rollups("u1") == 1
+    pages = [page async for page in db_manager.iter_log_pages("u1", page_size=1)]
+    assert [len(page) for page in pages] == [1, 1]
+
+@pytest.mark.asyncio
+async def test_manager_doubt_pages(db_manager):
+    await db_manager.insert_user(make_user("u1"))
+    for i in range(5):
+        await db_manager.insert_doubt({"id": f"d{i}", "user_id": "u1", "topic": "t", "question": "q", "created_at": f"2024-01-0{i + 1}T00:00:00"})
+    first = await db_manager.get_doubts_page(limit=2, filters={"answered": False})
+    assert [row["id"] for row in first["items"]] == ["d4", "d3"]
+    assert first["total"] == 5
+    second = await db_manager.get_doubts_page(first["next_cursor"], limit=2)
+    assert [row["id"] for row in second["items"]] == ["d2", "d1"]
+
+@pytest.mark.asyncio
+async def test_manager_rate_tokens(db_manager):
+    results = [await db_manager.take_rate_token("doubts:u1", 2, 2 / 60) for _ in range(3)]
+    assert [allowed for allowed, _ in results] == [True, True, False]
+    assert results[-1][1] > 0
+
+def test_search_index_builds_in_batches_and_follows_other_connections(tmp_path, monkeypatch):
+    monkeypatch.setattr(sqlite_backend, "SEARCH_INDEX_BATCH", 2)
+    path = str(tmp_path / "tracker.db")
+    writer = SqliteClient(path)
+    writer.table("users").insert(make_user("u1")).execute()
+    writer.table("doubts").insert([
+        {"id": f"d{i}", "user_id": "u1", "topic": "Algebra", "question": f"quadratic {i}", "created_at": f"2024-01-0{i + 1}T00:00:00"}
+        for i in range(5)
+    ]).execute()
+    reader = SqliteClient(path)
+    search = lambda query: [row["id"] for row in reader.rpc("search_doubts", {"p_query": query, "p_limit": 10}).execute().data]
+    assert len(search("quadratic")) == 5
+    # A commit by another connection is picked up by a background rebuild.
+    writer.table("doubts").insert({"id": "d9", "user_id": "u1", "topic": "Sets", "question": "matrices", "created_at": "2024-01-09T00:00:00"}).execute()
+    assert search("matrices") == []
+    reader.search_thread.join()
+    assert search("matrices") == ["d9"]
+    reader.close()
+    writer.close()
+
+@pytest.mark.asyncio
+async def test_manager_search_doubts_tracks_writes(db_manager):
+    await db_manager.insert_user(make_user("u1"))
+    await db_manager.insert_doubt({"id": "d1", "user_id": "u1", "topic": "Algebra", "question": "Quadratic equations?", "created_at": "2024-01-01T00:00:00"})
+    await db_manager.insert_doubt({"id": "d2", "user_id": "u1", "topic": "Physics", "question": "Equations of motion", "created_at": "2024-01-05T00:00:00"})
+    results = await db_manager.search_doubts("equations", limit=1)
+    assert [row["id"] for row in results["items"]] == ["d2"]
+    assert results["total"] == 2
+    assert results["next_page"] == 1
+    assert "total" not in results["items"][0]
+    await db_manager.update_doubt_response("d1", {"response": "Use the formula", "response_by": "u1", "responded_at": "2024-01-02T00:00:00"})
+    answered = await db_manager.search_doubts("equations formula", {"answered": True})
+    assert [row["id"] for row in answered["items"]] == ["d1"]
+    dated = await db_manager.search_doubts("equations", {"since": "2024-01-02", "until": "2024-01-05"})
+    assert [row["id"] for row in dated["items"]] == ["d2"]
+    assert (await db_manager.search_doubts("  "))["total"] == 0
+
+@pytest.mark.asyncio
+async def test_manager_similar_doubts_sync_incrementally(db_manager):
+    await db_manager.insert_user(make_user("u1"))
+    await db_manager.insert_doubt({"id": "d1", "user_id": "u1", "topic": "Algebra", "question": "How do I solve quadratic equations?", "created_at": "2024-01-01T00:00:00"})
+    await db_manager.insert_doubt({"id": "d2", "user_id": "u1", "topic": "Algebra", "question": "Solving quadratic equations", "created_at": "2024-01-02T00:00:00"})
+    await db_manager.update_doubt_response("d1", {"response": "Use the formula", "response_by": "u1", "responded_at": "2024-01-03T00:00:00"})
+    similar = await db_manager.get_similar_doubts("Algebra how to solve a quadratic equation")
+    # Unanswered doubts are never suggested.
+    assert [doubt["id"] for doubt, _ in similar] == ["d1"]
+    assert db_manager.similar_doubts.high_water == "2024-01-03T00:00:00"
+    # Answers written elsewhere arrive with the next sync, past the high-water mark.
+    db_manager.supabase.table("doubts").update({"response": "Factorise", "responded_at": "2024-01-04T00:00:00"}).eq("id", "d2").execute()
+    db_manager.similar_doubts.refresh = -1
+    similar = await db_manager.get_similar_doubts("Algebra solving quadratic equations")
+    assert [doubt["id"] for doubt, _ in similar] == ["d2", "d1"]
+    assert db_manager.similar_doubts.high_water == "2024-01-04T00:00:00"
+
+@pytest.mark.asyncio
+async def test_manager_similar_doubts_warm_and_single_flight(db_manager):
+    await db_manager.insert_user(make_user("u1"))
+    await db_manager.insert_doubt({"id": "d1", "user_id": "u1", "topic": "Sets", "question": "What is a union?", "created_at": "2024-01-01T00:00:00"})
+    await db_manager.update_doubt_response("d1", {"response": "r", "response_by": "u1", "responded_at": "2024-01-02T00:00:00"})
+    db_manager.warm_similar_doubts().join()
+    assert len(db_manager.similar_doubts) == 1 and not db_manager.similar_doubts.stale()
+    # Sessions that find the index stale together share one sync.
+    syncs = []
+    async def slow_sync():
+        syncs.append(1)
+        await asyncio.sleep(0.05)
+        db_manager.similar_doubts.mark_synced(None)
+    db_manager._sync_similar_doubts = slow_sync
+    db_manager.similar_doubts.refresh = -1
+    await asyncio.gather(*(db_manager.get_similar_doubts("union of sets") for _ in range(5)))
+    assert len(syncs) == 1
+
+@pytest.mark.asyncio
+async def test_manager_doubt_store_fetches_only_deltas(db_manager):
+    await db_manager.insert_user(make_user("u1"))
+    for i in range(3):
+        await db_manager.insert_doubt({"id": f"d{i}", "user_id": "u1", "topic": "t", "question": "q", "created_at": f"2024-01-0{i + 1}T00:00:00"})
+    store = DoubtStore(overlap=0)
+    await db_manager.sync_doubt_store(store, window=10, poll_interval=60)
+    assert [row["id"] for row in store.page(None, 10)["items"]] == ["d2", "d1", "d0"]
+    # A quiet rerun inside the poll interval makes no queries at all.
+    db_manager.get_doubt_changes = AsyncMock(wraps=db_manager.get_doubt_changes)
+    await db_manager.sync_doubt_store(store, window=10, poll_interval=60)
+    db_manager.get_doubt_changes.assert_not_called()
+    await db_manager.insert_doubt({"id": "d3", "user_id": "u1", "topic": "t", "question": "q", "created_at": "2024-01-04T00:00:00"})
+    await db_manager.update_doubt_response("d0", {"response": "r", "response_by": "u1", "responded_at": "2024-01-05T00:00:00"})
+    await db_manager.sync_doubt_store(store, window=10, poll_interval=0)
+    db_manager.get_doubt_changes.assert_awaited_once_with("2024-01-03T00:00:00", "2024-01-03T00:00:00", 501)
+    assert [row["id"] for row in store.page(None, 10)["items"]] == ["d3", "d2", "d1", "d0"]
+    assert store.rows["d0"]["response"] == "r"
+    assert store.high_water == {"created_at": "2024-01-04T00:00:00", "responded_at": "2024-01-05T00:00:00"}
+    # Past max_changes the window is reloaded instead.
+    await db_manager.sync_doubt_store(store, window=2, poll_interval=0, max_changes=0)
+    assert store.page(None, 2)["items"][0]["id"] == "d3" and store.page(None, 3) is None
+
+@pytest.mark.asyncio
+async def test_manager_quiz_pool_attempts_and_stats(db_manager):
+    await db_manager.insert_user(make_user("u1"))
+    for i in range(3):
+        await db_manager.insert_quiz_question({"topic": "Algebra", "prompt": f"p{i}", "options": ["a", "b"], "answer": 1})
+    pool = await db_manager.get_quiz_pool("Algebra")
+    assert [q["options"] for q in pool] == [["a", "b"]] * 3
+    await db_manager.insert_quiz_question({"topic": "Algebra", "prompt": "p3", "options": ["a", "b"], "answer": 0})
+    assert len(await db_manager.get_quiz_pool("Algebra")) == 4
+    for score in (3, 1):
+        attempt = {"id": f"a{score}", "user_id": "u1", "topic": "Algebra", "question_ids": ["q"] * 4, "answers": [0] * 4,
+                   "score": score, "total": 4, "started_at": "2024-01-01T00:00:00"}
+        assert await db_manager.submit_quiz_attempt(attempt)
+    stats = await db_manager.get_quiz_topic_stats(("Algebra",))
+    assert stats == [{"topic": "Algebra", "attempts": 2, "correct": 4, "questions": 8}]
+    assert not await db_manager.submit_quiz_attempt(attempt)
+
+@pytest.mark.asyncio
+async def test_manager_mock_test_session_autosave_submit_and_stats(client, db_manager):
+    for user_id in ("u1", "u2"):
+        await db_manager.insert_user(make_user(user_id))
+    for i in range(3):
+        await db_manager.insert_quiz_question({"id": f"q{i}", "topic": "Algebra", "prompt": f"p{i}", "options": ["a", "b"], "answer": 1})
+    test = await db_manager.create_mock_test({"title": "Midterm", "topic": "Algebra", "question_ids": ["q0", "q1", "q2"], "duration_minutes": 30})
+    assert [row["title"] for row in await db_manager.get_mock_tests()] == ["Midterm"]
+    session = await db_manager.start_mock_test(test["id"], "u1")
+    assert session["answers"] == {} and session["server_now"] < session["deadline"]
+    # Picks are coalesced until the autosave and seen when the test is reopened.
+    db_manager.stage_mock_answers(session["id"], {"q0": 0})
+    db_manager.stage_mock_answers(session["id"], {"q0": 1})
+    reopened = await db_manager.start_mock_test(test["id"], "u1")
+    assert reopened["deadline"] == session["deadline"] and reopened["answers"] == {"q0": 1}
+    db_manager.mock_answers.flush()
+    saved = client.table("mock_test_sessions").select("answers").eq("id", session["id"]).single().execute().data
+    assert saved["answers"] == {"q0": 1}
+    result = await db_manager.submit_mock_test(session["id"], {"q1": 0})
+    assert (result["score"], result["total"]) == (1, 3) and result["answers"] == {"q0": 1, "q1": 0}
+    # Resubmitting returns the stored result and is not counted twice.
+    assert (await db_manager.submit_mock_test(session["id"], {"q1": 1, "q2": 1}))["score"] == 1
+    # Answers sent after the deadline and grace period are dropped.
+    other = await db_manager.start_mock_test(test["id"], "u2")
+    late = datetime.datetime.fromisoformat(other["deadline"]) + datetime.timedelta(minutes=1)
+    assert client.rpc("save_mock_answers", {"p_session_id": other["id"], "p_answers": {"q0": 1}, "now": late}).execute().data is None
+    client.rpc("save_mock_answers", {"p_session_id": other["id"], "p_answers": {"q2": 1}}).execute()
+    late_result = client.rpc("submit_mock_test", {"p_session_id": other["id"], "p_answers": {"q0": 1}, "now": late}).execute().data
+    assert late_result["answers"] == {"q2": 1} and late_result["score"] == 1
+    stats = await db_manager.get_mock_question_stats(test["id"])
+    assert stats["q0"] == {"attempts": 2, "correct": 1, "skipped": 1}
+    assert stats["q1"] == {"attempts": 2, "correct": 0, "skipped": 1}
+    assert stats["q2"] == {"attempts": 2, "correct": 1, "skipped": 1}
+
+@pytest.mark.asyncio
+async def test_expired_mock_sessions_are_scored_for_stats(client, db_manager):
+    await db_manager.insert_user(make_user("u1"))
+    await db_manager.insert_quiz_question({"id": "q0", "topic": "Algebra", "prompt": "p0", "options": ["a", "b"], "answer": 1})
+    test = await db_manager.create_mock_test({"title": "Quiz", "topic": "Algebra", "question_ids": ["q0"], "duration_minutes": 5})
+    session = await db_manager.start_mock_test(test["id"], "u1")
+    client.rpc("save_mock_answers", {"p_session_id": session["id"], "p_answers": {"q0": 1}}).execute()
+    # Within the deadline nothing is finalised; the student closed the page.
+    assert await db_manager.get_mock_question_stats(test["id"]) == {}
+    late = datetime.datetime.fromisoformat(session["deadline"]) + datetime.timedelta(minutes=1)
+    assert client.rpc("finalize_mock_tests", {"p_test_id": test["id"], "now": late}).execute().data == 1
+    assert client.rpc("finalize_mock_tests", {"p_test_id": test["id"], "now": late}).execute().data == 0
+    assert await db_manager.get_mock_question_stats.uncached(db_manager, test["id"]) == {"q0": {"attempts": 1, "correct": 1, "skipped": 0}}
+    scored = client.table("mock_test_sessions").select("score, total").eq("id", session["id"]).single().execute().data
+    assert scored == {"score": 1, "total": 1}
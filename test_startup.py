@@ -0,0 +1,23 @@
+import math
+import os
+import pytest
+from startup_bench import check_budget, load_budget
+
+# Wall-clock budgets depend on the machine, so they are only checked on
+# request (STARTUP_BENCH=1, or python startup_bench.py).
+@pytest.mark.skipif(not os.environ.get("STARTUP_BENCH"), reason="set STARTUP_BENCH=1 to check cold-start timings")
+def test_cold_start_within_budget():
+    report, violations = check_budget(load_budget())
+    assert set(report) == set(load_budget()['modules'])
+    assert violations == []
+
+def test_entry_modules_keep_heavy_imports_lazy():
+    budget = load_budget()
+    report, violations = check_budget({**budget, "modules": {module: math.inf for module in budget['modules']}})
+    assert set(report) == set(budget['modules'])
+    assert violations == []
+
+def test_budget_violation_is_reported():
+    report, violations = check_budget({"modules": {"pages": 0}, "lazy_modules": ["streamlit"]})
+    assert any(v.startswith("pages:") and "budget" in v for v in violations)
+    assert any("imports streamlit" in v for v in violations)
@@ -0,0 +1,42 @@
+import pytest
+from topics import TopicIndex, TopicIndexRegistry
+
+def test_ranked_by_frequency_then_recency():
+    index = TopicIndex()
+    index.add(["Algebra", "Calculus"], "2024-01-01")
+    index.add(["Calculus", "Optics"], "2024-01-03")
+    index.add(["Algebra"], "2024-01-02")
+    assert index.ranked() == ["Calculus", "Algebra", "Optics"]
+
+def test_ranked_list_is_reused_until_write():
+    index = TopicIndex()
+    index.add(["Algebra"], "2024-01-01")
+    assert index.ranked() is index.ranked()
+    first = index.ranked()
+    index.add(["Optics"], "2024-01-02")
+    assert index.ranked() is not first
+
+def test_registry_merges_user_and_class_topics():
+    registry = TopicIndexRegistry()
+    registry.build_user("u1", [{"topics": ["Algebra", " "], "timestamp": "2024-01-01"}])
+    registry.build_class([{"topics": ["Optics", "Algebra"], "created_at": "2023-12-01"}])
+    assert registry.suggest("u1") == ["Algebra", "Optics"]
+    assert registry.suggest("u1", prefix="op") == ["Optics"]
+
+def test_registry_updates_incrementally():
+    registry = TopicIndexRegistry()
+    registry.build_user("u1", [])
+    registry.build_class([])
+    assert registry.suggest("u1") == []
+    registry.record_log("u1", {"topics": ["Waves"], "timestamp": "2024-01-02"})
+    registry.record_class_row({"topics": ["Optics"]})
+    assert registry.suggest("u1") == ["Waves", "Optics"]
+    registry.record_log("unknown", {"topics": ["Ignored"]})
+    assert not registry.has_user("unknown")
+
+def test_registry_evicts_least_recent_user():
+    registry = TopicIndexRegistry(max_users=1)
+    registry.build_user("u1", [])
+    registry.build_user("u2", [])
+    assert not registry.has_user("u1")
+    assert registry.has_user("u2")
@@ -0,0 +1,169 @@
+import atexit
+import logging
+import threading
+import time
+import weakref
+
+# Write-behind buffer for user-row updates. Field changes are merged per user
+# and written as one update, either after `delay` seconds or at an explicit
+# commit point. Streamlit runs every rerun on a fresh event loop, so the timer
+# and the writes run on plain threads rather than on any one loop. A failed
+# write is retried by the timer with exponential backoff (capped at
+# max_delay) and given up on after max_retries failures.
+
+# Every open buffer, flushed by one exit hook without keeping buffers alive.
+# The hook is registered with the first buffer, so it runs before the
+# logging shutdown registered earlier at startup.
+_open_buffers = weakref.WeakSet()
+_exit_hook = []
+_exit_hook_lock = threading.Lock()
+
+def _close_all():
+    for buffer in list(_open_buffers):
+        buffer.close()
+
+def _track(buffer):
+    with _exit_hook_lock:
+        if not _exit_hook:
+            _exit_hook.append(atexit.register(_close_all))
+        _open_buffers.add(buffer)
+
+class WriteBehindBuffer:
+    def __init__(self, write, delay=2.0, max_delay=300.0, max_retries=10, clock=time.monotonic):
+        # write(user_id, changes) performs the update synchronously and raises
+        # on failure.
+        self.write = write
+        self.delay = delay
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.clock = clock
+        self.logger = logging.getLogger(__name__)
+        self._pending = {}
+        self._inflight = {}
+        self._errors = {}
+        # user_id -> (failed attempts, clock time of the next timed retry)
+        self._retries = {}
+        self._timer = None
+        self._timer_due = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        _track(self)
+
+    def stage(self, user_id, changes):
+        if not changes:
+            return
+        with self._lock:
+            self._pending.setdefault(user_id, {}).update(changes)
+            closed = self._closed
+            if not closed:
+                self._arm()
+        if closed:
+            # After shutdown there is no timer left to rely on.
+            self.flush(user_id)
+
+    def changes(self, user_id):
+        # Unflushed changes for one key, including any being written now.
+        with self._lock:
+            return {**self._inflight.get(user_id, {}), **self._pending.get(user_id, {})}
+
+    def overlay(self, user_id, row):
+        # Reads see their own unflushed writes, limited to the columns the
+        # read actually selected.
+        changes = self.changes(user_id)
+        if not changes or not row:
+            return row
+        return {**row, **{key: value for key, value in changes.items() if key in row}}
+
+    def has_pending(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                return bool(self._pending or self._inflight)
+            return user_id in self._pending or user_id in self._inflight
+
+    def flush(self, user_id=None, due_only=False):
+        # Returns {user_id: exception} for every user whose write failed. Failed
+        # changes go back into the buffer unless newer values replaced them.
+        # due_only (the timer) skips users still backing off after a failure;
+        # explicit flushes write everything.
+        failures = {}
+        with self._flush_lock:
+            with self._lock:
+                now = self.clock()
+                user_ids = [user_id] if user_id is not None else list(self._pending)
+                if due_only:
+                    user_ids = [uid for uid in user_ids if self._retries.get(uid, (0, now))[1] <= now]
+                batch = {uid: self._pending.pop(uid) for uid in user_ids if uid in self._pending}
+                self._inflight.update(batch)
+            for uid, changes in batch.items():
+                try:
+                    self.write(uid, changes)
+                except Exception as e:
+                    self.logger.error("Error flushing buffered changes for user %s: %s", uid, e)
+                    failures[uid] = e
+                with self._lock:
+                    self._inflight.pop(uid, None)
+                    if uid in failures:
+                        self._errors[uid] = failures[uid]
+                        self._retry_later(uid, changes)
+                    else:
+                        self._retries.pop(uid, None)
+                        self._errors.pop(uid, None)
+            with self._lock:
+                if self._pending and not self._closed:
+                    self._arm()
+        return failures
+
+    def _retry_later(self, user_id, changes):
+        attempts = self._retries.get(user_id, (0, None))[0] + 1
+        if self.max_retries is not None and attempts > self.max_retries:
+            # Logged in full so the changes can still be recovered by hand;
+            # newer changes staged since are kept.
+            self.logger.error("Giving up on buffered changes for user %s after %s attempts: %r", user_id, attempts, changes)
+            self._retries.pop(user_id, None)
+            return
+        self._pending[user_id] = {**changes, **self._pending.get(user_id, {})}
+        self._retries[user_id] = (attempts, self.clock() + min(self.delay * 2 ** attempts, self.max_delay))
+
+    def discard(self, user_id):
+        # Drops unflushed changes the caller has written another way, and
+        # any error reported for them.
+        with self._lock:
+            self._errors.pop(user_id, None)
+            self._retries.pop(user_id, None)
+            return self._pending.pop(user_id, None)
+
+    def pop_error(self, user_id):
+        with self._lock:
+            return self._errors.pop(user_id, None)
+
+    def close(self):
+        # Called at interpreter exit: stop the timer and write everything.
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return self.flush()
+
+    def _arm(self):
+        # Fires at the earliest due time: `delay` after new changes, or the
+        # next backoff retry. A later timer is replaced by an earlier one.
+        now = self.clock()
+        due = min(
+            (self._retries[uid][1] if uid in self._retries else now + self.delay for uid in self._pending),
+            default=now + self.delay
+        )
+        if self._timer is not None:
+            if self._timer_due <= due:
+                return
+            self._timer.cancel()
+        self._timer_due = due
+        self._timer = threading.Timer(max(due - now, 0.0), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        self.flush(due_only=True)